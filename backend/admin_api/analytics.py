@@ -0,0 +1,180 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+from projects.models import AI_Question, Project, Project_Report
+
+from .models import DailyRollup, DirtyRollupDay, RollupState
+
+ROLLUP_FIELDS = ("projects_created", "interviews_completed", "reports_generated", "ai_questions", "ai_question_projects")
+
+# Days rebuilt per set of aggregate queries.
+CHUNK_DAYS = 31
+# Longest range the query endpoints serve, about ten years.
+MAX_RANGE_DAYS = 3660
+
+# Per source: the rows, the date they are counted on, the path to their project
+# type and the rollup fields they fill.
+SOURCES = (
+    (Project.objects.all(), "created_at", "project_type", {
+        "projects_created": Count("id"),
+        "interviews_completed": Count("id", filter=Exists(Project_Report.objects.filter(project=OuterRef("pk")))),
+    }),
+    (Project_Report.objects.all(), "created_at", "project__project_type", {
+        "reports_generated": Count("id"),
+    }),
+    (AI_Question.objects.all(), "created_at", "project__project_type", {
+        "ai_questions": Count("id"),
+        "ai_question_projects": Count("project", distinct=True),
+    }),
+)
+
+
+def day_start(day: datetime.date) -> datetime.datetime:
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def changed_days(since=None) -> set:
+    """
+    Local days whose rollups rows written since ``since`` (every row when
+    None) or deletions affect. A new report also changes its project's day,
+    whose ``interviews_completed`` it counts in.
+    """
+    days = set(DirtyRollupDay.objects.values_list("day", flat=True))
+    for model, field in ((Project, "created_at"), (Project_Report, "created_at"),
+                         (Project_Report, "project__created_at"), (AI_Question, "created_at")):
+        queryset = model.objects.all() if since is None else model.objects.filter(created_at__gte=since)
+        days.update(
+            queryset.annotate(day=TruncDate(field)).order_by().values_list("day", flat=True).distinct()
+        )
+    return days
+
+
+def build_rollups(days: list) -> list:
+    """Unsaved ``DailyRollup`` rows of ``days`` (sorted), computed from the tables."""
+    rollups = {}
+    start, end = day_start(days[0]), day_start(days[-1] + datetime.timedelta(days=1))
+    for queryset, field, project_type, aggregates in SOURCES:
+        rows = (
+            queryset.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+            .annotate(day=TruncDate(field)).filter(day__in=days)
+            .order_by().values("day", project_type).annotate(**aggregates)
+        )
+        for row in rows:
+            key = (row.pop("day"), row.pop(project_type))
+            rollup = rollups.setdefault(key, DailyRollup(day=key[0], project_type_id=key[1]))
+            for name, value in row.items():
+                setattr(rollup, name, value)
+    return list(rollups.values())
+
+
+def run_rollup(full: bool = False) -> int:
+    """
+    Rebuilds the ``DailyRollup`` rows of the days changed since the previous
+    run (every day with ``full``). Runs never overlap: each holds the
+    ``RollupState`` row lock. Returns the number of days rebuilt.
+
+    Rows are picked up by their creation time from ``ANALYTICS_ROLLUP_OVERLAP``
+    seconds before the previous run, so rows committed just after it started
+    are not missed. Changes that keep ``created_at`` (a project moved to
+    another type) need a ``full`` run.
+    """
+    started = timezone.now()
+    RollupState.get_state()
+    with transaction.atomic():
+        state = RollupState.objects.select_for_update().get(pk=1)
+        since = None
+        if not full and state.processed_until:
+            since = state.processed_until - datetime.timedelta(seconds=settings.ANALYTICS_ROLLUP_OVERLAP)
+        dirty = list(DirtyRollupDay.objects.values_list("day", flat=True))
+        days = sorted(changed_days(since))
+        if full:
+            DailyRollup.objects.exclude(day__in=days).delete()
+        for offset in range(0, len(days), CHUNK_DAYS):
+            chunk = days[offset:offset + CHUNK_DAYS]
+            rollups = build_rollups(chunk)
+            DailyRollup.objects.filter(day__in=chunk).delete()
+            DailyRollup.objects.bulk_create(rollups)
+        DirtyRollupDay.objects.filter(day__in=dirty).delete()
+        state.processed_until = started
+        state.save()
+    return len(days)
+
+
+def mark_deleted(sender, instance, **kwargs):
+    days = {timezone.localdate(instance.created_at)}
+    if sender is Project_Report:
+        project_created = Project.objects.filter(pk=instance.project_id).values_list("created_at", flat=True).first()
+        if project_created:
+            days.add(timezone.localdate(project_created))
+    DirtyRollupDay.objects.bulk_create([DirtyRollupDay(day=day) for day in days], ignore_conflicts=True)
+
+
+def connect_signals():
+    # Creations are found by their timestamps; deletions leave none, so they mark their days.
+    for model in (Project, Project_Report, AI_Question):
+        post_delete.connect(mark_deleted, sender=model, dispatch_uid=f"rollup-delete-{model._meta.label}")
+
+
+def _with_rates(row: dict) -> dict:
+    row["ai_questions_per_project"] = (
+        round(row["ai_questions"] / row["ai_question_projects"], 2) if row["ai_question_projects"] else None
+    )
+    row["completion_rate"] = (
+        round(row["interviews_completed"] / row["projects_created"], 4) if row["projects_created"] else None
+    )
+    return row
+
+
+def daily_series(start: datetime.date, end: datetime.date, project_type=None) -> list:
+    """Per-day totals from ``start`` to ``end`` (inclusive), days without activity as zeros."""
+    rollups = DailyRollup.objects.filter(day__gte=start, day__lte=end)
+    if project_type:
+        rollups = rollups.filter(project_type_id=project_type)
+    totals = {
+        row.pop("day"): row
+        for row in rollups.order_by().values("day").annotate(**{name: Sum(name) for name in ROLLUP_FIELDS})
+    }
+    zeros = dict.fromkeys(ROLLUP_FIELDS, 0)
+    return [
+        _with_rates({"day": day, **totals.get(day, zeros)})
+        for day in (start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1))
+    ]
+
+
+def ai_question_projects(start: datetime.date, end: datetime.date) -> dict:
+    """
+    Projects per project type that got AI questions from ``start`` to ``end``
+    (inclusive). Daily ``ai_question_projects`` cannot be summed over a
+    range, since a project asked on several days is in each of them, so this
+    counts distinct projects from the table (an indexed range of it).
+    """
+    return dict(
+        AI_Question.objects.filter(
+            created_at__gte=day_start(start), created_at__lt=day_start(end + datetime.timedelta(days=1))
+        )
+        .order_by().values("project__project_type").annotate(n=Count("project", distinct=True))
+        .values_list("project__project_type", "n")
+    )
+
+
+def project_type_summary(start: datetime.date, end: datetime.date) -> list:
+    """Totals per project type from ``start`` to ``end`` (inclusive)."""
+    rows = (
+        DailyRollup.objects.filter(day__gte=start, day__lte=end)
+        .values("project_type", "project_type__name")
+        .annotate(**{name: Sum(name) for name in ROLLUP_FIELDS})
+        .order_by("project_type__name")
+    )
+    projects = ai_question_projects(start, end)
+    summary = []
+    for row in rows:
+        project_type = {"id": row.pop("project_type"), "name": row.pop("project_type__name")}
+        row["ai_question_projects"] = projects.get(project_type["id"], 0)
+        summary.append(_with_rates({"project_type": project_type, **row}))
+    return summary
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AdminApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_api'
+
+    def ready(self):
+        from . import analytics, stats
+
+        stats.connect_signals()
+        analytics.connect_signals()
@@ -0,0 +1,52 @@
+# admin_api/async_views.py
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+
+from projects.async_views import AsyncAPIView
+from projects.models import Project, Answer, AI_Answer
+from projects.serializers import ReportJobSerializer
+from projects.tasks import enqueue_report_job
+from projects.throttles import LLM_THROTTLES
+
+from .models import Settings
+from .permissions import IsAdminUser
+
+
+class AsyncAdminReportRegenerateView(AsyncAPIView):
+    """Async ``AdminReportRegenerateView``."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    throttle_classes = LLM_THROTTLES
+
+    async def post(self, request, pk):
+        try:
+            project = await Project.objects.select_related('project_type').aget(pk=pk)
+        except Project.DoesNotExist:
+            return Response(
+                {'detail': 'Project not found.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        settings = await sync_to_async(Settings.get_settings)()
+        if not settings.report_regeneration_enabled:
+            return Response(
+                {'detail': 'Report regeneration is disabled.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if not await Answer.objects.filter(project=project).aexists() and not await AI_Answer.objects.filter(
+            ai_question__project=project
+        ).aexists():
+            return Response(
+                {'detail': 'No answers found for this project.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+
+        job = await sync_to_async(enqueue_report_job)(project, user=request.user, regenerate=True, bypass_cache=force)
+        data = await sync_to_async(lambda: ReportJobSerializer(job).data)()
+        return Response(data, status=status.HTTP_202_ACCEPTED)
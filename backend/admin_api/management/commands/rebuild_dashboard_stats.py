@@ -0,0 +1,17 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from admin_api.stats import CACHE_KEY, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the admin dashboard counters (admin_api.stats) from the tables, e.g. after "
+        "bulk updates that bypassed the model signals."
+    )
+
+    def handle(self, *args, **options):
+        counts = rebuild_counters()
+        cache.delete(CACHE_KEY)
+        for key, value in sorted(counts.items()):
+            self.stdout.write(f"{key:<32}{value:>10}")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from admin_api.analytics import run_rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily analytics rollups (admin_api.analytics) of the days changed since the "
+        "last run, as the Celery beat job does; --full rebuilds every day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild all days, not only changed ones.")
+
+    def handle(self, *args, **options):
+        days = run_rollup(full=options["full"])
+        self.stdout.write(f"Rebuilt the rollups of {days} day(s).")
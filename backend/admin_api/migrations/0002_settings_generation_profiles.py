@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settings',
+            name='generation_profiles',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
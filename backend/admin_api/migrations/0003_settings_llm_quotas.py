@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0002_settings_generation_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settings',
+            name='llm_quotas',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
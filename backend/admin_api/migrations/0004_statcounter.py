@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    from admin_api.stats import rebuild_counters
+
+    rebuild_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0003_settings_llm_quotas'),
+        ('projects', '0021_project_report_summary'),
+        ('users', '0005_user_date_joined_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0004_statcounter'),
+        ('projects', '0021_project_report_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyRollupDay',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('projects_created', models.PositiveIntegerField(default=0)),
+                ('interviews_completed', models.PositiveIntegerField(default=0)),
+                ('reports_generated', models.PositiveIntegerField(default=0)),
+                ('ai_questions', models.PositiveIntegerField(default=0)),
+                ('ai_question_projects', models.PositiveIntegerField(default=0)),
+                ('project_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='projects.projecttype')),
+            ],
+            options={
+                'unique_together': {('day', 'project_type')},
+            },
+        ),
+    ]
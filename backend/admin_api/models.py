@@ -1,6 +1,9 @@
 # admin_api/models.py
 from django.db import models
 
+from projects.anthropic.profiles import clear_profile_cache
+from projects.throttles import clear_quota_cache
+
 
 class Settings(models.Model):
     """
@@ -15,6 +18,14 @@ class Settings(models.Model):
     primary_color = models.CharField(max_length=20, default="#4f46e5")
     accent_color = models.CharField(max_length=20, default="#10b981")
     
+    # LLM generation profiles per task, optionally per project type
+    # (see projects.anthropic.profiles for the format)
+    generation_profiles = models.JSONField(default=dict, blank=True)
+    
+    # Rate limits and daily token quotas of the LLM-triggering endpoints,
+    # optionally per role and user (see projects.throttles for the format)
+    llm_quotas = models.JSONField(default=dict, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -26,7 +37,10 @@ class Settings(models.Model):
         # Ensure only one settings instance exists
         if not self.pk and Settings.objects.exists():
             raise ValueError("Only one Settings instance is allowed.")
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        clear_profile_cache()
+        clear_quota_cache()
+        return result
 
     @classmethod
     def get_settings(cls):
@@ -36,3 +50,51 @@ class Settings(models.Model):
 
     def __str__(self):
         return "System Settings"
+
+
+class StatCounter(models.Model):
+    """
+    One running count behind the admin dashboard, kept current by
+    admin_api.stats: an all-time total ("projects") or a day's bucket
+    ("projects@2026-10-18").
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+
+class DailyRollup(models.Model):
+    """
+    One day's activity of one project type, built by admin_api.analytics for
+    the analytics endpoints. Days are local dates (TIME_ZONE).
+    """
+    day = models.DateField()
+    project_type = models.ForeignKey('projects.ProjectType', on_delete=models.CASCADE)
+    # Projects created on the day, and how many of them have a report by now.
+    projects_created = models.PositiveIntegerField(default=0)
+    interviews_completed = models.PositiveIntegerField(default=0)
+    reports_generated = models.PositiveIntegerField(default=0)
+    # AI questions created on the day, and the projects they were for.
+    ai_questions = models.PositiveIntegerField(default=0)
+    ai_question_projects = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'project_type')
+
+
+class RollupState(models.Model):
+    """Singleton: how far ``DailyRollup`` has been built."""
+    processed_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def get_state(cls):
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+
+class DirtyRollupDay(models.Model):
+    """A day whose rollups a deletion made stale, rebuilt on the next run."""
+    day = models.DateField(primary_key=True)
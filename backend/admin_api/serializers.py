@@ -1,16 +1,36 @@
 # admin_api/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.password_validation import validate_password
 from projects.models import (
     ProjectType, Project, Question, Answer, 
-    AI_Question, AI_Answer, Project_Report
+    AI_Question, AI_Answer, Project_Report, ReportBatch, ReportBatchItem
 )
+from projects.anthropic.profiles import DEFAULT_PROFILES, validate_profiles
+from projects.throttles import default_quota, validate_quotas
 from .models import Settings
 
 User = get_user_model()
 
 
+def count_of(queryset, field):
+    """
+    Per-row count of ``queryset`` rows whose ``field`` is the outer row, as a
+    subquery. Unlike ``Count`` over a join, several of these can annotate the
+    same queryset without multiplying each other's rows.
+    """
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def annotated_count(obj, name, queryset):
+    """The ``name`` annotation of ``obj`` when its queryset carries it, else counted now."""
+    value = getattr(obj, name, None)
+    return queryset.count() if value is None else value
+
+
 class AdminUserSerializer(serializers.ModelSerializer):
     """Serializer for user management with project counts."""
     project_count = serializers.SerializerMethodField()
@@ -18,14 +38,19 @@ class AdminUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
-            'id', 'username', 'name', 'email', 'role', 'enabled',
+            'id', 'username', 'name', 'email', 'role', 'enabled', 'llm_weight',
             'date_joined', 'last_login', 'created_at', 'updated_at',
             'project_count'
         ]
         read_only_fields = ['id', 'date_joined', 'last_login', 'created_at', 'updated_at']
     
+    @staticmethod
+    def annotate(queryset):
+        """Adds what the method fields read, so a list costs one query."""
+        return queryset.annotate(project_count=Count('project'))
+    
     def get_project_count(self, obj):
-        return Project.objects.filter(user=obj).count()
+        return annotated_count(obj, 'project_count', Project.objects.filter(user=obj))
 
 
 class AdminUserCreateSerializer(serializers.ModelSerializer):
@@ -34,7 +59,7 @@ class AdminUserCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = User
-        fields = ['id', 'username', 'name', 'email', 'role', 'enabled', 'password']
+        fields = ['id', 'username', 'name', 'email', 'role', 'enabled', 'llm_weight', 'password']
     
     def validate_email(self, value):
         if User.objects.filter(email__iexact=value).exists():
@@ -61,7 +86,7 @@ class AdminUserUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = User
-        fields = ['id', 'username', 'name', 'email', 'role', 'enabled', 'password']
+        fields = ['id', 'username', 'name', 'email', 'role', 'enabled', 'llm_weight', 'password']
         read_only_fields = ['id']
     
     def validate_email(self, value):
@@ -107,11 +132,19 @@ class AdminProjectTypeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    @staticmethod
+    def annotate(queryset):
+        """Adds what the method fields read, so a list costs one query."""
+        return queryset.annotate(
+            question_count=count_of(Question.objects.all(), 'project_type'),
+            project_count=count_of(Project.objects.all(), 'project_type'),
+        )
+    
     def get_question_count(self, obj):
-        return Question.objects.filter(project_type=obj).count()
+        return annotated_count(obj, 'question_count', Question.objects.filter(project_type=obj))
     
     def get_project_count(self, obj):
-        return Project.objects.filter(project_type=obj).count()
+        return annotated_count(obj, 'project_count', Project.objects.filter(project_type=obj))
 
 
 class AdminProjectSerializer(serializers.ModelSerializer):
@@ -135,7 +168,16 @@ class AdminProjectSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    @staticmethod
+    def annotate(queryset):
+        """Adds what the method fields read, so a list costs one query."""
+        return queryset.select_related('user', 'project_type').annotate(
+            has_report=Exists(Project_Report.objects.filter(project=OuterRef('pk')))
+        )
+    
     def get_has_report(self, obj):
+        if hasattr(obj, 'has_report'):
+            return obj.has_report
         return Project_Report.objects.filter(project=obj).exists()
 
 
@@ -170,11 +212,16 @@ class AdminAIQuestionSerializer(serializers.ModelSerializer):
             'answer_count', 'status'
         ]
     
+    @staticmethod
+    def annotate(queryset):
+        """Adds what the method fields read, so a list costs one query."""
+        return queryset.select_related('project').annotate(answer_count=Count('ai_answer'))
+    
     def get_answer_count(self, obj):
-        return AI_Answer.objects.filter(ai_question=obj).count()
+        return annotated_count(obj, 'answer_count', AI_Answer.objects.filter(ai_question=obj))
     
     def get_status(self, obj):
-        if AI_Answer.objects.filter(ai_question=obj).exists():
+        if self.get_answer_count(obj):
             return 'answered'
         return 'pending'
 
@@ -189,35 +236,90 @@ class NestedProjectSerializer(serializers.ModelSerializer):
 
 
 class AdminReportSerializer(serializers.ModelSerializer):
-    """Report with project and client info."""
+    """Report summary with project and client info; the document is left out of lists."""
     project = NestedProjectSerializer(read_only=True)
     format = serializers.SerializerMethodField()
-    status = serializers.SerializerMethodField()
     
     class Meta:
         model = Project_Report
         fields = [
-            'id', 'project', 'report', 'created_at', 'updated_at',
-            'format', 'status'
+            'id', 'project', 'size', 'content_hash', 'excerpt',
+            'created_at', 'updated_at', 'format', 'status'
         ]
     
     def get_format(self, obj):
         return 'PDF'  # Default format
+
+
+class AdminReportDetailSerializer(AdminReportSerializer):
+    """Report with its full document."""
+    class Meta(AdminReportSerializer.Meta):
+        fields = AdminReportSerializer.Meta.fields + ['report']
+
+
+class AdminReportBatchItemSerializer(serializers.ModelSerializer):
+    """Outcome of one project in a bulk regeneration batch."""
+    project = NestedProjectSerializer(read_only=True)
     
-    def get_status(self, obj):
-        return 'ready' if obj.report else 'pending'
+    class Meta:
+        model = ReportBatchItem
+        fields = ['id', 'project', 'status', 'sections', 'errors', 'report', 'updated_at']
+
+
+class AdminReportBatchSerializer(serializers.ModelSerializer):
+    """Bulk regeneration batch with its progress counters."""
+    class Meta:
+        model = ReportBatch
+        fields = [
+            'id', 'filters', 'force', 'status', 'anthropic_batch_id', 'request_counts',
+            'total_projects', 'succeeded_projects', 'failed_projects', 'error',
+            'submitted_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+
+
+class AdminReportBatchDetailSerializer(AdminReportBatchSerializer):
+    """Bulk regeneration batch including per-project results."""
+    items = AdminReportBatchItemSerializer(many=True, read_only=True)
+    
+    class Meta(AdminReportBatchSerializer.Meta):
+        fields = AdminReportBatchSerializer.Meta.fields + ['items']
 
 
 class SettingsSerializer(serializers.ModelSerializer):
-    """Settings serializer for feature flags and branding."""
+    """Settings serializer for feature flags, branding, LLM generation profiles and quotas."""
+    default_generation_profiles = serializers.SerializerMethodField()
+    default_llm_quota = serializers.SerializerMethodField()
+    
     class Meta:
         model = Settings
         fields = [
             'id', 'ai_questions_enabled', 'voice_input_enabled',
             'report_regeneration_enabled', 'primary_color', 'accent_color',
+            'generation_profiles', 'default_generation_profiles',
+            'llm_quotas', 'default_llm_quota',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def get_default_generation_profiles(self, obj):
+        return DEFAULT_PROFILES
+    
+    def get_default_llm_quota(self, obj):
+        return default_quota()
+    
+    def validate_generation_profiles(self, value):
+        try:
+            validate_profiles(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+    
+    def validate_llm_quotas(self, value):
+        try:
+            validate_quotas(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
 
 
 class AdminDashboardStatsSerializer(serializers.Serializer):
@@ -0,0 +1,207 @@
+import datetime
+import functools
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from projects.models import AI_Question, Project, Project_Report, ProjectType, Question
+from users.models import User
+
+from .models import StatCounter
+
+# Dashboard figures and the counters they read. Totals are kept all-time;
+# the weekly figures sum the daily buckets of the last WINDOW_DAYS days.
+TOTALS = {
+    "total_users": "users",
+    "total_projects": "projects",
+    "total_reports": "reports",
+    "total_ai_questions": "ai_questions",
+    "active_projects": "active_projects",
+    "project_types_count": "enabled_project_types",
+    "questions_count": "enabled_questions",
+}
+WEEKLY = {
+    "new_users_this_week": "users",
+    "new_projects_this_week": "projects",
+    "reports_this_week": "reports",
+}
+WINDOW_DAYS = 7
+ACTIVE_PROJECT_STATUSES = ("proposed", "called")
+
+CACHE_KEY = "admin-dashboard-stats"
+
+
+def bucket_key(name: str, day: datetime.date) -> str:
+    return f"{name}@{day.isoformat()}"
+
+
+def window_days() -> list:
+    today = timezone.localdate()
+    return [today - datetime.timedelta(days=offset) for offset in range(WINDOW_DAYS)]
+
+
+def _bucket(name: str, moment) -> dict:
+    # Buckets older than the window are never read again, so they are not kept.
+    day = timezone.localdate(moment)
+    if day <= timezone.localdate() - datetime.timedelta(days=WINDOW_DAYS):
+        return {}
+    return {bucket_key(name, day): 1}
+
+
+# Per model: the counts a row adds while it exists, and the counts that depend
+# on fields an update can change (with those fields).
+TRACKED = {
+    User: (lambda user: {"users": 1, **_bucket("users", user.date_joined)}, None, ()),
+    Project: (
+        lambda project: {"projects": 1, **_bucket("projects", project.created_at)},
+        lambda state: {"active_projects": int(state["status"] in ACTIVE_PROJECT_STATUSES)},
+        ("status",),
+    ),
+    Project_Report: (lambda report: {"reports": 1, **_bucket("reports", report.created_at)}, None, ()),
+    AI_Question: (lambda ai_question: {"ai_questions": 1}, None, ()),
+    ProjectType: (lambda project_type: {}, lambda state: {"enabled_project_types": int(state["enabled"])}, ("enabled",)),
+    Question: (lambda question: {}, lambda state: {"enabled_questions": int(state["enabled"])}, ("enabled",)),
+}
+
+
+def _merge(*parts) -> dict:
+    counts = {}
+    for part in parts:
+        for key, value in part.items():
+            counts[key] = counts.get(key, 0) + value
+    return counts
+
+
+def _negate(counts: dict) -> dict:
+    return {key: -value for key, value in counts.items()}
+
+
+def _mutable_counts(instance) -> dict:
+    _, mutable, fields = TRACKED[type(instance)]
+    return mutable({field: getattr(instance, field) for field in fields}) if mutable else {}
+
+
+def _row_counts(instance) -> dict:
+    return _merge(TRACKED[type(instance)][0](instance), _mutable_counts(instance))
+
+
+def add(counts: dict):
+    """
+    Adds ``{key: delta}`` to the counters once the caller's transaction
+    commits, so a rolled back write takes its counts with it and writers do
+    not hold the shared counter rows locked for the rest of their transaction.
+    Counts lost between a commit and its update are repaired by
+    ``rebuild_dashboard_stats``.
+    """
+    counts = {key: delta for key, delta in counts.items() if delta}
+    if counts:
+        transaction.on_commit(functools.partial(_apply, counts), robust=True)
+
+
+def _apply(counts: dict):
+    # A fixed key order keeps concurrent updates from deadlocking on the rows.
+    for key, delta in sorted(counts.items()):
+        if StatCounter.objects.filter(key=key).update(value=F("value") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                StatCounter.objects.create(key=key, value=delta)
+        except IntegrityError:
+            StatCounter.objects.filter(key=key).update(value=F("value") + delta)
+
+
+def record_bulk_create(instances: list):
+    """Counts rows inserted with ``bulk_create``, which sends no signals."""
+    add(_merge(*(_row_counts(instance) for instance in instances)))
+
+
+def remember_state(sender, instance, update_fields=None, **kwargs):
+    _, mutable, fields = TRACKED[sender]
+    if not mutable or instance._state.adding or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    previous = sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+    instance._stats_previous = mutable(previous) if previous else None
+
+
+def count_save(sender, instance, created, **kwargs):
+    if created:
+        add(_row_counts(instance))
+        return
+    previous = instance.__dict__.pop("_stats_previous", None)
+    if previous is not None:
+        add(_merge(_mutable_counts(instance), _negate(previous)))
+
+
+def count_delete(sender, instance, **kwargs):
+    add(_negate(_row_counts(instance)))
+
+
+def connect_signals():
+    for model in TRACKED:
+        pre_save.connect(remember_state, sender=model, dispatch_uid=f"stats-pre-save-{model._meta.label}")
+        post_save.connect(count_save, sender=model, dispatch_uid=f"stats-save-{model._meta.label}")
+        post_delete.connect(count_delete, sender=model, dispatch_uid=f"stats-delete-{model._meta.label}")
+
+
+def rebuild_counters(apps=global_apps) -> dict:
+    """
+    Recomputes every counter from the tables (initial fill, or repair after
+    writes that bypassed the signals, such as ``QuerySet.update``). Writes
+    that land while it runs may be missed, so run it when traffic is low.
+    """
+    models = {
+        name: apps.get_model(label)
+        for name, label in (
+            ("users", "users.User"), ("projects", "projects.Project"), ("reports", "projects.Project_Report"),
+            ("ai_questions", "projects.AI_Question"), ("project_types", "projects.ProjectType"),
+            ("questions", "projects.Question"),
+        )
+    }
+    counts = {
+        "users": models["users"].objects.count(),
+        "projects": models["projects"].objects.count(),
+        "reports": models["reports"].objects.count(),
+        "ai_questions": models["ai_questions"].objects.count(),
+        "active_projects": models["projects"].objects.filter(status__in=ACTIVE_PROJECT_STATUSES).count(),
+        "enabled_project_types": models["project_types"].objects.filter(enabled=True).count(),
+        "enabled_questions": models["questions"].objects.filter(enabled=True).count(),
+    }
+    start = timezone.make_aware(datetime.datetime.combine(window_days()[-1], datetime.time.min))
+    for name, field in (("users", "date_joined"), ("projects", "created_at"), ("reports", "created_at")):
+        days = (
+            models[name].objects.filter(**{f"{field}__gte": start})
+            .annotate(day=TruncDate(field)).order_by().values("day").annotate(n=Count("pk"))
+        )
+        counts.update({bucket_key(name, row["day"]): row["n"] for row in days})
+
+    Counter = apps.get_model("admin_api", "StatCounter")
+    with transaction.atomic():
+        Counter.objects.all().delete()
+        Counter.objects.bulk_create([Counter(key=key, value=value) for key, value in counts.items()])
+    return counts
+
+
+def dashboard_stats() -> dict:
+    """
+    The dashboard figures from one read of the counters, cached for
+    ``DASHBOARD_STATS_CACHE_TTL`` seconds.
+    """
+    stats = cache.get(CACHE_KEY)
+    if stats is not None:
+        return stats
+
+    days = window_days()
+    keys = {*TOTALS.values(), *(bucket_key(name, day) for name in WEEKLY.values() for day in days)}
+    values = dict(StatCounter.objects.filter(key__in=keys).values_list("key", "value"))
+    stats = {field: values.get(name, 0) for field, name in TOTALS.items()}
+    stats.update({
+        field: sum(values.get(bucket_key(name, day), 0) for day in days) for field, name in WEEKLY.items()
+    })
+    cache.set(CACHE_KEY, stats, settings.DASHBOARD_STATS_CACHE_TTL)
+    return stats
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .analytics import run_rollup
+
+
+@shared_task(ignore_result=True)
+def rollup_analytics_task():
+    """Rebuilds the analytics rollups of the days changed since the last run (on the beat schedule)."""
+    run_rollup()
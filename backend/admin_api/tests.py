@@ -1,3 +1,378 @@
-from django.test import TestCase
+from datetime import timedelta
+import hashlib
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from projects.anthropic.profiles import DEFAULT_PROFILES, clear_profile_cache, get_generation_profile
+from projects.models import AI_Answer, AI_Question, LLMCall, Project, Project_Report, ProjectType, Question
+from projects.utils import save_ai_questions
+from users.models import User
+
+from .analytics import run_rollup
+from .models import Settings
+from .stats import rebuild_counters
+
+
+class AdminListQueryCountTests(TestCase):
+    """The admin list endpoints run the same number of queries however many rows they return."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=cls.admin).key}'}
+        cls.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            number = self.rows = self.rows + 1
+            user = User.objects.create_user(username=f'client{number}', email=f'client{number}@example.com', password='x')
+            project_type = ProjectType.objects.create(name=f'Type {number}', description='')
+            Question.objects.create(project_type=project_type, text='What are you building?', question_no=1)
+            project = Project.objects.create(user=user, project_type=project_type, name=f'Project {number}')
+            if number % 2:
+                Project_Report.objects.create(project=project, report='Report')
+            question = AI_Question.objects.create(project=project, text='Who are your users?', question_no=1)
+            if number % 2:
+                AI_Answer.objects.create(ai_question=question, user=user, text='Shoppers')
+
+    def assert_constant_queries(self, url, field, expected):
+        self.add_rows(2)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.add_rows(8)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row[field] for row in response.json()['results']}
+
+    # Each request: the token lookup, the total count and the page of rows.
+
+    def test_users(self):
+        counts = self.assert_constant_queries('/api/admin/users/', 'project_count', 3)
+        self.assertEqual(counts[self.admin.pk], 0)
+        self.assertEqual(set(counts.values()), {0, 1})
+
+    def test_project_types(self):
+        # Not paginated (a short list the admin pages load whole), so counted from the rows.
+        self.assert_constant_queries('/api/admin/project-types/', 'question_count', 2)
+        response = self.client.get('/api/admin/project-types/', headers=self.headers)
+        for row in response.json()['results']:
+            self.assertEqual((row['question_count'], row['project_count']), (1, 1))
+
+    def test_projects(self):
+        has_report = self.assert_constant_queries('/api/admin/projects/', 'has_report', 3)
+        self.assertEqual(sum(has_report.values()), 5)
+        response = self.client.get('/api/admin/projects/?has_report=false', headers=self.headers)
+        self.assertEqual(response.json()['count'], 5)
+
+    def test_ai_questions(self):
+        statuses = self.assert_constant_queries('/api/admin/ai-questions/', 'status', 3)
+        self.assertEqual(sorted(statuses.values()), ['answered'] * 5 + ['pending'] * 5)
+        response = self.client.get('/api/admin/ai-questions/?answered=true', headers=self.headers)
+        self.assertEqual({row['answer_count'] for row in response.json()['results']}, {1})
+
+
+class AdminListPaginationTests(TestCase):
+    """Admin lists are served in keyset pages that, followed through ``next``, cover every row once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+        project_type = ProjectType.objects.create(name='Web', description='')
+        for number in range(7):
+            Project.objects.create(user=admin, project_type=project_type, name=f'Project {number}')
+        # Rows created in the same instant are ordered by id.
+        Project.objects.update(created_at=Project.objects.first().created_at)
+
+    def test_pages_cover_all_rows(self):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/api/admin/projects/', params, headers=self.headers)
+            body = response.json()
+            self.assertEqual(body['count'], 7)
+            self.assertLessEqual(len(body['results']), 3)
+            ids += [row['id'] for row in body['results']]
+            cursor = body['next']
+            if not cursor:
+                break
+        self.assertEqual(ids, sorted(Project.objects.values_list('id', flat=True), reverse=True))
+
+    def test_count_modes(self):
+        response = self.client.get('/api/admin/projects/', {'count': 'none'}, headers=self.headers)
+        self.assertIsNone(response.json()['count'])
+        response = self.client.get('/api/admin/projects/', {'count': 'estimate'}, headers=self.headers)
+        self.assertEqual(response.json()['count'], 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/admin/projects/', {'cursor': 'nonsense'}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(DASHBOARD_STATS_CACHE_TTL=0)
+class DashboardStatsTests(TestCase):
+    """The dashboard reads counters that signals keep equal to counting the tables."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Counters are updated when the writing transaction commits.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.admin = User.objects.create_user(
+                username='admin', email='admin@example.com', password='x', role='admin'
+            )
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=cls.admin).key}'}
+
+    def counted(self):
+        week_ago = timezone.now() - timedelta(days=7)
+        return {
+            'total_users': User.objects.count(),
+            'total_projects': Project.objects.count(),
+            'total_reports': Project_Report.objects.count(),
+            'total_ai_questions': AI_Question.objects.count(),
+            'new_users_this_week': User.objects.filter(date_joined__gte=week_ago).count(),
+            'new_projects_this_week': Project.objects.filter(created_at__gte=week_ago).count(),
+            'reports_this_week': Project_Report.objects.filter(created_at__gte=week_ago).count(),
+            'active_projects': Project.objects.filter(status__in=['proposed', 'called']).count(),
+            'project_types_count': ProjectType.objects.filter(enabled=True).count(),
+            'questions_count': Question.objects.filter(enabled=True).count(),
+        }
+
+    def assert_dashboard_matches(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/admin/dashboard/', headers=self.headers)
+        self.assertEqual(response.json(), self.counted())
+
+    def test_counters_follow_writes(self):
+        self.assert_dashboard_matches()
+        with self.captureOnCommitCallbacks(execute=True):
+            project_type = ProjectType.objects.create(name='Web', description='')
+            question = Question.objects.create(project_type=project_type, text='What are you building?', question_no=1)
+            projects = [
+                Project.objects.create(user=self.admin, project_type=project_type, name=f'P{n}') for n in range(3)
+            ]
+            Project_Report.objects.create(project=projects[0], report='<p>Report</p>')
+            save_ai_questions(projects[1], [{'text': 'Who?', 'description': ''}, {'text': 'Why?', 'description': ''}])
+        self.assert_dashboard_matches()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            projects[2].status = 'converted'
+            projects[2].save()
+            question.enabled = False
+            question.save(update_fields=['enabled'])
+            projects[0].delete()
+        self.assert_dashboard_matches()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project_type.delete()
+        self.assert_dashboard_matches()
+
+    def test_rolled_back_write_is_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                ProjectType.objects.create(name='Web', description='')
+                raise RuntimeError
+        self.assert_dashboard_matches()
+
+    def test_rebuild(self):
+        Project.objects.create(
+            user=self.admin, project_type=ProjectType.objects.create(name='Web', description=''), name='P'
+        )
+        Project.objects.update(status='trash')
+        rebuild_counters()
+        self.assert_dashboard_matches()
+
+
+class ReportSummaryTests(TestCase):
+    """Report lists carry a summary computed at write time; only the detail serves the document."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+        project = Project.objects.create(user=admin, project_type=ProjectType.objects.create(name='Web', description=''), name='Shop')
+        cls.document = '<section><h1>Overview</h1><p>An online shoe shop.</p></section>'
+        cls.report = Project_Report.objects.create(project=project, report=cls.document)
+
+    def test_list_serves_summary(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/admin/reports/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('"projects_project_report"."report"' in query['sql'] for query in queries))
+        [row] = response.json()['results']
+        self.assertNotIn('report', row)
+        self.assertEqual(
+            (row['size'], row['content_hash'], row['excerpt'], row['status']),
+            (len(self.document), hashlib.sha256(self.document.encode()).hexdigest(), 'Overview An online shoe shop.', 'ready'),
+        )
+
+        detail = self.client.get(f'/api/admin/reports/{self.report.id}/', headers=self.headers).json()
+        self.assertEqual(detail['report'], self.document)
+
+    def test_summary_follows_partial_save(self):
+        self.report.report = ''
+        self.report.save(update_fields=['report'])
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.size, self.report.excerpt, self.report.status), (0, '', 'pending'))
+
+
+class GenerationProfileSettingsTests(TestCase):
+    """Generation profile overrides are validated before they reach the model calls."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+        cls.project_type = ProjectType.objects.create(name='Web', description='')
+
+    def setUp(self):
+        # Profiles are cached per process; later tests must not see this test's overrides.
+        self.addCleanup(clear_profile_cache)
+
+    def put_profiles(self, profiles):
+        return self.client.put(
+            '/api/admin/settings/', {'generation_profiles': profiles}, content_type='application/json', headers=self.headers
+        )
+
+    def test_invalid_overrides_rejected(self):
+        for profiles in (
+            {'questions': {'max_tokens': 0}},
+            {'report': {'temperature': 2}},
+            {'report': {'top_k': 5}},
+            {'summaries': {'model': 'm'}},
+            {'project_types': {'web': {'report': {'max_tokens': 8000}}}},
+            {'project_types': {str(self.project_type.id): {'report': {'stop_sequences': ['']}}}},
+        ):
+            with self.subTest(profiles=profiles):
+                response = self.put_profiles(profiles)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('generation_profiles', response.json())
+        self.assertEqual(Settings.get_settings().generation_profiles, {})
+
+    def test_override_applies_per_project_type(self):
+        profiles = {'report': {'temperature': 0.2}, 'project_types': {str(self.project_type.id): {'report': {'max_tokens': 8000}}}}
+        self.assertEqual(self.put_profiles(profiles).status_code, 200)
+        profile = get_generation_profile('report', self.project_type.id)
+        self.assertEqual((profile['temperature'], profile['max_tokens']), (0.2, 8000))
+        self.assertEqual(get_generation_profile('report')['max_tokens'], DEFAULT_PROFILES['report']['max_tokens'])
+
+
+class LLMUsageTests(TestCase):
+    """Usage groups carry their own latency percentiles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+        project_type = ProjectType.objects.create(name='Web', description='')
+        cls.fast, cls.slow = (Project.objects.create(user=admin, project_type=project_type, name=name) for name in 'AB')
+        LLMCall.objects.bulk_create(
+            [LLMCall(task='questions', project=cls.fast, model='m', latency_ms=ms, ttft_ms=10) for ms in range(100, 200)]
+            + [LLMCall(task='report', project=cls.slow, model='m', latency_ms=5000, cost_usd=1) for _ in range(3)]
+            + [LLMCall(task='report', model='m', outcome='error', latency_ms=99999)]
+        )
+
+    def usage(self, group_by):
+        response = self.client.get('/api/admin/llm/usage/', {'group_by': group_by}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return {row['group']: row for row in response.json()['results']}
+
+    def test_percentiles_per_group(self):
+        projects = self.usage('project')
+        self.assertEqual(projects[str(self.fast.pk)]['latency_ms'], {'p50': 150, 'p95': 194, 'p99': 198})
+        self.assertEqual(projects[str(self.slow.pk)]['latency_ms']['p99'], 5000)
+        self.assertIsNone(projects[str(self.slow.pk)]['ttft_ms']['p50'])
+        # Failed calls count as calls but not in the latencies.
+        self.assertEqual((projects[None]['calls'], projects[None]['latency_ms']['p50']), (1, None))
+        self.assertEqual(self.usage('day')[str(timezone.localdate())]['calls'], 104)
+
+    def test_invalid_group(self):
+        response = self.client.get('/api/admin/llm/usage/', {'group_by': 'user'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.json())
+
+
+class AnalyticsRollupTests(TestCase):
+    """The analytics endpoints serve what the rollup job computed from the tables."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        cls.headers = {'Authorization': f'Token {Token.objects.create(user=cls.admin).key}'}
+        cls.web = ProjectType.objects.create(name='Web', description='')
+        cls.mobile = ProjectType.objects.create(name='Mobile', description='')
+        cls.today = timezone.localdate()
+
+    def create_project(self, project_type, days_ago, report=False, ai_questions=0):
+        project = Project.objects.create(user=self.admin, project_type=project_type, name='P')
+        Project.objects.filter(pk=project.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        if report:
+            Project_Report.objects.create(project=project, report='<p>Report</p>')
+        if ai_questions:
+            save_ai_questions(project, [{'text': 'Q', 'description': ''}] * ai_questions)
+        return project
+
+    def daily(self, **params):
+        response = self.client.get('/api/admin/analytics/daily/', params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return {row['day']: row for row in response.json()['results']}
+
+    def test_rollups(self):
+        self.create_project(self.web, 2, report=True, ai_questions=3)
+        self.create_project(self.web, 2)
+        self.create_project(self.mobile, 2, ai_questions=1)
+        self.create_project(self.mobile, 0, report=True)
+        self.assertEqual(run_rollup(), 2)
+
+        two_days_ago = (self.today - timedelta(days=2)).isoformat()
+        days = self.daily(start=two_days_ago)
+        self.assertEqual(len(days), 3)
+        self.assertEqual(days[two_days_ago]['projects_created'], 3)
+        self.assertEqual(days[two_days_ago]['interviews_completed'], 1)
+        # Reports and AI questions count on the day they were created: today.
+        self.assertEqual(days[self.today.isoformat()]['reports_generated'], 2)
+        self.assertEqual(days[self.today.isoformat()]['ai_questions_per_project'], 2.0)
+        self.assertIsNone(days[(self.today - timedelta(days=1)).isoformat()]['completion_rate'])
+        self.assertEqual(self.daily(start=two_days_ago, project_type=self.web.pk)[two_days_ago]['projects_created'], 2)
+
+        response = self.client.get('/api/admin/analytics/project-types/', {'start': two_days_ago}, headers=self.headers)
+        summary = {row['project_type']['name']: row for row in response.json()['results']}
+        self.assertEqual(summary['Web']['completion_rate'], 0.5)
+        self.assertEqual(summary['Mobile']['completion_rate'], 0.5)
+
+    def test_project_asked_on_two_days_counts_once(self):
+        project = self.create_project(self.web, 1, ai_questions=2)
+        AI_Question.objects.filter(project=project, question_no=1).update(created_at=timezone.now() - timedelta(days=1))
+        run_rollup()
+
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        self.assertEqual(self.daily(start=yesterday)[yesterday]['ai_questions_per_project'], 1.0)
+        response = self.client.get('/api/admin/analytics/project-types/', {'start': yesterday}, headers=self.headers)
+        web = response.json()['results'][0]
+        self.assertEqual((web['ai_questions'], web['ai_question_projects'], web['ai_questions_per_project']), (2, 1, 2.0))
+
+    def test_incremental_runs(self):
+        project = self.create_project(self.web, 5)
+        run_rollup()
+        # Nothing changed: no day is rebuilt.
+        self.assertEqual(run_rollup(), 0)
+
+        # A report today changes today and the project's day.
+        Project_Report.objects.create(project=project, report='<p>Report</p>')
+        self.assertEqual(run_rollup(), 2)
+        five_days_ago = (self.today - timedelta(days=5)).isoformat()
+        self.assertEqual(self.daily(start=five_days_ago)[five_days_ago]['interviews_completed'], 1)
+
+        project.delete()
+        self.assertEqual(run_rollup(), 2)
+        self.assertEqual(self.daily(start=five_days_ago)[five_days_ago]['projects_created'], 0)
+
+    def test_invalid_range(self):
+        response = self.client.get('/api/admin/analytics/daily/', {'start': '2026-02-01', 'end': '2026-01-01'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'detail': 'start must not be after end.'})
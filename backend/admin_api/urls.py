@@ -1,4 +1,5 @@
 # admin_api/urls.py
+from django.conf import settings
 from django.urls import path
 from .views import (
     AdminDashboardView,
@@ -8,8 +9,15 @@ from .views import (
     AdminQuestionsView, AdminQuestionDetailView, AdminQuestionToggleView, AdminQuestionReorderView,
     AdminAIQuestionsView,
     AdminReportsView, AdminReportDetailView, AdminReportRegenerateView,
+    AdminReportBatchesView, AdminReportBatchDetailView,
+    AdminLLMCacheView, AdminLLMHealthView, AdminLLMUsageView,
+    AdminAnalyticsDailyView, AdminAnalyticsProjectTypesView,
     AdminSettingsView
 )
+from .async_views import AsyncAdminReportRegenerateView
+
+if settings.ASYNC_VIEWS:
+    AdminReportRegenerateView = AsyncAdminReportRegenerateView
 
 urlpatterns = [
     # Dashboard
@@ -42,6 +50,17 @@ urlpatterns = [
     path('reports/', AdminReportsView.as_view(), name='admin-reports'),
     path('reports/<int:pk>/', AdminReportDetailView.as_view(), name='admin-report-detail'),
     path('reports/<int:pk>/regenerate/', AdminReportRegenerateView.as_view(), name='admin-report-regenerate'),
+    path('reports/batches/', AdminReportBatchesView.as_view(), name='admin-report-batches'),
+    path('reports/batches/<int:pk>/', AdminReportBatchDetailView.as_view(), name='admin-report-batch-detail'),
+    
+    # LLM
+    path('llm/cache/', AdminLLMCacheView.as_view(), name='admin-llm-cache'),
+    path('llm/health/', AdminLLMHealthView.as_view(), name='admin-llm-health'),
+    path('llm/usage/', AdminLLMUsageView.as_view(), name='admin-llm-usage'),
+    
+    # Analytics
+    path('analytics/daily/', AdminAnalyticsDailyView.as_view(), name='admin-analytics-daily'),
+    path('analytics/project-types/', AdminAnalyticsProjectTypesView.as_view(), name='admin-analytics-project-types'),
     
     # Settings
     path('settings/', AdminSettingsView.as_view(), name='admin-settings'),
@@ -5,23 +5,34 @@ from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
+from django.db import connection
+from django.db.models import Aggregate, Count, Q, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from collections import defaultdict
 
 from projects.models import (
     ProjectType, Project, Question, Answer,
-    AI_Question, AI_Answer, Project_Report
+    AI_Question, AI_Answer, Project_Report, ReportBatch, LLMCall
 )
-from projects.anthropic.prompt import anthropic_prompt
-
-from .models import Settings
+from projects.anthropic.cache import response_cache
+from projects.anthropic.gateway import gateway
+from projects.serializers import ReportJobSerializer
+from projects.batches import clean_batch_filters, filter_projects
+from projects.pagination import KeysetPagination
+from projects.tasks import enqueue_report_batch, enqueue_report_job
+from projects.throttles import LLM_THROTTLES
+
+from .analytics import MAX_RANGE_DAYS, daily_series, project_type_summary
+from .models import RollupState, Settings
 from .permissions import IsAdminUser
+from .stats import dashboard_stats
 from .serializers import (
     AdminUserSerializer, AdminUserCreateSerializer, AdminUserUpdateSerializer,
     AdminProjectTypeSerializer, AdminProjectSerializer, AdminQuestionSerializer,
-    AdminAIQuestionSerializer, AdminReportSerializer, SettingsSerializer,
-    AdminDashboardStatsSerializer
+    AdminAIQuestionSerializer, AdminReportSerializer, AdminReportDetailSerializer, SettingsSerializer,
+    AdminDashboardStatsSerializer, AdminReportBatchSerializer, AdminReportBatchDetailSerializer
 )
 
 User = get_user_model()
@@ -33,23 +44,7 @@ class AdminDashboardView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        now = timezone.now()
-        week_ago = now - timedelta(days=7)
-        
-        stats = {
-            'total_users': User.objects.count(),
-            'total_projects': Project.objects.count(),
-            'total_reports': Project_Report.objects.count(),
-            'total_ai_questions': AI_Question.objects.count(),
-            'new_users_this_week': User.objects.filter(date_joined__gte=week_ago).count(),
-            'new_projects_this_week': Project.objects.filter(created_at__gte=week_ago).count(),
-            'reports_this_week': Project_Report.objects.filter(created_at__gte=week_ago).count(),
-            'active_projects': Project.objects.filter(status__in=['proposed', 'called']).count(),
-            'project_types_count': ProjectType.objects.filter(enabled=True).count(),
-            'questions_count': Question.objects.filter(enabled=True).count(),
-        }
-        
-        serializer = AdminDashboardStatsSerializer(stats)
+        serializer = AdminDashboardStatsSerializer(dashboard_stats())
         return Response(serializer.data)
 
 
@@ -61,7 +56,7 @@ class AdminUsersView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        users = User.objects.all().order_by('-date_joined')
+        users = AdminUserSerializer.annotate(User.objects.all())
         
         # Filtering
         role = request.query_params.get('role')
@@ -79,11 +74,9 @@ class AdminUsersView(APIView):
                 Q(username__icontains=search)
             )
         
-        serializer = AdminUserSerializer(users, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': users.count()
-        })
+        paginator = KeysetPagination(('-date_joined', '-id'))
+        serializer = AdminUserSerializer(paginator.paginate_queryset(users, request), many=True)
+        return Response(paginator.get_response_data(serializer.data))
 
     def post(self, request):
         serializer = AdminUserCreateSerializer(data=request.data)
@@ -103,7 +96,7 @@ class AdminUserDetailView(APIView):
 
     def get_object(self, pk):
         try:
-            return User.objects.get(pk=pk)
+            return AdminUserSerializer.annotate(User.objects.all()).get(pk=pk)
         except User.DoesNotExist:
             return None
 
@@ -154,7 +147,7 @@ class AdminUserToggleView(APIView):
 
     def post(self, request, pk):
         try:
-            user = User.objects.get(pk=pk)
+            user = AdminUserSerializer.annotate(User.objects.all()).get(pk=pk)
         except User.DoesNotExist:
             return Response(
                 {'detail': 'User not found.'},
@@ -181,7 +174,7 @@ class AdminProjectTypesView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        project_types = ProjectType.objects.all().order_by('name')
+        project_types = AdminProjectTypeSerializer.annotate(ProjectType.objects.all()).order_by('name')
         
         enabled = request.query_params.get('enabled')
         if enabled is not None:
@@ -208,7 +201,7 @@ class AdminProjectTypeDetailView(APIView):
 
     def get_object(self, pk):
         try:
-            return ProjectType.objects.get(pk=pk)
+            return AdminProjectTypeSerializer.annotate(ProjectType.objects.all()).get(pk=pk)
         except ProjectType.DoesNotExist:
             return None
 
@@ -255,7 +248,7 @@ class AdminProjectTypeToggleView(APIView):
 
     def post(self, request, pk):
         try:
-            project_type = ProjectType.objects.get(pk=pk)
+            project_type = AdminProjectTypeSerializer.annotate(ProjectType.objects.all()).get(pk=pk)
         except ProjectType.DoesNotExist:
             return Response(
                 {'detail': 'Project type not found.'},
@@ -275,9 +268,7 @@ class AdminProjectsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        projects = Project.objects.all().select_related(
-            'user', 'project_type'
-        ).order_by('-created_at')
+        projects = AdminProjectSerializer.annotate(Project.objects.all())
         
         # Filtering
         status_filter = request.query_params.get('status')
@@ -290,11 +281,7 @@ class AdminProjectsView(APIView):
         if project_type:
             projects = projects.filter(project_type_id=project_type)
         if has_report is not None:
-            project_ids_with_reports = Project_Report.objects.values_list('project_id', flat=True)
-            if has_report.lower() == 'true':
-                projects = projects.filter(id__in=project_ids_with_reports)
-            else:
-                projects = projects.exclude(id__in=project_ids_with_reports)
+            projects = projects.filter(has_report=has_report.lower() == 'true')
         if search:
             projects = projects.filter(
                 Q(name__icontains=search) |
@@ -302,11 +289,9 @@ class AdminProjectsView(APIView):
                 Q(user__email__icontains=search)
             )
         
-        serializer = AdminProjectSerializer(projects, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': projects.count()
-        })
+        paginator = KeysetPagination(('-created_at', '-id'))
+        serializer = AdminProjectSerializer(paginator.paginate_queryset(projects, request), many=True)
+        return Response(paginator.get_response_data(serializer.data))
 
 
 class AdminProjectDetailView(APIView):
@@ -316,7 +301,7 @@ class AdminProjectDetailView(APIView):
 
     def get_object(self, pk):
         try:
-            return Project.objects.select_related('user', 'project_type').get(pk=pk)
+            return AdminProjectSerializer.annotate(Project.objects.all()).get(pk=pk)
         except Project.DoesNotExist:
             return None
 
@@ -362,9 +347,7 @@ class AdminQuestionsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        questions = Question.objects.all().select_related(
-            'project_type'
-        ).order_by('project_type', 'question_no')
+        questions = Question.objects.all().select_related('project_type')
         
         # Filtering
         project_type = request.query_params.get('project_type')
@@ -375,11 +358,9 @@ class AdminQuestionsView(APIView):
         if enabled is not None:
             questions = questions.filter(enabled=enabled.lower() == 'true')
         
-        serializer = AdminQuestionSerializer(questions, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': questions.count()
-        })
+        paginator = KeysetPagination(('project_type_id', 'question_no'))
+        serializer = AdminQuestionSerializer(paginator.paginate_queryset(questions, request), many=True)
+        return Response(paginator.get_response_data(serializer.data))
 
     def post(self, request):
         serializer = AdminQuestionSerializer(data=request.data)
@@ -496,9 +477,7 @@ class AdminAIQuestionsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        ai_questions = AI_Question.objects.all().select_related(
-            'project'
-        ).order_by('-created_at')
+        ai_questions = AdminAIQuestionSerializer.annotate(AI_Question.objects.all())
         
         # Filtering
         project_id = request.query_params.get('project')
@@ -507,17 +486,14 @@ class AdminAIQuestionsView(APIView):
         if project_id:
             ai_questions = ai_questions.filter(project_id=project_id)
         if answered is not None:
-            answered_ids = AI_Answer.objects.values_list('ai_question_id', flat=True)
             if answered.lower() == 'true':
-                ai_questions = ai_questions.filter(id__in=answered_ids)
+                ai_questions = ai_questions.filter(answer_count__gt=0)
             else:
-                ai_questions = ai_questions.exclude(id__in=answered_ids)
+                ai_questions = ai_questions.filter(answer_count=0)
         
-        serializer = AdminAIQuestionSerializer(ai_questions, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': ai_questions.count()
-        })
+        paginator = KeysetPagination(('-created_at', '-id'))
+        serializer = AdminAIQuestionSerializer(paginator.paginate_queryset(ai_questions, request), many=True)
+        return Response(paginator.get_response_data(serializer.data))
 
 
 # ================== Reports ==================
@@ -528,9 +504,7 @@ class AdminReportsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        reports = Project_Report.objects.all().select_related(
-            'project', 'project__user'
-        ).order_by('-created_at')
+        reports = Project_Report.objects.all().select_related('project', 'project__user').defer('report')
         
         # Filtering
         search = request.query_params.get('search')
@@ -541,11 +515,9 @@ class AdminReportsView(APIView):
                 Q(project__user__name__icontains=search)
             )
         
-        serializer = AdminReportSerializer(reports, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': reports.count()
-        })
+        paginator = KeysetPagination(('-created_at', '-id'))
+        serializer = AdminReportSerializer(paginator.paginate_queryset(reports, request), many=True)
+        return Response(paginator.get_response_data(serializer.data))
 
 
 class AdminReportDetailView(APIView):
@@ -568,7 +540,7 @@ class AdminReportDetailView(APIView):
                 {'detail': 'Report not found.'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        serializer = AdminReportSerializer(report)
+        serializer = AdminReportDetailSerializer(report)
         return Response(serializer.data)
 
     def delete(self, request, pk):
@@ -586,6 +558,7 @@ class AdminReportRegenerateView(APIView):
     """Regenerate report for a project."""
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated, IsAdminUser]
+    throttle_classes = LLM_THROTTLES
 
     def post(self, request, pk):
         """Regenerate report for project with given ID."""
@@ -605,50 +578,302 @@ class AdminReportRegenerateView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Delete existing report
-        Project_Report.objects.filter(project=project).delete()
+        if not Answer.objects.filter(project=project).exists() and not AI_Answer.objects.filter(
+            ai_question__project=project
+        ).exists():
+            return Response(
+                {'detail': 'No answers found for this project.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # "force" rewrites every section and skips the LLM response cache,
+        # e.g. to get a fresh take on an unchanged transcript
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+        
+        # Only sections whose answers changed are regenerated by the Celery task, the
+        # rest of the existing report is kept; poll /api/projects/report_job/<id>/ for progress.
+        job = enqueue_report_job(project, user=request.user, regenerate=True, bypass_cache=force)
+        serializer = ReportJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class AdminReportBatchesView(APIView):
+    """List bulk regeneration batches or start one for all projects matching a filter."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        batches = ReportBatch.objects.all().order_by('-created_at')
+        serializer = AdminReportBatchSerializer(batches, many=True)
+        return Response({
+            'results': serializer.data,
+            'count': batches.count()
+        })
+
+    def post(self, request):
+        """
+        Filters: project_type (id), status, created_after, created_before (YYYY-MM-DD).
+        "force" rewrites every section instead of only the stale ones.
+        """
+        settings = Settings.get_settings()
+        if not settings.report_regeneration_enabled:
+            return Response(
+                {'detail': 'Report regeneration is disabled.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
         
-        # Generate new report (using existing logic from projects app)
         try:
-            # Get all answers for this project
-            answers = Answer.objects.filter(project=project).select_related('question')
-            ai_answers = AI_Answer.objects.filter(
-                ai_question__project=project
-            ).select_related('ai_question')
-            
-            if not answers.exists() and not ai_answers.exists():
-                return Response(
-                    {'detail': 'No answers found for this project.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Build answers text
-            answer_text = ""
-            for answer in answers:
-                answer_text += f"Q: {answer.question.text}\nA: {answer.text}\n\n"
-            for ai_answer in ai_answers:
-                answer_text += f"Q (AI): {ai_answer.ai_question.text}\nA: {ai_answer.text}\n\n"
-            
-            # Generate report
-            report_content = anthropic_prompt(
-                f"Generate a comprehensive project requirements report for '{project.name}' "
-                f"(Type: {project.project_type.name}) based on these Q&A:\n\n{answer_text}"
+            filters = clean_batch_filters(request.data)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not filter_projects(filters).exists():
+            return Response(
+                {'detail': 'No answered projects match the filter.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            # Save report
-            report = Project_Report.objects.create(
-                project=project,
-                report=report_content
+        
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+        batch = enqueue_report_batch(filters, force=force, user=request.user)
+        serializer = AdminReportBatchSerializer(batch)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class AdminReportBatchDetailView(APIView):
+    """Progress and per-project failures of one bulk regeneration batch."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        try:
+            batch = ReportBatch.objects.prefetch_related('items__project__user').get(pk=pk)
+        except ReportBatch.DoesNotExist:
+            return Response(
+                {'detail': 'Batch not found.'},
+                status=status.HTTP_404_NOT_FOUND
             )
-            
-            serializer = AdminReportSerializer(report)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
+        serializer = AdminReportBatchDetailSerializer(batch)
+        return Response(serializer.data)
+
+
+class AdminLLMCacheView(APIView):
+    """LLM response cache and prompt cache counters; DELETE empties this process's L1 cache."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            **response_cache.stats(),
+            'prompt_cache': gateway.usage_stats(),
+        })
+
+    def delete(self, request):
+        response_cache.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AdminLLMHealthView(APIView):
+    """LLM call metrics of this process: retries, failures, latencies and circuit breaker state per model."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(gateway.resilience_stats())
+
+
+USAGE_GROUPS = {
+    'day': 'day',
+    'project_type': 'project_type__name',
+    'model': 'model',
+    'task': 'task',
+    'project': 'project',
+}
+
+
+PERCENTILES = (('p50', 50), ('p95', 95), ('p99', 99))
+# Most recent successful calls read to compute latency percentiles off PostgreSQL.
+USAGE_LATENCY_SAMPLES = 50000
+
+
+class Percentile(Aggregate):
+    """Nearest-rank percentile (``PERCENTILE_DISC``) of a column; PostgreSQL only."""
+    function = 'PERCENTILE_DISC'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, pct, **extra):
+        super().__init__(expression, fraction=pct / 100, **extra)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list; None when it is empty."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, round(pct / 100 * (len(samples) - 1)))]
+
+
+def latency_percentiles(calls, field, keys) -> dict:
+    """
+    ``{key: {"latency_ms": {...}, "ttft_ms": {...}}}`` of the successful
+    ``calls`` in the groups ``keys``, computed in Python from at most the
+    ``USAGE_LATENCY_SAMPLES`` most recent ones.
+    """
+    in_groups = Q(**{f'{field}__in': [key for key in keys if key is not None]})
+    if None in keys:
+        in_groups |= Q(**{f'{field}__isnull': True})
+    latencies = defaultdict(list)
+    first_tokens = defaultdict(list)
+    samples = calls.filter(in_groups, outcome='ok').order_by('-created_at').values_list(field, 'latency_ms', 'ttft_ms')
+    for key, latency_ms, ttft_ms in samples[:USAGE_LATENCY_SAMPLES]:
+        if latency_ms is not None:
+            latencies[key].append(latency_ms)
+        if ttft_ms is not None:
+            first_tokens[key].append(ttft_ms)
+    return {
+        key: {
+            'latency_ms': {name: percentile(sorted(latencies[key]), pct) for name, pct in PERCENTILES},
+            'ttft_ms': {name: percentile(sorted(first_tokens[key]), pct) for name, pct in PERCENTILES},
+        }
+        for key in keys
+    }
+
+
+class AdminLLMUsageView(APIView):
+    """
+    Token, cost and latency totals from the LLM call ledger, grouped by day,
+    project type, model, task or project (``?group_by=``) over the last
+    ``?days=`` days (default 30, at most 90). Latency percentiles are computed
+    by PostgreSQL; other databases sample the returned groups' recent calls.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'day')
+        if group_by not in USAGE_GROUPS:
             return Response(
-                {'detail': f'Failed to generate report: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'detail': f"group_by must be one of: {', '.join(USAGE_GROUPS)}."},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 90)
+        except ValueError:
+            return Response({'detail': 'days must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        field = USAGE_GROUPS[group_by]
+        calls = LLMCall.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        if group_by == 'day':
+            calls = calls.annotate(day=TruncDate('created_at'))
+
+        rows = calls.values(field).annotate(
+            calls=Count('id'),
+            errors=Count('id', filter=Q(outcome='error')),
+            input_tokens=Sum('input_tokens'),
+            output_tokens=Sum('output_tokens'),
+            cache_creation_tokens=Sum('cache_creation_tokens'),
+            cache_read_tokens=Sum('cache_read_tokens'),
+            cost_usd=Sum('cost_usd'),
+        ).order_by(field if group_by == 'day' else '-cost_usd')
+        in_database = connection.vendor == 'postgresql'
+        if in_database:
+            ok = Q(outcome='ok')
+            rows = rows.annotate(**{
+                f'{column}_{name}': Percentile(column, pct, filter=ok)
+                for column in ('latency_ms', 'ttft_ms') for name, pct in PERCENTILES
+            })
+        if group_by == 'project':
+            rows = rows[:50]
+        rows = list(rows)
+        if not in_database:
+            percentiles = latency_percentiles(calls, field, [row[field] for row in rows])
+
+        results = []
+        for row in rows:
+            key = row.pop(field)
+            if in_database:
+                latency = {
+                    column: {name: row.pop(f'{column}_{name}') for name, _ in PERCENTILES}
+                    for column in ('latency_ms', 'ttft_ms')
+                }
+            else:
+                latency = percentiles[key]
+            results.append({
+                'group': str(key) if key is not None else None,
+                **row,
+                'cost_usd': str(round(row['cost_usd'] or 0, 6)),
+                **latency,
+            })
+        return Response({'results': results, 'count': len(results), 'group_by': group_by, 'days': days})
+
+
+# ================== Analytics ==================
+
+def analytics_range(request):
+    """
+    ``(start, end)`` from ``?start=`` and ``?end=`` (ISO dates, inclusive;
+    default the last 30 days).
+
+    Raises:
+        ValueError: With a message for the client.
+    """
+    try:
+        end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+        start = (
+            date.fromisoformat(request.query_params['start']) if 'start' in request.query_params
+            else end - timedelta(days=29)
+        )
+    except ValueError:
+        raise ValueError('start and end must be dates like 2026-01-31.')
+    if start > end:
+        raise ValueError('start must not be after end.')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'The range may span at most {MAX_RANGE_DAYS} days.')
+    return start, end
+
+
+class AdminAnalyticsDailyView(APIView):
+    """
+    Projects created, interviews completed, reports generated and AI
+    questions per day over ``?start=``..``?end=``, optionally for one
+    ``?project_type=``, from the daily rollups.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            start, end = analytics_range(request)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        project_type = request.query_params.get('project_type')
+        if project_type and not project_type.isdigit():
+            return Response({'detail': 'project_type must be a project type id.'}, status=status.HTTP_400_BAD_REQUEST)
+        results = daily_series(start, end, project_type)
+        return Response({
+            'results': results,
+            'start': start,
+            'end': end,
+            'processed_until': RollupState.get_state().processed_until,
+        })
+
+
+class AdminAnalyticsProjectTypesView(APIView):
+    """Interview completion rate and AI questions per project for each project type over ``?start=``..``?end=``."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            start, end = analytics_range(request)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        results = project_type_summary(start, end)
+        return Response({
+            'results': results,
+            'count': len(results),
+            'start': start,
+            'end': end,
+            'processed_until': RollupState.get_state().processed_until,
+        })
 
 
 # ================== Settings ==================
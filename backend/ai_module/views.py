@@ -1,7 +1,7 @@
 from django.shortcuts import render
 from .models import AI_Question, AI_Answer
 from projects.models import Project, User, Question, Answer
-from anthropic.prompt import anthropic_prompt
+from .anthropic.prompt import anthropic_prompt
 # Create your views here.
 
 
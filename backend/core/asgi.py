@@ -9,8 +9,11 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# The LLM-bound endpoints switch to their async views under ASGI.
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+application = ASGIStaticFilesHandler(get_asgi_application())
@@ -61,6 +61,15 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",)
 }
 
+# Rows per page of the list endpoints (projects.pagination.KeysetPagination);
+# clients pass ?limit= up to LIST_MAX_PAGE_SIZE.
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "100"))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "500"))
+
+# Serve the LLM-bound endpoints with async views (projects.async_views). Set by
+# core.asgi; under WSGI the sync views are used.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -72,8 +81,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'projects.middleware.LLMLoadSheddingMiddleware',
+    'projects.middleware.LLMDeadlineMiddleware',
 ]
 
+if ASYNC_VIEWS:
+    # WhiteNoise is sync-only middleware, which would run every async view in
+    # the single request thread; core.asgi serves static files instead.
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -200,7 +216,201 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline (no broker/worker needed), e.g. for local development
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "False") == "True"
+
+# Daily analytics rollups (admin_api.analytics), rebuilt by Celery beat every
+# ANALYTICS_ROLLUP_INTERVAL seconds for the days that changed. Each run also
+# re-reads rows created up to ANALYTICS_ROLLUP_OVERLAP seconds before the
+# previous one, for transactions that committed late.
+ANALYTICS_ROLLUP_INTERVAL = int(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "300"))
+ANALYTICS_ROLLUP_OVERLAP = int(os.getenv("ANALYTICS_ROLLUP_OVERLAP", "600"))
+# Report jobs (projects.tasks) are also dispatched every REPORT_DISPATCH_INTERVAL
+# seconds, which first recovers jobs whose message or worker was lost.
+REPORT_DISPATCH_INTERVAL = int(os.getenv("REPORT_DISPATCH_INTERVAL", "60"))
+CELERY_BEAT_SCHEDULE = {
+    "rollup-analytics": {
+        "task": "admin_api.tasks.rollup_analytics_task",
+        "schedule": ANALYTICS_ROLLUP_INTERVAL,
+    },
+    "dispatch-report-jobs": {
+        "task": "projects.tasks.dispatch_report_jobs_task",
+        "schedule": REPORT_DISPATCH_INTERVAL,
+    },
+}
+
+# Caches: "llm" is the shared (L2) level of the LLM response cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # LLM responses and the LLM throttle counters. Defaults to the Redis of the
+    # shared rate limiter (ANTHROPIC_RATE_LIMIT_REDIS_URL).
+    "llm": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("LLM_CACHE_REDIS_URL")
+        or os.getenv("ANTHROPIC_RATE_LIMIT_REDIS_URL", "redis://localhost:6379/1"),
+        "OPTIONS": {
+            "socket_connect_timeout": 0.5,
+            "socket_timeout": 0.5,
+        },
+    },
+}
+
+# LLM response cache (projects.anthropic.cache)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True") == "True"
+LLM_CACHE_ALIAS = os.getenv("LLM_CACHE_ALIAS", "llm") or None
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_L1_MAX_ENTRIES = int(os.getenv("LLM_CACHE_L1_MAX_ENTRIES", "256"))
+LLM_CACHE_L1_MAX_BYTES = int(os.getenv("LLM_CACHE_L1_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Prompt token budgets for the Q&A transcript (projects.anthropic.compaction).
+# Older or verbose answers are replaced by cached summaries until the transcript fits.
+LLM_TRANSCRIPT_TOKEN_BUDGETS = {
+    "questions": int(os.getenv("LLM_QUESTIONS_TOKEN_BUDGET", "6000")),
+    "report": int(os.getenv("LLM_REPORT_TOKEN_BUDGET", "24000")),
+}
+LLM_TRANSCRIPT_KEEP_RECENT = int(os.getenv("LLM_TRANSCRIPT_KEEP_RECENT", "4"))
+LLM_VERBOSE_ANSWER_TOKENS = int(os.getenv("LLM_VERBOSE_ANSWER_TOKENS", "400"))
+LLM_SUMMARY_MODEL = os.getenv("LLM_SUMMARY_MODEL", "claude-3-5-haiku-latest")
+LLM_SUMMARY_MAX_TOKENS = int(os.getenv("LLM_SUMMARY_MAX_TOKENS", "150"))
+
+# Report sections generated in parallel per report (projects.reports).
+REPORT_SECTION_CONCURRENCY = int(os.getenv("REPORT_SECTION_CONCURRENCY", "4"))
+
+# Seconds between status checks of a bulk regeneration Message Batch (projects.batches).
+REPORT_BATCH_POLL_INTERVAL = int(os.getenv("REPORT_BATCH_POLL_INTERVAL", "60"))
+
+# Start generating AI follow-up questions in the background once a project is
+# this many predefined questions away from the end of its question chain.
+AI_QUESTION_PREFETCH_DISTANCE = int(os.getenv("AI_QUESTION_PREFETCH_DISTANCE", "1"))
+
+# Anthropic LLM gateway (projects.anthropic.gateway)
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL") or None
+ANTHROPIC_MAX_CONNECTIONS = int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "20"))
+ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS", "10"))
+ANTHROPIC_KEEPALIVE_EXPIRY = float(os.getenv("ANTHROPIC_KEEPALIVE_EXPIRY", "60"))
+ANTHROPIC_CONNECT_TIMEOUT = float(os.getenv("ANTHROPIC_CONNECT_TIMEOUT", "5"))
+ANTHROPIC_READ_TIMEOUT = float(os.getenv("ANTHROPIC_READ_TIMEOUT", "300"))
+ANTHROPIC_MAX_RETRIES = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+# Jittered exponential backoff between retries of 429/5xx/timeouts, capped at the max delay.
+ANTHROPIC_RETRY_BASE_DELAY = float(os.getenv("ANTHROPIC_RETRY_BASE_DELAY", "0.5"))
+ANTHROPIC_RETRY_MAX_DELAY = float(os.getenv("ANTHROPIC_RETRY_MAX_DELAY", "8"))
+# Consecutive transient failures that open a model's circuit, and how long it stays open.
+ANTHROPIC_BREAKER_FAILURE_THRESHOLD = int(os.getenv("ANTHROPIC_BREAKER_FAILURE_THRESHOLD", "5"))
+ANTHROPIC_BREAKER_RESET_TIMEOUT = float(os.getenv("ANTHROPIC_BREAKER_RESET_TIMEOUT", "30"))
+# Outbound rate limits per model (projects.anthropic.ratelimit): requests and
+# estimated tokens per minute, 0 for no limit. The "redis" backend shares the
+# budget between all web and Celery processes; "local" keeps it per process.
+# Calls wait for room up to ANTHROPIC_RATE_LIMIT_MAX_WAIT seconds (never past
+# the request deadline) and then fail with RateLimitExceeded.
+ANTHROPIC_RATE_LIMIT_BACKEND = os.getenv("ANTHROPIC_RATE_LIMIT_BACKEND", "redis")
+ANTHROPIC_RATE_LIMIT_REDIS_URL = os.getenv("ANTHROPIC_RATE_LIMIT_REDIS_URL", "redis://localhost:6379/1")
+ANTHROPIC_RPM_LIMIT = int(os.getenv("ANTHROPIC_RPM_LIMIT", "0"))
+ANTHROPIC_TPM_LIMIT = int(os.getenv("ANTHROPIC_TPM_LIMIT", "0"))
+ANTHROPIC_RATE_LIMIT_MAX_WAIT = float(os.getenv("ANTHROPIC_RATE_LIMIT_MAX_WAIT", "30"))
+# (requests per minute, tokens per minute) for models whose limits differ from the above.
+ANTHROPIC_MODEL_RATE_LIMITS = {}
+
+# LLM work lanes in priority order (projects.scheduling). Each lane's Celery
+# tasks go to their own queue, consumed by workers with "concurrency" slots.
+# "reserve" is the share of every rate-limit bucket a lane leaves to the lanes
+# above it, and "max_wait" how long its calls may wait for rate-limit room.
+# "per_user" caps the AI question generations (streams and prefetches) one
+# user has in flight, so one client cannot take every interactive slot.
+LLM_LANES = {
+    "interactive": {
+        "queue": "llm-interactive",
+        "concurrency": int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", "8")),
+        "reserve": 0.0,
+        "max_wait": ANTHROPIC_RATE_LIMIT_MAX_WAIT,
+        "per_user": int(os.getenv("LLM_INTERACTIVE_PER_USER", "2")),
+    },
+    "reports": {
+        "queue": "llm-reports",
+        "concurrency": int(os.getenv("LLM_REPORTS_CONCURRENCY", "4")),
+        "reserve": 0.2,
+        "max_wait": 300,
+    },
+    "batch": {
+        "queue": "llm-batch",
+        "concurrency": int(os.getenv("LLM_BATCH_CONCURRENCY", "1")),
+        "reserve": 0.5,
+        "max_wait": 600,
+    },
+}
+CELERY_TASK_ROUTES = {
+    "projects.tasks.prefetch_ai_questions_task": {"queue": LLM_LANES["interactive"]["queue"]},
+    "projects.tasks.resume_ai_questions_task": {"queue": LLM_LANES["interactive"]["queue"]},
+    "projects.tasks.generate_report_task": {"queue": LLM_LANES["reports"]["queue"]},
+    "projects.tasks.submit_report_batch_task": {"queue": LLM_LANES["batch"]["queue"]},
+    "projects.tasks.poll_report_batch_task": {"queue": LLM_LANES["batch"]["queue"]},
+}
+# Report jobs and message batches are started in weighted fair order over
+# their requesters; a requester's share counts the jobs (or batches) it
+# started within this many seconds.
+LLM_FAIR_SHARE_WINDOW = int(os.getenv("LLM_FAIR_SHARE_WINDOW", "900"))
+
+# Total time LLM calls may take within one HTTP request, retries included
+# (projects.middleware.LLMDeadlineMiddleware). Empty disables the deadline.
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "60") or 0) or None
+# Load shedding (projects.middleware.LLMLoadSheddingMiddleware): new requests to
+# LLM-bound views get 503 + Retry-After while a process has LLM_SHED_MAX_IN_FLIGHT
+# upstream calls in flight, or while the p95 latency of its upstream attempts over
+# the last LLM_SHED_WINDOW seconds (from at least LLM_SHED_MIN_SAMPLES attempts)
+# reaches LLM_SHED_MAX_LATENCY seconds. 0 disables a threshold.
+# Both signals are per web process, not shared between processes: by default the
+# deployment-wide LLM_SHED_TOTAL_IN_FLIGHT is split evenly over the gunicorn
+# workers that backend/entrypoint.sh starts (WEB_CONCURRENCY; one for runserver).
+WEB_PROCESSES = int(os.getenv("WEB_CONCURRENCY", "2")) if os.getenv("APP_SERVER") in ("wsgi", "asgi") else 1
+LLM_SHED_TOTAL_IN_FLIGHT = int(os.getenv("LLM_SHED_TOTAL_IN_FLIGHT", str(ANTHROPIC_MAX_CONNECTIONS)))
+LLM_SHED_MAX_IN_FLIGHT = int(
+    os.getenv("LLM_SHED_MAX_IN_FLIGHT") or -(-LLM_SHED_TOTAL_IN_FLIGHT // max(WEB_PROCESSES, 1))
+)
+LLM_SHED_MAX_LATENCY = float(os.getenv("LLM_SHED_MAX_LATENCY", "30"))
+LLM_SHED_WINDOW = float(os.getenv("LLM_SHED_WINDOW", "60"))
+LLM_SHED_MIN_SAMPLES = int(os.getenv("LLM_SHED_MIN_SAMPLES", "5"))
+LLM_SHED_RETRY_AFTER = int(os.getenv("LLM_SHED_RETRY_AFTER", "15"))
+# Faster model used for AI question generation when the primary model fails or
+# is unavailable. With LLM_QUESTION_HEDGE_AFTER set, the fallback is also started
+# when the primary has not answered after that many seconds; the first answer wins.
+LLM_QUESTION_FALLBACK_MODEL = os.getenv("LLM_QUESTION_FALLBACK_MODEL", "claude-3-5-haiku-latest") or None
+LLM_QUESTION_HEDGE_AFTER = float(os.getenv("LLM_QUESTION_HEDGE_AFTER", "0") or 0) or None
+# AI questions are streamed: the first one is returned as soon as it is written
+# and the rest are stored by a background thread. A client that answers faster
+# than they arrive waits up to LLM_QUESTION_STREAM_WAIT seconds for the next one;
+# a stream that stores nothing for that long is resumed by an interactive worker.
+LLM_QUESTION_STREAM_WORKERS = int(os.getenv("LLM_QUESTION_STREAM_WORKERS", "8"))
+LLM_QUESTION_STREAM_WAIT = float(os.getenv("LLM_QUESTION_STREAM_WAIT", "30"))
+LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", "8"))
+# LLM call ledger (projects.anthropic.ledger): calls are buffered in memory and
+# written with one bulk insert every flush interval or batch size.
+LLM_LEDGER_ENABLED = os.getenv("LLM_LEDGER_ENABLED", "True") == "True"
+LLM_LEDGER_FLUSH_INTERVAL = float(os.getenv("LLM_LEDGER_FLUSH_INTERVAL", "5"))
+LLM_LEDGER_BATCH_SIZE = int(os.getenv("LLM_LEDGER_BATCH_SIZE", "200"))
+LLM_LEDGER_MAX_BUFFER = int(os.getenv("LLM_LEDGER_MAX_BUFFER", "10000"))
+# USD per million tokens, used for the ledger's cost column.
+LLM_MODEL_PRICES = {
+    "claude-opus-4-20250514": {"input": 15, "output": 75},
+    "claude-sonnet-4-20250514": {"input": 3, "output": 15},
+    "claude-3-5-haiku-latest": {"input": 0.8, "output": 4},
+    "claude-3-5-haiku-20241022": {"input": 0.8, "output": 4},
+}
+
+# Throttling of the LLM-triggering endpoints (projects.throttles): requests per
+# user, and tokens per user and day as recorded by the ledger. Admins override
+# both per role and user in Settings.llm_quotas. Request counters and usage
+# totals live in the shared cache so all web processes enforce one limit.
+LLM_THROTTLE_CACHE_ALIAS = os.getenv("LLM_THROTTLE_CACHE_ALIAS", "llm")
+LLM_THROTTLE_RATE = os.getenv("LLM_THROTTLE_RATE", "30/min") or None
+LLM_DAILY_TOKEN_QUOTA = int(os.getenv("LLM_DAILY_TOKEN_QUOTA", "0"))
+LLM_QUOTA_USAGE_TTL = int(os.getenv("LLM_QUOTA_USAGE_TTL", "60"))
+
+# Seconds the admin dashboard figures (admin_api.stats) are cached per process.
+DASHBOARD_STATS_CACHE_TTL = int(os.getenv("DASHBOARD_STATS_CACHE_TTL", "30"))
 
+# Seconds a process keeps the admin's generation profiles and quotas before re-reading them.
+LLM_PROFILE_CACHE_TTL = int(os.getenv("LLM_PROFILE_CACHE_TTL", "30"))
 
 DJANGO_SUPERUSER_USERNAME = os.getenv("DJANGO_SUPERUSER_USERNAME")
 DJANGO_SUPERUSER_EMAIL = os.getenv("DJANGO_SUPERUSER_EMAIL")
@@ -13,5 +13,18 @@ python manage.py createsuperuser \
 echo "Collecting static files..."
 python manage.py collectstatic --noinput || true
 
-echo "Starting server..."
-python manage.py runserver 0.0.0.0:8000
+echo "Starting server (${APP_SERVER:-runserver})..."
+case "${APP_SERVER:-runserver}" in
+  wsgi)
+    exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 \
+      --workers "${WEB_CONCURRENCY:-2}" --threads "${GUNICORN_THREADS:-8}"
+    ;;
+  asgi)
+    # Async views: requests waiting on the LLM do not hold a worker thread.
+    exec gunicorn core.asgi:application --bind 0.0.0.0:8000 \
+      --workers "${WEB_CONCURRENCY:-2}" -k uvicorn_worker.UvicornWorker
+    ;;
+  *)
+    exec python manage.py runserver 0.0.0.0:8000
+    ;;
+esac
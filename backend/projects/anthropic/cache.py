@@ -0,0 +1,182 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+STAT_NAMES = ("l1_hits", "l2_hits", "misses", "bypasses", "stores")
+
+# After an L2 error, skip L2 for this long instead of paying a connect timeout per call.
+L2_RETRY_AFTER = 30.0
+
+
+def response_cache_key(model: str, prompt: str, params: dict = None) -> str:
+    """Content address of one generation: hash of model, prompt and generation parameters."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "params": params or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-level cache for LLM responses.
+
+    L1 is a per-process LRU bounded by entry count and total size; L2 is the
+    shared Django cache named by ``LLM_CACHE_ALIAS`` (Redis in production), so
+    a response generated by one worker is reused by every other. L2 errors are
+    treated as misses (and L2 is skipped for a while): the cache must never
+    make an LLM call fail.
+    """
+
+    def __init__(self, ttl: int = None, max_entries: int = None, max_bytes: int = None, alias: str = None):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._alias = alias
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(STAT_NAMES, 0)
+        self._l2_down_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.LLM_CACHE_ENABLED
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl if self._ttl is not None else settings.LLM_CACHE_TTL
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries if self._max_entries is not None else settings.LLM_CACHE_L1_MAX_ENTRIES
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes if self._max_bytes is not None else settings.LLM_CACHE_L1_MAX_BYTES
+
+    @property
+    def l2(self):
+        alias = self._alias or settings.LLM_CACHE_ALIAS
+        if not alias or self._l2_down_until > time.monotonic():
+            return None
+        return caches[alias]
+
+    def _l2_call(self, method: str, *args, default=None, **kwargs):
+        l2 = self.l2
+        if l2 is None:
+            return default
+        try:
+            return getattr(l2, method)(*args, **kwargs)
+        except Exception:
+            self._l2_down_until = time.monotonic() + L2_RETRY_AFTER
+            return default
+
+    def _l2_key(self, key: str) -> str:
+        return f"llm-response:{key}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+        stat_key = f"llm-response-stats:{name}"
+        # add() is a no-op when the counter exists; incr() then bumps it atomically.
+        self._l2_call("add", stat_key, 0, timeout=None)
+        self._l2_call("incr", stat_key)
+
+    def _l1_get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._l1_delete(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _l1_delete(self, key: str):
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+    def _l1_set(self, key: str, value: str):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._l1_delete(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._size += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._l1_delete(next(iter(self._entries)))
+
+    def get(self, key: str):
+        """Returns the cached response or None, checking L1 then L2."""
+        if not self.enabled:
+            return None
+
+        value = self._l1_get(key)
+        if value is not None:
+            self._count("l1_hits")
+            return value
+
+        value = self._l2_call("get", self._l2_key(key))
+        if value is not None:
+            self._l1_set(key, value)
+            self._count("l2_hits")
+            return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str):
+        if not self.enabled or not value:
+            return
+        self._l1_set(key, value)
+        self._l2_call("set", self._l2_key(key), value, timeout=self.ttl)
+        self._count("stores")
+
+    def get_or_call(self, key: str, fn, bypass: bool = False) -> str:
+        """
+        Returns the cached response for ``key`` or stores the result of ``fn()``.
+
+        With ``bypass`` the cache is not read but the fresh response still
+        replaces the cached one (used by admin "force regenerate").
+        """
+        if bypass:
+            self._count("bypasses")
+        else:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+        value = fn()
+        self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process and, when L2 is reachable, the whole cluster."""
+        with self._lock:
+            local = dict(self._stats)
+            local["l1_entries"] = len(self._entries)
+            local["l1_bytes"] = self._size
+
+        cluster = None
+        values = self._l2_call("get_many", [f"llm-response-stats:{name}" for name in STAT_NAMES])
+        if values is not None:
+            cluster = {name: values.get(f"llm-response-stats:{name}", 0) for name in STAT_NAMES}
+        return {"process": local, "cluster": cluster}
+
+    def clear(self):
+        """Empties L1. L2 entries expire on their own TTL."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+response_cache = ResponseCache()
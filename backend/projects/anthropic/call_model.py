@@ -1,28 +1,19 @@
-import anthropic
+from .gateway import gateway, DEFAULT_MODEL
 
-def call_anthropic_model(api_key: str, prompt: str, model: str = "claude-opus-4-20250514") -> str:
+
+def call_anthropic_model(prompt: str, model: str = DEFAULT_MODEL, **options) -> str:
     """
     Calls the Anthropic AI model with the given prompt and returns the response.
 
+    The request goes through the process-wide LLM gateway, so the underlying
+    HTTP connection pool is reused between calls.
+
     Args:
-        api_key (str): The API key for authenticating with the Anthropic service.
         prompt (str): The input prompt to send to the model.
-        model (str): The model to use (default is "claude-2").
+        model (str): The model to use (default is "claude-opus-4-20250514").
+        **options: Per-call options forwarded to the gateway (max_tokens, timeout, ...).
 
     Returns:
         str: The response from the model.
     """
-    client = anthropic.Anthropic(api_key=api_key)
-
-    message = client.messages.create(
-        model=model,
-        max_tokens=4096,
-        messages=[
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    )
-    
-    return message.content[0].text
\ No newline at end of file
+    return gateway.complete(prompt, model=model, **options)
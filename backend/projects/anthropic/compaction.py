@@ -0,0 +1,111 @@
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError
+
+from ..models import AnswerSummary
+from .gateway import gateway
+from .tokens import estimate_tokens
+
+# Per-entry cost of the "Question:/Answer:/Asked by:" scaffolding in a prompt.
+ENTRY_OVERHEAD_TOKENS = 12
+
+SUMMARY_PROMPT = """Summarize the following client answer from a project requirements interview in at most {words} words.
+Keep every concrete requirement, feature, number, name and constraint. Reply with the summary only.
+
+Answer:
+{answer}"""
+
+
+def answer_tokens(entry: dict) -> int:
+    tokens = entry.get("answer_tokens")
+    if tokens is None:
+        tokens = estimate_tokens(entry["answer_text"])
+    return tokens
+
+
+def entry_tokens(entry: dict) -> int:
+    return ENTRY_OVERHEAD_TOKENS + estimate_tokens(entry["question_text"]) + answer_tokens(entry)
+
+
+def summarize_answer(text: str):
+    """
+    Returns ``(summary, token_count)`` for an answer, generating it with the
+    summary model only the first time a given answer text is seen.
+    """
+    content_hash = hashlib.sha256(text.encode()).hexdigest()
+    cached = AnswerSummary.objects.filter(content_hash=content_hash).first()
+    if cached:
+        return cached.summary, cached.token_count
+
+    max_tokens = settings.LLM_SUMMARY_MAX_TOKENS
+    try:
+        summary = gateway.complete(
+            SUMMARY_PROMPT.format(words=int(max_tokens * 0.75), answer=text),
+            model=settings.LLM_SUMMARY_MODEL,
+            max_tokens=max_tokens,
+            tags={"task": "summary"},
+        ).strip()
+    except Exception:
+        # Never fail the main generation because a summary could not be made.
+        truncated = text[:max_tokens * 4] + "…"
+        return truncated, estimate_tokens(truncated)
+
+    token_count = estimate_tokens(summary)
+    try:
+        AnswerSummary.objects.create(
+            content_hash=content_hash,
+            summary=summary,
+            token_count=token_count,
+            model=settings.LLM_SUMMARY_MODEL,
+        )
+    except IntegrityError:
+        # Another worker summarized the same answer concurrently.
+        pass
+    return summary, token_count
+
+
+def compact_transcript(all_questions: list, task: str) -> list:
+    """
+    Fits a Q&A transcript into the token budget configured for ``task``.
+
+    Verbose answers (largest first) and then answers older than the most
+    recent ``LLM_TRANSCRIPT_KEEP_RECENT`` are replaced by their summaries until
+    the transcript fits. If it still does not fit, the oldest entries are
+    dropped, so prompt size stays bounded however long the interview runs.
+    """
+    budget = settings.LLM_TRANSCRIPT_TOKEN_BUDGETS.get(task)
+    if not budget:
+        return all_questions
+
+    entries = [dict(entry) for entry in all_questions]
+    total = sum(entry_tokens(entry) for entry in entries)
+    if total <= budget:
+        return entries
+
+    keep_recent = settings.LLM_TRANSCRIPT_KEEP_RECENT
+    verbose_limit = settings.LLM_VERBOSE_ANSWER_TOKENS
+    verbose = sorted(
+        (index for index, entry in enumerate(entries) if answer_tokens(entry) > verbose_limit),
+        key=lambda index: -answer_tokens(entries[index]),
+    )
+    older = [index for index in range(max(0, len(entries) - keep_recent)) if index not in verbose]
+
+    for index in verbose + older:
+        if total <= budget:
+            break
+        entry = entries[index]
+        if not entry["answer_text"]:
+            continue
+        summary, summary_tokens = summarize_answer(entry["answer_text"])
+        saving = answer_tokens(entry) - summary_tokens
+        if saving <= 0:
+            continue
+        entry["answer_text"] = summary
+        entry["answer_tokens"] = summary_tokens
+        total -= saving
+
+    while total > budget and len(entries) > 1:
+        total -= entry_tokens(entries.pop(0))
+
+    return entries
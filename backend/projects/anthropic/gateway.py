@@ -0,0 +1,663 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import anthropic
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .ledger import estimate_cost, ledger
+from .ratelimit import rate_limiter
+from .resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, backoff_delay, is_transient, load, metrics,
+    remaining_time, retry_after,
+)
+from .tokens import estimate_tokens
+
+DEFAULT_MODEL = "claude-opus-4-20250514"
+DEFAULT_MAX_TOKENS = 4096
+
+# The SDK ships its own HTTP library; build pool limits with the same class it uses.
+Limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+
+# Circuit breaker / metrics key for Message Batches API calls.
+BATCHES = "message-batches"
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+logger = logging.getLogger(__name__)
+
+
+def streamed_tokens(stream, written: list) -> int:
+    """
+    Tokens a stream that ended early used so far: the prompt as its opening
+    event reported it, and at least an estimate of the text it wrote.
+    """
+    try:
+        usage = stream.current_message_snapshot.usage
+    except AssertionError:
+        # No event arrived.
+        return 0
+    values = {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+    output = max(values["output_tokens"], estimate_tokens("".join(written)))
+    return values["input_tokens"] + values["cache_creation_input_tokens"] + output
+
+
+def close_at_loop_shutdown(client):
+    """
+    Closes ``client`` while its event loop shuts down: the loop finalizes the
+    async generators started on it (``loop.shutdown_asyncgens``, run by
+    ``asyncio.run``) before it closes. Returns the generator, which the caller
+    must keep referenced since the loop only holds it weakly.
+    """
+    async def lifetime():
+        try:
+            yield
+        finally:
+            await client.close()
+
+    closer = lifetime()
+    try:
+        # Runs to the yield without suspending; this registers it with the running loop.
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+    return closer
+
+
+class LLMGateway:
+    """
+    Single entry point for every Anthropic call made by the backend.
+
+    The gateway owns one long-lived ``anthropic.Anthropic`` client per process
+    so that connections (and their TLS sessions) are reused across requests
+    instead of being re-established for every question or report. The client
+    is rebuilt lazily after a fork, which keeps it safe to create at import
+    time under gunicorn/celery prefork workers.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None, **pool_options):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.pool_options = pool_options
+        self._client = None
+        self._pid = None
+        self._async_clients = {}
+        self._lock = threading.Lock()
+        self._usage = dict.fromkeys(("calls",) + USAGE_FIELDS, 0)
+        self._breakers = {}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _option(self, name: str):
+        """Explicit constructor option first, then the ANTHROPIC_* Django setting."""
+        if name in self.pool_options:
+            return self.pool_options[name]
+        return getattr(settings, f"ANTHROPIC_{name.upper()}")
+
+    def _reset_after_fork(self):
+        # The parent's sockets and locks must never be shared with a child process.
+        self._client = None
+        self._pid = None
+        self._async_clients = {}
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def _build_client(self, async_client: bool = False):
+        timeout = anthropic.Timeout(
+            self._option("read_timeout"),
+            connect=self._option("connect_timeout"),
+        )
+        http_client_class = anthropic.DefaultAsyncHttpxClient if async_client else anthropic.DefaultHttpxClient
+        http_client = http_client_class(
+            limits=Limits(
+                max_connections=self._option("max_connections"),
+                max_keepalive_connections=self._option("max_keepalive_connections"),
+                keepalive_expiry=self._option("keepalive_expiry"),
+            ),
+            timeout=timeout,
+        )
+        client_class = anthropic.AsyncAnthropic if async_client else anthropic.Anthropic
+        return client_class(
+            api_key=self.api_key or settings.CLAUDE_API_ENV,
+            base_url=self.base_url or settings.ANTHROPIC_BASE_URL,
+            timeout=timeout,
+            # Retries are handled by _call so they respect deadlines and the circuit breaker.
+            max_retries=0,
+            http_client=http_client,
+        )
+
+    @property
+    def client(self) -> anthropic.Anthropic:
+        """The pooled client for the current process, created on first use."""
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._client = self._build_client()
+                    self._pid = pid
+        return self._client
+
+    @property
+    def async_client(self) -> anthropic.AsyncAnthropic:
+        """
+        The pooled ``AsyncAnthropic`` client of the running event loop. An
+        async client's connections belong to the loop that opened them, so
+        every loop (e.g. each ``asyncio.run`` or ``async_to_sync`` call) gets
+        its own client, which is closed when the loop shuts down.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._async_clients if other.is_closed()]:
+                del self._async_clients[closed]
+            if loop not in self._async_clients:
+                client = self._build_client(async_client=True)
+                self._async_clients[loop] = (client, close_at_loop_shutdown(client))
+            return self._async_clients[loop][0]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(
+                    self._option("breaker_failure_threshold"), self._option("breaker_reset_timeout")
+                )
+            return self._breakers[model]
+
+    def _call_timeout(self, timeout: float = None) -> float:
+        """Per-attempt timeout: the requested one, shortened to what is left of the deadline."""
+        timeout = timeout if timeout is not None else self._option("read_timeout")
+        remaining = remaining_time()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise DeadlineExceeded("LLM request deadline exceeded")
+        return min(timeout, remaining)
+
+    def _attempts(self, max_retries: int = None) -> int:
+        return 1 + (max_retries if max_retries is not None else self._option("max_retries"))
+
+    def _check_circuit(self, model: str, breaker: CircuitBreaker):
+        if not breaker.allow():
+            metrics.incr(model, "circuit_rejections")
+            raise CircuitOpenError(f"Circuit open for {model}")
+
+    def _start_attempt(self, model: str, timeout: float = None) -> float:
+        """Checks the deadline before an attempt; returns its timeout."""
+        try:
+            call_timeout = self._call_timeout(timeout)
+        except DeadlineExceeded:
+            metrics.incr(model, "deadline_exceeded")
+            raise
+        metrics.incr(model, "calls")
+        return call_timeout
+
+    def _retry_delay(self, model: str, breaker: CircuitBreaker, error: Exception, attempt: int, attempts: int) -> float:
+        """
+        Records a failed attempt and returns how long to wait before the next
+        one; re-raises ``error`` when it should not be retried.
+        """
+        metrics.incr(model, "failures")
+        if not is_transient(error):
+            # The upstream answered; a bad request says nothing about its health.
+            breaker.record_success()
+            raise error
+        breaker.record_failure()
+        if attempt + 1 == attempts:
+            raise error
+        delay = backoff_delay(
+            attempt, self._option("retry_base_delay"), self._option("retry_max_delay"), retry_after(error)
+        )
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            metrics.incr(model, "deadline_exceeded")
+            raise error
+        logger.warning("anthropic call to %s failed (%s), retry %d in %.2fs", model, error, attempt + 1, delay)
+        metrics.incr(model, "retries")
+        return delay
+
+    def _finish_attempt(self, model: str, breaker: CircuitBreaker, started: float, stream: bool = False):
+        breaker.record_success()
+        metrics.incr(model, "successes")
+        metrics.observe(model, time.monotonic() - started)
+        if not stream:
+            load.observe(time.monotonic() - started)
+
+    def _call(self, model: str, send, timeout: float = None, max_retries: int = None,
+              tokens: int = None, rate_limit_wait: float = None, stream: bool = False):
+        """
+        Runs ``send(timeout)`` under the circuit breaker of ``model``, retrying
+        transient errors while attempts and deadline allow. With ``tokens``,
+        every attempt first reserves a request and that many tokens from the
+        model's rate limit.
+
+        A ``stream`` send only opens the stream, so it counts itself in flight
+        (``load.call_started``) and the caller releases and observes the call
+        once the stream is closed.
+        """
+        breaker = self.breaker(model)
+        attempts = self._attempts(max_retries)
+        for attempt in range(attempts):
+            self._check_circuit(model, breaker)
+            if tokens is not None:
+                rate_limiter.acquire(model, tokens, wait=rate_limit_wait)
+            try:
+                call_timeout = self._start_attempt(model, timeout)
+            except DeadlineExceeded:
+                if tokens is not None:
+                    rate_limiter.release(model, tokens)
+                raise
+            started = time.monotonic()
+            try:
+                with nullcontext() if stream else load.call():
+                    result = send(call_timeout)
+            except Exception as e:
+                load.observe(time.monotonic() - started)
+                if tokens is not None:
+                    rate_limiter.release(model, tokens)
+                time.sleep(self._retry_delay(model, breaker, e, attempt, attempts))
+                continue
+            self._finish_attempt(model, breaker, started, stream=stream)
+            return result
+
+    async def _acall(self, model: str, send, timeout: float = None, max_retries: int = None,
+                     tokens: int = None, rate_limit_wait: float = None, stream: bool = False):
+        """``_call`` for coroutines: awaits ``send(timeout)`` and waits without blocking the event loop."""
+        breaker = self.breaker(model)
+        attempts = self._attempts(max_retries)
+        for attempt in range(attempts):
+            self._check_circuit(model, breaker)
+            if tokens is not None:
+                await rate_limiter.aacquire(model, tokens, wait=rate_limit_wait)
+            try:
+                call_timeout = self._start_attempt(model, timeout)
+            except DeadlineExceeded:
+                if tokens is not None:
+                    await rate_limiter.arelease(model, tokens)
+                raise
+            started = time.monotonic()
+            try:
+                with nullcontext() if stream else load.call():
+                    result = await send(call_timeout)
+            except Exception as e:
+                load.observe(time.monotonic() - started)
+                if tokens is not None:
+                    await rate_limiter.arelease(model, tokens)
+                await asyncio.sleep(self._retry_delay(model, breaker, e, attempt, attempts))
+                continue
+            self._finish_attempt(model, breaker, started, stream=stream)
+            return result
+
+    def create_message(
+        self,
+        prompt: str,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        timeout: float = None,
+        max_retries: int = None,
+        tags: dict = None,
+        rate_limit_wait: float = None,
+        **params,
+    ):
+        """
+        Sends a single user prompt to the Messages API.
+
+        Args:
+            prompt (str | list): The user message content, as text or content blocks.
+            model (str): The model to use.
+            max_tokens (int): Upper bound on generated tokens.
+            timeout (float): Optional per-attempt timeout overriding the pool default.
+            max_retries (int): Optional retry count overriding ``ANTHROPIC_MAX_RETRIES``.
+            tags (dict): Ledger attribution: ``task``, ``project_id``, ``project_type_id``.
+            rate_limit_wait (float): Longest wait for room under the model's rate limit;
+                0 fails fast. Defaults to ``ANTHROPIC_RATE_LIMIT_MAX_WAIT``.
+            **params: Extra Messages API parameters (system, temperature, ...).
+
+        Returns:
+            anthropic.types.Message: The full API response.
+
+        Raises:
+            CircuitOpenError: The model's circuit breaker is open.
+            DeadlineExceeded: The request deadline passed before a response.
+            RateLimitExceeded: The model's rate limit had no room within ``rate_limit_wait``.
+        """
+        client = self.client
+
+        def send(call_timeout):
+            return client.with_options(timeout=call_timeout).messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                **params,
+            )
+
+        reserved = rate_limiter.estimate(prompt, max_tokens, params)
+        started = time.monotonic()
+        try:
+            message = self._call(
+                model, send, timeout=timeout, max_retries=max_retries, tokens=reserved, rate_limit_wait=rate_limit_wait
+            )
+        except Exception as e:
+            self.record_failure(model, e, tags=tags, started=started)
+            raise
+        self.record_usage(model, message.usage, tags=tags, started=started, reserved_tokens=reserved)
+        return message
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        """Same as ``create_message`` but returns only the text of the first block."""
+        message = self.create_message(prompt, **kwargs)
+        return message.content[0].text
+
+    def stream_text(
+        self,
+        prompt: str,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        timeout: float = None,
+        tags: dict = None,
+        rate_limit_wait: float = None,
+        **params,
+    ):
+        """
+        Streams a single user prompt through the Messages API.
+
+        Opening the stream is retried like ``create_message``; once text has
+        been yielded a failure is raised to the caller.
+
+        Yields:
+            str: Text deltas in the order the model produces them.
+        """
+        client = self.client
+
+        def open_stream(call_timeout):
+            # In flight (for load shedding) until the stream is closed, not just while it opens.
+            opened = time.monotonic()
+            load.call_started()
+            try:
+                manager = client.with_options(timeout=call_timeout).messages.stream(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    **params,
+                )
+                return manager, manager.__enter__(), opened
+            except BaseException:
+                load.call_finished()
+                raise
+
+        reserved = rate_limiter.estimate(prompt, max_tokens, params)
+        started = time.monotonic()
+        try:
+            manager, stream, opened = self._call(
+                model, open_stream, timeout=timeout, tokens=reserved, rate_limit_wait=rate_limit_wait, stream=True
+            )
+        except Exception as e:
+            self.record_failure(model, e, tags=tags, started=started)
+            raise
+
+        first_token_at = None
+        finished = False
+        released = False
+        written = []
+        try:
+            for text in stream.text_stream:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                written.append(text)
+                yield text
+            finished = True
+            # record_usage returns the unused reservation.
+            released = True
+            self.record_usage(
+                model, stream.get_final_message().usage, tags=tags, started=started, first_token_at=first_token_at,
+                reserved_tokens=reserved,
+            )
+        except Exception as e:
+            finished = True
+            if is_transient(e):
+                self.breaker(model).record_failure()
+            self.record_failure(model, e, tags=tags, started=started, first_token_at=first_token_at)
+            raise
+        finally:
+            if not finished:
+                # The consumer stopped reading (e.g. the client disconnected).
+                self.record_failure(model, None, tags=tags, started=started, first_token_at=first_token_at)
+            if not released:
+                rate_limiter.release(model, reserved - streamed_tokens(stream, written))
+            try:
+                manager.__exit__(None, None, None)
+            finally:
+                load.call_finished()
+                load.observe(time.monotonic() - opened)
+
+    async def astream_text(
+        self,
+        prompt: str,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        timeout: float = None,
+        tags: dict = None,
+        rate_limit_wait: float = None,
+        **params,
+    ):
+        """
+        ``stream_text`` on the ``AsyncAnthropic`` client, for async views: the
+        event loop is free while the model writes.
+
+        Yields:
+            str: Text deltas in the order the model produces them.
+        """
+        client = self.async_client
+
+        async def open_stream(call_timeout):
+            opened = time.monotonic()
+            load.call_started()
+            try:
+                manager = client.with_options(timeout=call_timeout).messages.stream(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    **params,
+                )
+                return manager, await manager.__aenter__(), opened
+            except BaseException:
+                load.call_finished()
+                raise
+
+        reserved = rate_limiter.estimate(prompt, max_tokens, params)
+        started = time.monotonic()
+        try:
+            manager, stream, opened = await self._acall(
+                model, open_stream, timeout=timeout, tokens=reserved, rate_limit_wait=rate_limit_wait, stream=True
+            )
+        except Exception as e:
+            self.record_failure(model, e, tags=tags, started=started)
+            raise
+
+        first_token_at = None
+        finished = False
+        released = False
+        written = []
+        try:
+            async for text in stream.text_stream:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                written.append(text)
+                yield text
+            finished = True
+            message = await stream.get_final_message()
+            released = True
+            # Returning the unused reservation may be a Redis round trip.
+            await sync_to_async(self.record_usage, thread_sensitive=False)(
+                model, message.usage, tags=tags, started=started, first_token_at=first_token_at,
+                reserved_tokens=reserved,
+            )
+        except Exception as e:
+            finished = True
+            if is_transient(e):
+                self.breaker(model).record_failure()
+            self.record_failure(model, e, tags=tags, started=started, first_token_at=first_token_at)
+            raise
+        finally:
+            if not finished:
+                self.record_failure(model, None, tags=tags, started=started, first_token_at=first_token_at)
+            if not released:
+                await rate_limiter.arelease(model, reserved - streamed_tokens(stream, written))
+            try:
+                await manager.__aexit__(None, None, None)
+            finally:
+                load.call_finished()
+                load.observe(time.monotonic() - opened)
+
+    def create_batch(self, requests: list):
+        """
+        Submits Messages API requests as one Message Batch.
+
+        Args:
+            requests (list): ``{"custom_id": str, "params": dict}`` items.
+
+        Returns:
+            anthropic.types.messages.MessageBatch: The created batch.
+        """
+        return self._call(
+            BATCHES, lambda call_timeout: self.client.with_options(timeout=call_timeout).messages.batches.create(
+                requests=requests
+            )
+        )
+
+    def retrieve_batch(self, batch_id: str):
+        return self._call(
+            BATCHES, lambda call_timeout: self.client.with_options(timeout=call_timeout).messages.batches.retrieve(
+                batch_id
+            )
+        )
+
+    def batch_results(self, batch_id: str, tags_for=None):
+        """
+        Yields the results of an ended batch, recording usage of the succeeded
+        ones. ``tags_for(custom_id)`` returns the ledger tags of a request.
+        """
+        results = self._call(
+            BATCHES, lambda call_timeout: self.client.with_options(timeout=call_timeout).messages.batches.results(
+                batch_id
+            )
+        )
+        for result in results:
+            if result.result.type == "succeeded":
+                message = result.result.message
+                tags = tags_for(result.custom_id) if tags_for else None
+                self.record_usage(message.model, message.usage, tags=tags, batch=True)
+            yield result
+
+    def record_usage(self, model: str, usage, tags: dict = None, started: float = None,
+                     first_token_at: float = None, batch: bool = False, reserved_tokens: int = None):
+        """
+        Logs token usage of one call, including prompt cache reads/writes, adds
+        it to the totals and queues it for the LLM call ledger. Tokens reserved
+        from the rate limit beyond the real usage are released.
+        """
+        values = {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+        if reserved_tokens is not None:
+            used = values["input_tokens"] + values["cache_creation_input_tokens"] + values["output_tokens"]
+            rate_limiter.release(model, reserved_tokens - used)
+        ledger.record(
+            **self._ledger_fields(model, tags, started, first_token_at),
+            input_tokens=values["input_tokens"],
+            output_tokens=values["output_tokens"],
+            cache_creation_tokens=values["cache_creation_input_tokens"],
+            cache_read_tokens=values["cache_read_input_tokens"],
+            cost_usd=estimate_cost(
+                model, values["input_tokens"], values["output_tokens"],
+                values["cache_creation_input_tokens"], values["cache_read_input_tokens"], batch=batch,
+            ),
+            batch=batch,
+        )
+        with self._lock:
+            self._usage["calls"] += 1
+            for field, value in values.items():
+                self._usage[field] += value
+        logger.info(
+            "anthropic usage model=%s input=%d output=%d cache_write=%d cache_read=%d",
+            model, values["input_tokens"], values["output_tokens"],
+            values["cache_creation_input_tokens"], values["cache_read_input_tokens"],
+        )
+
+    def record_failure(self, model: str, error: Exception, tags: dict = None, started: float = None,
+                       first_token_at: float = None):
+        """Queues a failed (or abandoned, when ``error`` is None) call for the ledger."""
+        ledger.record(
+            **self._ledger_fields(model, tags, started, first_token_at),
+            outcome="error",
+            error_type=type(error).__name__ if error is not None else "Abandoned",
+        )
+
+    def _ledger_fields(self, model: str, tags: dict, started: float, first_token_at: float) -> dict:
+        tags = tags or {}
+        now = time.monotonic()
+        return {
+            "task": tags.get("task", ""),
+            "project_id": tags.get("project_id"),
+            "project_type_id": tags.get("project_type_id"),
+            "model": model,
+            "latency_ms": round((now - started) * 1000) if started is not None else None,
+            "ttft_ms": round((first_token_at - started) * 1000) if first_token_at is not None else None,
+        }
+
+    def usage_stats(self) -> dict:
+        """Token totals for this process since start-up."""
+        with self._lock:
+            return dict(self._usage)
+
+    def resilience_stats(self) -> dict:
+        """
+        Call/retry/failure counters, latencies and circuit breaker state per
+        model, and the load shedding state with its thresholds.
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            "models": metrics.snapshot(),
+            "breakers": {model: breaker.snapshot() for model, breaker in breakers.items()},
+            "load": {
+                **load.snapshot(),
+                "p95_latency_s": load.recent_latency(settings.LLM_SHED_WINDOW, settings.LLM_SHED_MIN_SAMPLES),
+                "shedding": load.overload(
+                    settings.LLM_SHED_MAX_IN_FLIGHT, settings.LLM_SHED_MAX_LATENCY,
+                    settings.LLM_SHED_WINDOW, settings.LLM_SHED_MIN_SAMPLES,
+                ),
+                "thresholds": {
+                    "max_in_flight_calls": settings.LLM_SHED_MAX_IN_FLIGHT,
+                    "max_p95_latency_s": settings.LLM_SHED_MAX_LATENCY,
+                    "window_s": settings.LLM_SHED_WINDOW,
+                    "min_samples": settings.LLM_SHED_MIN_SAMPLES,
+                },
+            },
+        }
+
+    def close(self):
+        """Closes the pooled client; the next call transparently opens a new one."""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+
+gateway = LLMGateway()
@@ -0,0 +1,123 @@
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Anthropic bills prompt cache writes at 1.25x and cache reads at 0.1x the input price;
+# Message Batches at half price.
+CACHE_WRITE_MULTIPLIER = Decimal("1.25")
+CACHE_READ_MULTIPLIER = Decimal("0.1")
+BATCH_MULTIPLIER = Decimal("0.5")
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cache_creation_tokens: int = 0,
+                  cache_read_tokens: int = 0, batch: bool = False) -> Decimal:
+    """USD cost of one call from ``LLM_MODEL_PRICES`` (USD per million tokens); 0 for unknown models."""
+    prices = settings.LLM_MODEL_PRICES.get(model)
+    if prices is None:
+        return Decimal(0)
+    input_price = Decimal(str(prices["input"]))
+    output_price = Decimal(str(prices["output"]))
+    cost = (
+        input_tokens * input_price
+        + cache_creation_tokens * input_price * CACHE_WRITE_MULTIPLIER
+        + cache_read_tokens * input_price * CACHE_READ_MULTIPLIER
+        + output_tokens * output_price
+    ) / 1_000_000
+    if batch:
+        cost *= BATCH_MULTIPLIER
+    return cost.quantize(Decimal("0.000001"))
+
+
+class LedgerWriter:
+    """
+    Buffers ``LLMCall`` rows in memory and writes them with one ``bulk_create``
+    per flush from a background thread, so recording a call never adds a
+    database round trip to the request that made it.
+
+    The buffer is bounded; when the database is unavailable for long, the
+    oldest rows are dropped rather than growing memory without limit.
+    """
+
+    def __init__(self):
+        self._buffer = deque(maxlen=settings.LLM_LEDGER_MAX_BUFFER)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.dropped = 0
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+        atexit.register(self.flush)
+
+    def _reset_after_fork(self):
+        # Rows buffered by the parent are the parent's to write.
+        self._buffer = deque(maxlen=settings.LLM_LEDGER_MAX_BUFFER)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, **fields):
+        """Queues one call; see ``projects.models.LLMCall`` for the fields."""
+        if not settings.LLM_LEDGER_ENABLED:
+            return
+        fields.setdefault("created_at", timezone.now())
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(fields)
+            size = len(self._buffer)
+        self._ensure_thread()
+        if size >= settings.LLM_LEDGER_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                self._pid = pid
+                self._thread = threading.Thread(target=self._run, name="llm-ledger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.LLM_LEDGER_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def flush(self) -> int:
+        """Writes everything buffered so far; returns the number of rows written."""
+        with self._lock:
+            rows = list(self._buffer)
+            self._buffer.clear()
+        if not rows:
+            return 0
+
+        LLMCall = apps.get_model("projects", "LLMCall")
+        try:
+            LLMCall.objects.bulk_create(
+                [LLMCall(**row) for row in rows], batch_size=settings.LLM_LEDGER_BATCH_SIZE
+            )
+        except Exception:
+            logger.exception("could not write %d LLM ledger rows", len(rows))
+            with self._lock:
+                # Put them back in front of newer rows; the deque bound still applies.
+                self._buffer.extendleft(reversed(rows))
+            return 0
+        return len(rows)
+
+
+ledger = LedgerWriter()
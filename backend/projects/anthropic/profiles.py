@@ -0,0 +1,117 @@
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+from .gateway import DEFAULT_MAX_TOKENS, DEFAULT_MODEL
+
+# Built-in generation profile per task. Admins override any of these fields
+# through ``Settings.generation_profiles``, globally or per project type:
+#
+#     {
+#         "questions": {"model": "claude-3-5-haiku-latest", "max_tokens": 1024},
+#         "report": {"temperature": 0.2},
+#         "project_types": {"3": {"report": {"max_tokens": 8000}}}
+#     }
+DEFAULT_PROFILES = {
+    "questions": {"model": DEFAULT_MODEL, "max_tokens": 1024, "temperature": None, "stop_sequences": []},
+    "report": {"model": DEFAULT_MODEL, "max_tokens": DEFAULT_MAX_TOKENS, "temperature": None, "stop_sequences": []},
+}
+PROFILE_FIELDS = ("model", "max_tokens", "temperature", "stop_sequences")
+
+_lock = threading.Lock()
+_cached = {"profiles": None, "expires_at": 0.0}
+
+
+def validate_profile(profile, where: str):
+    if not isinstance(profile, dict):
+        raise ValueError(f"{where} must be an object.")
+    unknown = set(profile) - set(PROFILE_FIELDS)
+    if unknown:
+        raise ValueError(f"{where}: unknown fields {', '.join(sorted(unknown))}.")
+    if "model" in profile and (not isinstance(profile["model"], str) or not profile["model"]):
+        raise ValueError(f"{where}.model must be a model name.")
+    if "max_tokens" in profile and (
+        not isinstance(profile["max_tokens"], int) or isinstance(profile["max_tokens"], bool) or profile["max_tokens"] < 1
+    ):
+        raise ValueError(f"{where}.max_tokens must be a positive integer.")
+    if profile.get("temperature") is not None and (
+        not isinstance(profile["temperature"], (int, float)) or not 0 <= profile["temperature"] <= 1
+    ):
+        raise ValueError(f"{where}.temperature must be between 0 and 1.")
+    if "stop_sequences" in profile and (
+        not isinstance(profile["stop_sequences"], list)
+        or not all(isinstance(stop, str) and stop for stop in profile["stop_sequences"])
+    ):
+        raise ValueError(f"{where}.stop_sequences must be a list of strings.")
+
+
+def validate_profiles(value: dict):
+    """
+    Checks the shape of ``Settings.generation_profiles``.
+
+    Raises:
+        ValueError: With a message naming the offending entry.
+    """
+    if not isinstance(value, dict):
+        raise ValueError("generation_profiles must be an object.")
+    for key, profile in value.items():
+        if key == "project_types":
+            if not isinstance(profile, dict):
+                raise ValueError("project_types must be an object keyed by project type id.")
+            for project_type_id, overrides in profile.items():
+                if not str(project_type_id).isdigit() or not isinstance(overrides, dict):
+                    raise ValueError("project_types must be an object keyed by project type id.")
+                for task, task_profile in overrides.items():
+                    if task not in DEFAULT_PROFILES:
+                        raise ValueError(f"project_types.{project_type_id}: unknown task {task}.")
+                    validate_profile(task_profile, f"project_types.{project_type_id}.{task}")
+        elif key in DEFAULT_PROFILES:
+            validate_profile(profile, key)
+        else:
+            raise ValueError(f"Unknown task {key}; expected one of: {', '.join(DEFAULT_PROFILES)}.")
+
+
+def configured_profiles() -> dict:
+    """``Settings.generation_profiles``, re-read at most every ``LLM_PROFILE_CACHE_TTL`` seconds."""
+    now = time.monotonic()
+    with _lock:
+        if _cached["profiles"] is not None and now < _cached["expires_at"]:
+            return _cached["profiles"]
+
+    Settings = apps.get_model("admin_api", "Settings")
+    profiles = Settings.get_settings().generation_profiles or {}
+    with _lock:
+        _cached["profiles"] = profiles
+        _cached["expires_at"] = now + settings.LLM_PROFILE_CACHE_TTL
+    return profiles
+
+
+def clear_profile_cache():
+    """Drops this process's cached profiles; other processes refresh after the TTL."""
+    with _lock:
+        _cached["profiles"] = None
+
+
+def get_generation_profile(task: str, project_type_id: int = None) -> dict:
+    """
+    Effective profile for ``task``: the built-in default, then the admin's
+    task profile, then the project type's override for the task.
+    """
+    profiles = configured_profiles()
+    profile = dict(DEFAULT_PROFILES[task])
+    profile.update(profiles.get(task, {}))
+    if project_type_id is not None:
+        profile.update(profiles.get("project_types", {}).get(str(project_type_id), {}).get(task, {}))
+    return profile
+
+
+def profile_params(profile: dict) -> dict:
+    """Messages API parameters of a profile, leaving out unset optional ones."""
+    params = {"model": profile["model"], "max_tokens": profile["max_tokens"]}
+    if profile.get("temperature") is not None:
+        params["temperature"] = profile["temperature"]
+    if profile.get("stop_sequences"):
+        params["stop_sequences"] = profile["stop_sequences"]
+    return params
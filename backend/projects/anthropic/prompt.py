@@ -1,13 +1,129 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import response_cache, response_cache_key
 from .call_model import call_anthropic_model
-from core.settings import CLAUDE_API_ENV
+from .compaction import compact_transcript
+from .gateway import gateway, DEFAULT_MODEL
+from .profiles import get_generation_profile, profile_params
+from .questions import aiter_questions, iter_questions
+from .resilience import hedged_call, metrics, should_fall_back
+
+logger = logging.getLogger(__name__)
+
+# Options that do not affect the generated text (transport and ledger tags); kept out of cache keys.
+TRANSPORT_OPTIONS = ("timeout", "max_retries", "tags")
+
+# Static instructions. They form the start of every prompt of their task and are
+# marked with cache_control so Anthropic can reuse them between calls.
+QUESTION_INSTRUCTIONS = """You are an AI assistant for getting the project requirements from the client.
+You will be given the project info, followed by the predifined and ai asked questions along with their answers(if available).
+Please ask relevant questions to get the complete requirements from the client based on the questions and answers if any are missing.
+Please provide only the list of questions that need to be asked to the client to get the complete project requirements. Do not include any other text.
+Write one question per line as a JSON object, most important question first:
+{"question": "<the question>", "description": "<one short sentence on what a good answer covers>"}
+Do not number the questions, do not wrap them in a list or code block and do not add blank lines."""
+
+REQUIREMENT_INSTRUCTIONS = """You are an AI assistant for generating project requirements in HTML format that should be visually stunning and include:
+    • Project overview
+    • Detailed functional requirements
+    • Technical requirements
+    • User stories
+    • Acceptance criteria
+    • Wireframe descriptions (text)
+    • Database schema suggestions
+    • API endpoint list
+Excludes:
+    • User flow diagrams
+    • Timeline
+    • Costing
+Base the requirements on the client's answers to the questions asked.
+You will be given the project info, followed by the questions along with their answers provided by the client.
+Please generate a comprehensive project requirement based on those answers to be presented to the client."""
+
+SECTION_INSTRUCTIONS = """You are an AI assistant writing one section of a project requirements document for a client.
+You will be given the project info, followed by the questions along with their answers provided by the client.
+Each question has a reference code in square brackets, e.g. [P3] or [A2].
+Write only the requested section as a visually stunning HTML fragment wrapped in a single <section> element with inline styles.
+Do not include <html>, <head> or <body> tags and do not write any other section.
+Base the section on the client's answers. After the closing </section> tag, add one HTML comment listing the
+reference codes of every question whose answer you used, e.g. <!-- sources: P1, P3, A2 -->"""
+
+# Sections of a generated report, in document order. Each one is generated (and
+# regenerated) on its own; see projects.reports.
+REPORT_SECTIONS = [
+    {"key": "overview", "title": "Project overview", "brief": "Goals, target users, scope and key constraints of the project."},
+    {"key": "functional", "title": "Functional requirements", "brief": "Detailed functional requirements grouped by feature area."},
+    {"key": "technical", "title": "Technical requirements", "brief": "Platforms, integrations, performance, security and other non-functional requirements."},
+    {"key": "user_stories", "title": "User stories", "brief": "User stories in the form 'As a ..., I want ..., so that ...'."},
+    {"key": "acceptance", "title": "Acceptance criteria", "brief": "Testable acceptance criteria for the main features."},
+    {"key": "wireframes", "title": "Wireframe descriptions", "brief": "Text descriptions of the main screens and their layout. No diagrams."},
+    {"key": "database", "title": "Database schema suggestions", "brief": "Suggested entities, their fields and relationships."},
+    {"key": "api", "title": "API endpoint list", "brief": "Suggested REST API endpoints with method, path and purpose."},
+]
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def question_ref(question: dict) -> str:
+    """Short reference code of a transcript entry, e.g. ``P3`` (predefined) or ``A2`` (AI)."""
+    prefix = "A" if question["question_asked_by"] == "ai" else "P"
+    return f"{prefix}{question['id']}"
+
+
 class AnthropicPrompt:
-    def __init__(self, api_key: str, model: str = "claude-opus-4-20250514"):
-        self.api_key = api_key
+    def __init__(self, model: str = DEFAULT_MODEL):
         self.model = model
 
+    def get_system_blocks(self, instructions: str, project_info) -> list:
+        """
+        System prompt shared by every project of the same project type.
+
+        Two cache breakpoints: the task instructions (shared by all projects)
+        and the project-type context (shared by projects of that type).
+        """
+        project_type_context = (
+            f"Project type: {project_info['project_type']}\n"
+            f"Project type description: {project_info['project_type_description']}"
+        )
+        return [
+            {"type": "text", "text": instructions, "cache_control": CACHE_CONTROL},
+            {"type": "text", "text": project_type_context, "cache_control": CACHE_CONTROL},
+        ]
+
+    def get_question_system(self, project_info) -> list:
+        return self.get_system_blocks(QUESTION_INSTRUCTIONS, project_info)
+
+    def get_generating_requirement_system(self, project_info) -> list:
+        return self.get_system_blocks(REQUIREMENT_INSTRUCTIONS, project_info)
+
+    def get_section_system(self, project_info) -> list:
+        return self.get_system_blocks(SECTION_INSTRUCTIONS, project_info)
+
+    def format_transcript(self, all_questions: list, project_info, with_refs: bool = False) -> str:
+        """The per-project part of a prompt: project details followed by the Q&A pairs."""
+        prompt = (
+            f"Project name: {project_info['project_name']}\n"
+            f"Project description: {project_info['project_description']}\n\n"
+        )
+        for question in all_questions:
+            if with_refs:
+                prompt += f"Question [{question_ref(question)}]: {question['question_text']}\n"
+            else:
+                prompt += f"Question: {question['question_text']}\n"
+            if question['answer_text']:
+                prompt += f"Answer: {question['answer_text']}\n"
+            else:
+                prompt += "Answer: [No answer provided]\n"
+            prompt += f"Asked by: {question['question_asked_by']}\n\n"
+        return prompt
+
     def get_question_prompt(self, all_questions: list, project_info) -> str:
         """
-        Constructs a prompt for the Anthropic model based on a list of questions.
+        Constructs the user message for asking follow-up questions. The
+        instructions live in ``get_question_system``.
 
         Args:
             all_questions (list): A list of questions to include in the prompt.
@@ -20,24 +136,12 @@ class AnthropicPrompt:
                 "question_asked_by": str
             }
         """
-
-        prompt = f"You are an AI assistant for getting the project requirements with project info {str(project_info)} from the client.\n Following are the predifined and ai asked questions along with their answers(if available).\n Please ask relevant questions to get the complete requirements from the client based on the below questions and answers if any are missing.\n"
-        for question in all_questions:
-            prompt += f"Question: {question['question_text']}\n"
-            if question['answer_text']:
-                prompt += f"Answer: {question['answer_text']}\n"
-            else:
-                prompt += "Answer: [No answer provided]\n"
-            
-            prompt += f"Asked by: {question['question_asked_by']}\n\n"
-
-        prompt += "Please provide only the list of questions that need to be asked to the client to get the complete project requirements. Do not include any other text."
-
-        return prompt
+        return self.format_transcript(all_questions, project_info)
     
     def get_generating_requirement_prompt(self, all_questions: list, project_info) -> str:
         """
-        Constructs a prompt for generating project requirements based on a list of questions.
+        Constructs the user message for generating project requirements. The
+        instructions live in ``get_generating_requirement_system``.
 
         Args:
             all_questions (list): A list of questions to include in the prompt.
@@ -50,67 +154,306 @@ class AnthropicPrompt:
                 "question_asked_by": str
             }
         """
+        return self.format_transcript(all_questions, project_info)
+    
+    def get_section_prompt(self, section: dict, all_questions: list, project_info) -> list:
+        """
+        Constructs the user message for one report section.
 
-        prompt = f"""
-        You are an AI assistant for generating project with project info {str(project_info)} requirements in HTML format should be visually stunning include:
-            • Project overview
-            • Detailed functional requirements
-            • Technical requirements
-            • User stories
-            • Acceptance criteria
-            • Wireframe descriptions (text)
-            • Database schema suggestions
-            • API endpoint list 
-        Excludes:
-            • User flow diagrams
-            • Timeline
-            • Costing
-        Based on the client's answers to the questions asked.\n Following are the questions along with their answers provided by the client.\n Please generate a comprehensive project requirement based on the below answers to be presented to the client.\n"""
+        The transcript is the same for every section of a report, so it is its
+        own content block with a cache breakpoint; only the short section
+        request that follows it differs between calls.
+        """
+        return [
+            {
+                "type": "text",
+                "text": self.format_transcript(all_questions, project_info, with_refs=True),
+                "cache_control": CACHE_CONTROL,
+            },
+            {
+                "type": "text",
+                "text": f"Write only the \"{section['title']}\" section: {section['brief']}",
+            },
+        ]
 
-        for question in all_questions:
-            prompt += f"Question: {question['question_text']}\n"
-            if question['answer_text']:
-                prompt += f"Answer: {question['answer_text']}\n"
-            else:
-                prompt += "Answer: [No answer provided]\n"
-            prompt += f"Asked by: {question['question_asked_by']}\n\n"
-        return prompt
-    
-    def get_model_response(self, prompt: str) -> str:
+    def get_profile(self, task: str, project_info) -> dict:
+        """Messages API parameters (model, max_tokens, ...) of the task's generation profile."""
+        return profile_params(get_generation_profile(task, project_info.get("project_type_id")))
+
+    def get_tags(self, task: str, project_info) -> dict:
+        """LLM call ledger attribution of a call made for ``project_info``'s project."""
+        return {
+            "task": task,
+            "project_id": project_info.get("project_id"),
+            "project_type_id": project_info.get("project_type_id"),
+        }
+
+    def get_cache_key(self, prompt: str, options: dict, model: str = None) -> str:
+        params = {key: value for key, value in options.items() if key not in TRANSPORT_OPTIONS}
+        return response_cache_key(model or self.model, prompt, params)
+
+    def get_model_response(self, prompt: str, bypass_cache: bool = False, model: str = None, **options) -> str:
         """
         Calls the Anthropic model with the constructed prompt and returns the response.
 
+        Identical requests (same model, prompt and generation parameters) are
+        served from the LLM response cache instead of a new paid call.
+
         Args:
             prompt (str): The input prompt to send to the model.
+            bypass_cache (bool): Skip the cache lookup and refresh the cached response.
+            model (str): Model to use instead of ``self.model``.
+            **options: Per-call options for the LLM gateway (max_tokens, timeout, ...).
 
         Returns:
             str: The response from the model.
         """
-        response = call_anthropic_model(
-            api_key=self.api_key,
-            prompt=prompt,
-            model=self.model
+        model = model or self.model
+        response = response_cache.get_or_call(
+            self.get_cache_key(prompt, options, model),
+            lambda: call_anthropic_model(
+                prompt=prompt,
+                model=model,
+                **options
+            ),
+            bypass=bypass_cache,
         )
         return response
     
-    def ask_questions(self, all_questions: list, project_info) -> str:
-        print("All questions: ", all_questions)
+    def ask_questions(self, all_questions: list, project_info, bypass_cache: bool = False) -> list:
+        """
+        Generates the follow-up questions in one call.
+
+        Returns:
+            list: ``{"text", "description"}`` dicts, in the order they should be asked.
+        """
+        all_questions = compact_transcript(all_questions, "questions")
         prompt = self.get_question_prompt(all_questions, project_info)
-        print("AI question prompt: ", prompt)
-        response = self.get_model_response(prompt)
-        print("Claude Response: ", response)
-        questions = response.strip().split('\n\n')
-        print("Questions: ", questions)
-        return questions
-    
-    def generate_requirements(self, all_questions: list, project_info) -> str:
+        response = self.get_question_response(
+            prompt,
+            self.get_question_system(project_info),
+            {**self.get_profile("questions", project_info), "tags": self.get_tags("questions", project_info)},
+            bypass_cache,
+        )
+        return list(iter_questions([response]))
+
+    def get_question_request(self, all_questions: list, project_info) -> dict:
+        """
+        Prompt, system blocks, profile and ledger tags of a question
+        generation. Building it may touch the database and summarize long
+        answers, so async callers run it in a thread.
+        """
+        all_questions = compact_transcript(all_questions, "questions")
+        return {
+            "prompt": self.get_question_prompt(all_questions, project_info),
+            "system": self.get_question_system(project_info),
+            "params": self.get_profile("questions", project_info),
+            "tags": self.get_tags("questions", project_info),
+        }
+
+    def stream_questions(self, all_questions: list, project_info, bypass_cache: bool = False):
+        """
+        Same prompt as ``ask_questions`` but streamed: yields each
+        ``{"text", "description"}`` question as soon as the model has written it.
+        """
+        request = self.get_question_request(all_questions, project_info)
+        return iter_questions(self.stream_question_response(
+            request["prompt"], request["system"], request["params"], bypass_cache, tags=request["tags"]
+        ))
+
+    def astream_questions(self, request: dict, bypass_cache: bool = False):
+        """Async ``stream_questions`` for a request built by ``get_question_request``."""
+        return aiter_questions(self.astream_question_response(
+            request["prompt"], request["system"], request["params"], bypass_cache, tags=request["tags"]
+        ))
+
+    def stream_question_response(self, prompt: str, system: list, params: dict, bypass_cache: bool = False, tags: dict = None):
+        """
+        Streaming counterpart of ``get_question_response``. The stream switches
+        to ``LLM_QUESTION_FALLBACK_MODEL`` only if it fails before its first
+        chunk; hedging does not apply to streams.
+        """
+        fallback = settings.LLM_QUESTION_FALLBACK_MODEL
+        started = False
+        try:
+            for chunk in self.stream_model_response(prompt, system, params, bypass_cache=bypass_cache, tags=tags):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not fallback or fallback == params["model"] or not should_fall_back(e):
+                raise
+            logger.warning("question stream with %s failed (%s), using %s", params["model"], e, fallback)
+            metrics.incr(fallback, "fallbacks")
+        yield from self.stream_model_response(
+            prompt, system, {**params, "model": fallback}, bypass_cache=bypass_cache, tags=tags
+        )
+
+    async def astream_question_response(
+        self, prompt: str, system: list, params: dict, bypass_cache: bool = False, tags: dict = None
+    ):
+        """Async ``stream_question_response``."""
+        fallback = settings.LLM_QUESTION_FALLBACK_MODEL
+        started = False
+        try:
+            async for chunk in self.astream_model_response(prompt, system, params, bypass_cache=bypass_cache, tags=tags):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not fallback or fallback == params["model"] or not should_fall_back(e):
+                raise
+            logger.warning("question stream with %s failed (%s), using %s", params["model"], e, fallback)
+            metrics.incr(fallback, "fallbacks")
+        async for chunk in self.astream_model_response(
+            prompt, system, {**params, "model": fallback}, bypass_cache=bypass_cache, tags=tags
+        ):
+            yield chunk
+
+    def get_question_response(self, prompt: str, system: list, params: dict, bypass_cache: bool = False) -> str:
+        """
+        Question generation is on the interactive path, so it may be answered by
+        ``LLM_QUESTION_FALLBACK_MODEL`` when the profile's model fails with a
+        transient error or its circuit is open, or (with
+        ``LLM_QUESTION_HEDGE_AFTER``) when it is slow.
+        """
+        fallback = settings.LLM_QUESTION_FALLBACK_MODEL
+        if not fallback or fallback == params["model"]:
+            return self.get_model_response(prompt, bypass_cache=bypass_cache, system=system, **params)
+
+        def primary():
+            return self.get_model_response(prompt, bypass_cache=bypass_cache, system=system, **params)
+
+        def backup():
+            return self.get_model_response(
+                prompt, bypass_cache=bypass_cache, system=system, **{**params, "model": fallback}
+            )
+
+        hedge_after = settings.LLM_QUESTION_HEDGE_AFTER
+        if hedge_after:
+            response, used_backup = hedged_call(
+                primary, backup, hedge_after, settings.LLM_HEDGE_MAX_WORKERS,
+                on_hedge=lambda: metrics.incr(fallback, "hedges"),
+            )
+            if used_backup:
+                metrics.incr(fallback, "hedge_wins")
+            return response
+
+        try:
+            return primary()
+        except Exception as e:
+            if not should_fall_back(e):
+                raise
+            logger.warning("question generation with %s failed (%s), using %s", params["model"], e, fallback)
+            metrics.incr(fallback, "fallbacks")
+            return backup()
+
+    def generate_requirements(self, all_questions: list, project_info, bypass_cache: bool = False) -> str:
+        all_questions = compact_transcript(all_questions, "report")
         prompt = self.get_generating_requirement_prompt(all_questions, project_info)
-        response = self.get_model_response(prompt)
+        response = self.get_model_response(
+            prompt,
+            bypass_cache=bypass_cache,
+            system=self.get_generating_requirement_system(project_info),
+            tags=self.get_tags("report", project_info),
+            **self.get_profile("report", project_info)
+        )
 
         print("response: ", response)
         return response
 
-anthropic_prompt = AnthropicPrompt(api_key=CLAUDE_API_ENV)
+    def stream_requirements(self, all_questions: list, project_info, bypass_cache: bool = False):
+        """
+        Same prompt as ``generate_requirements`` but yields the report as the
+        model produces it, so callers can forward chunks before generation ends.
+        A cached report is yielded as a single chunk.
+        """
+        all_questions = compact_transcript(all_questions, "report")
+        prompt = self.get_generating_requirement_prompt(all_questions, project_info)
+        system = self.get_generating_requirement_system(project_info)
+        return self.stream_model_response(
+            prompt, system, self.get_profile("report", project_info), bypass_cache=bypass_cache,
+            tags=self.get_tags("report", project_info),
+        )
+
+    def generate_report_section(
+        self, section: dict, all_questions: list, project_info, bypass_cache: bool = False, params: dict = None
+    ) -> str:
+        """
+        Generates one report section from an already compacted transcript.
+        The returned HTML ends with the ``<!-- sources: ... -->`` comment.
+
+        ``params`` is the report profile; pass it when calling from worker
+        threads so the profile is not looked up there.
+        """
+        prompt = self.get_section_prompt(section, all_questions, project_info)
+        return self.get_model_response(
+            prompt,
+            bypass_cache=bypass_cache,
+            system=self.get_section_system(project_info),
+            tags=self.get_tags("report_section", project_info),
+            **(params or self.get_profile("report", project_info))
+        )
+
+    def get_report_section_request(self, section: dict, all_questions: list, project_info) -> dict:
+        """Messages API parameters of ``generate_report_section``, for submitting it in a Message Batch."""
+        return {
+            **self.get_profile("report", project_info),
+            "system": self.get_section_system(project_info),
+            "messages": [
+                {
+                    "role": "user",
+                    "content": self.get_section_prompt(section, all_questions, project_info)
+                }
+            ],
+        }
+
+    def stream_report_section(self, section: dict, all_questions: list, project_info, bypass_cache: bool = False):
+        """Streaming variant of ``generate_report_section``."""
+        prompt = self.get_section_prompt(section, all_questions, project_info)
+        system = self.get_section_system(project_info)
+        return self.stream_model_response(
+            prompt, system, self.get_profile("report", project_info), bypass_cache=bypass_cache,
+            tags=self.get_tags("report_section", project_info),
+        )
+
+    def stream_model_response(self, prompt, system: list, params: dict, bypass_cache: bool = False, tags: dict = None):
+        """Yields the response text as it is generated, going through the response cache."""
+        options = {key: value for key, value in params.items() if key != "model"}
+        cache_key = self.get_cache_key(prompt, {**options, "system": system}, params["model"])
+
+        if not bypass_cache:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        for chunk in gateway.stream_text(prompt, system=system, tags=tags, **params):
+            chunks.append(chunk)
+            yield chunk
+        response_cache.set(cache_key, "".join(chunks))
+
+    async def astream_model_response(
+        self, prompt, system: list, params: dict, bypass_cache: bool = False, tags: dict = None
+    ):
+        """Async ``stream_model_response``; cache lookups run in a thread."""
+        options = {key: value for key, value in params.items() if key != "model"}
+        cache_key = self.get_cache_key(prompt, {**options, "system": system}, params["model"])
+
+        if not bypass_cache:
+            cached = await sync_to_async(response_cache.get)(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        async for chunk in gateway.astream_text(prompt, system=system, tags=tags, **params):
+            chunks.append(chunk)
+            yield chunk
+        await sync_to_async(response_cache.set)(cache_key, "".join(chunks))
+
+anthropic_prompt = AnthropicPrompt()
 
 if __name__ == "__main__":
     questions = [{'id': 1, 'question_text': 'What products or services will you sell, and do they have variations?', 'answer_text': 'We sell lifestyle products including T-shirts, hoodies, accessories, and home décor items. Most products have variations such as size (S–XL), color options, and different designs. All products are physical goods.', 'question_asked_by': 'predefined'}, {'id': 2, 'question_text': 'What core features do you expect in the website?', 'answer_text': 'We want a standard e-commerce setup with product listing, product detail pages, shopping cart, checkout, and user accounts. \nAdditional features we want:\n* Search with filters\n* Wishlist\n* Coupons/discounts\n* Reviews & ratings\n* Order tracking\n* Inventory auto-update\n* Basic analytics for sales', 'question_asked_by': 'predefined'}, {'id': 3, 'question_text': 'What payment and shipping methods do you want to integrate?', 'answer_text': 'For payments, we want UPI, credit/debit card, net banking, and wallet options, preferably using Razorpay. For shipping, we want integration with logistics providers like Shiprocket or Delhivery. We also want different shipping rates based on location and weight.', 'question_asked_by': 'predefined'}, {'id': 4, 'question_text': 'Do you have design preferences or reference websites?', 'answer_text': 'We prefer a clean, modern design with minimal colors, similar to websites like Nike or H&M. The layout should be mobile-friendly, fast to load, and visually appealing. We will provide our brand colors and logo.', 'question_asked_by': 'predefined'}, {'id': 5, 'question_text': 'How do you want to manage inventory, orders, and notifications?', 'answer_text': 'We need an admin dashboard to manage products, stock, and orders. Stock should update automatically when orders are placed.\nNotifications needed:\n* Order confirmation email/SMS\n* Shipping update\n* Delivery confirmation\n* Low-inventory alerts for admin', 'question_asked_by': 'predefined'}]
@@ -0,0 +1,84 @@
+import json
+
+# Questions are asked for as JSON Lines rather than as a tool's input_schema:
+# the response cache, the batch path and the gateway streams all carry plain
+# text, and each line can be parsed on its own as soon as it completes.
+
+# Leading list markers the model sometimes puts before a plain-text question.
+LIST_MARKERS = "-*•0123456789.) "
+
+
+def parse_question(line: str):
+    """
+    One follow-up question from a line of the model's JSON Lines output, as
+    ``{"text", "description"}``, or None for a blank or unusable line.
+
+    A plain-text line ending in "?" is still accepted (without description),
+    so a response that drifts from the format loses no questions.
+    """
+    line = line.strip().rstrip(",")
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        text = str(data.get("question") or "").strip()
+        if not text:
+            return None
+        return {"text": text, "description": str(data.get("description") or "").strip()}
+
+    text = line.lstrip(LIST_MARKERS).strip()
+    if text.endswith("?"):
+        return {"text": text, "description": ""}
+    return None
+
+
+class QuestionParser:
+    """
+    Turns streamed text into questions as soon as each line is complete,
+    skipping unusable lines and repeated questions.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.seen = set()
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split("\n")
+        return self._parse(lines)
+
+    def close(self) -> list:
+        lines, self.buffer = [self.buffer], ""
+        return self._parse(lines)
+
+    def _parse(self, lines) -> list:
+        questions = []
+        for line in lines:
+            question = parse_question(line)
+            if question and question["text"].lower() not in self.seen:
+                self.seen.add(question["text"].lower())
+                questions.append(question)
+        return questions
+
+
+def iter_questions(chunks):
+    """Yields the questions of a streamed response as they complete."""
+    parser = QuestionParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_questions(chunks):
+    """``iter_questions`` for an async stream."""
+    parser = QuestionParser()
+    async for chunk in chunks:
+        for question in parser.feed(chunk):
+            yield question
+    for question in parser.close():
+        yield question
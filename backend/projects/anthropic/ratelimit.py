@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .resilience import RateLimitExceeded, current_lane, metrics, remaining_time
+from .tokens import estimate_tokens
+
+# Seconds the Redis backend is skipped (in favour of local buckets) after an error.
+REDIS_RETRY_AFTER = 5
+
+# Buckets refill their full capacity over one minute.
+WINDOW = 60
+
+logger = logging.getLogger(__name__)
+
+# Takes ``cost`` from every bucket in KEYS, or from none of them. ARGV holds a
+# capacity, a cost and a floor per key: the bucket must keep at least ``floor``
+# after paying. A negative cost returns tokens. Returns "0" on success,
+# otherwise the seconds until all buckets could pay.
+TAKE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[3 * i - 2])
+    local need = tonumber(ARGV[3 * i - 1]) + tonumber(ARGV[3 * i])
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    level = math.min(capacity, level + elapsed * capacity / 60)
+    levels[i] = level
+    if need > level then
+        wait = math.max(wait, (need - level) * 60 / capacity)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[3 * i - 2])
+    local level = math.min(capacity, levels[i] - tonumber(ARGV[3 * i - 1]))
+    redis.call('HSET', key, 'level', tostring(level), 'ts', tostring(now))
+    redis.call('EXPIRE', key, 120)
+end
+return '0'
+"""
+
+
+class LocalBuckets:
+    """Token buckets in this process's memory, for single-node deployments."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, costs: dict) -> float:
+        """
+        Takes the costs of ``{key: (capacity, cost, floor)}`` from all buckets
+        or none; each bucket must keep ``floor`` after paying.
+
+        Returns:
+            float: 0 on success, else seconds until the buckets could pay.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = {}
+            wait = 0
+            for key, (capacity, cost, floor) in costs.items():
+                level, updated_at = self._buckets.get(key, (capacity, now))
+                level = min(capacity, level + (now - updated_at) * capacity / WINDOW)
+                levels[key] = level
+                if cost + floor > level:
+                    wait = max(wait, (cost + floor - level) * WINDOW / capacity)
+            if wait:
+                return wait
+            for key, (capacity, cost, _) in costs.items():
+                self._buckets[key] = (min(capacity, levels[key] - cost), now)
+            return 0
+
+
+class RedisBuckets:
+    """
+    Token buckets in Redis, shared by every web and Celery process. While Redis
+    is unreachable the process falls back to its own local buckets rather than
+    stopping all LLM traffic.
+    """
+
+    def __init__(self, url: str = None):
+        self.url = url
+        self.local = LocalBuckets()
+        self._client = None
+        self._script = None
+        self._down_until = 0
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._client = None
+        self._script = None
+        self._lock = threading.Lock()
+
+    @property
+    def script(self):
+        with self._lock:
+            if self._script is None:
+                import redis
+
+                self._client = redis.Redis.from_url(
+                    self.url or settings.ANTHROPIC_RATE_LIMIT_REDIS_URL,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=0.5,
+                )
+                self._script = self._client.register_script(TAKE_SCRIPT)
+            return self._script
+
+    def take(self, costs: dict) -> float:
+        if self._down_until > time.monotonic():
+            return self.local.take(costs)
+        args = []
+        for capacity, cost, floor in costs.values():
+            args += [capacity, cost, floor]
+        try:
+            return float(self.script(keys=list(costs), args=args))
+        except Exception as e:
+            logger.warning("rate limiter redis unavailable (%s), using local buckets", e)
+            self._down_until = time.monotonic() + REDIS_RETRY_AFTER
+            return self.local.take(costs)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits on outbound Anthropic
+    calls, enforced per model with two token buckets.
+
+    A call reserves one request and its estimated tokens (prompt plus
+    ``max_tokens``) before it is sent; once the real usage is known the unused
+    part of the reservation is returned.
+
+    Calls in a lower priority lane (``LLM_LANES``) may not take the share of a
+    bucket their lane reserves for the lanes above, so background work can
+    never drain the budget that interactive requests need.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                if settings.ANTHROPIC_RATE_LIMIT_BACKEND == "redis":
+                    self._backend = RedisBuckets()
+                else:
+                    self._backend = LocalBuckets()
+            return self._backend
+
+    def limits(self, model: str):
+        """``(requests per minute, tokens per minute)`` of ``model``; 0 means unlimited."""
+        return settings.ANTHROPIC_MODEL_RATE_LIMITS.get(
+            model, (settings.ANTHROPIC_RPM_LIMIT, settings.ANTHROPIC_TPM_LIMIT)
+        )
+
+    def estimate(self, prompt, max_tokens: int, params: dict) -> int:
+        """Tokens to reserve for a request: rough input size plus the output cap."""
+        return estimate_tokens(str(prompt)) + estimate_tokens(str(params.get("system") or "")) + max_tokens
+
+    def _costs(self, model: str, requests: int, tokens: int, reserve: float = 0.0) -> dict:
+        rpm, tpm = self.limits(model)
+        costs = {}
+        for key, capacity, cost in (("requests", rpm, requests), ("tokens", tpm, tokens)):
+            if capacity:
+                # A request larger than the whole bucket could never be sent otherwise.
+                cost = min(cost, capacity)
+                costs[f"llm-ratelimit:{model}:{key}"] = (capacity, cost, min(capacity * reserve, capacity - cost))
+        return costs
+
+    def _lane_costs(self, model: str, tokens: int) -> dict:
+        return self._costs(model, 1, tokens, settings.LLM_LANES[current_lane()]["reserve"])
+
+    def _wait_budget(self, wait: float = None) -> float:
+        if wait is None:
+            wait = settings.LLM_LANES[current_lane()]["max_wait"]
+        budget = wait
+        remaining = remaining_time()
+        return budget if remaining is None else min(budget, remaining)
+
+    def _next_delay(self, model: str, delay: float, waited_until: float) -> float:
+        """Sleep before the next try, or raises when it would pass ``waited_until``."""
+        if time.monotonic() + delay > waited_until:
+            metrics.incr(model, "rate_limited")
+            raise RateLimitExceeded(f"Rate limit for {model} reached; retry in {delay:.1f}s")
+        metrics.incr(model, "rate_limit_waits")
+        # Jitter spreads out the processes that were waiting on the same refill.
+        return delay + random.uniform(0, 0.1)
+
+    def acquire(self, model: str, tokens: int, wait: float = None):
+        """
+        Reserves one request and ``tokens`` for ``model``, sleeping while the
+        buckets refill for at most ``wait`` seconds (the lane's ``max_wait`` by
+        default) and never past the request deadline. ``wait=0`` fails fast.
+
+        Raises:
+            RateLimitExceeded: The reservation did not fit within the wait.
+        """
+        costs = self._lane_costs(model, tokens)
+        if not costs:
+            return
+        waited_until = time.monotonic() + self._wait_budget(wait)
+        while delay := self.backend.take(costs):
+            time.sleep(self._next_delay(model, delay, waited_until))
+
+    async def aacquire(self, model: str, tokens: int, wait: float = None):
+        """``acquire`` that waits without blocking the event loop."""
+        costs = self._lane_costs(model, tokens)
+        if not costs:
+            return
+        take = sync_to_async(self.backend.take, thread_sensitive=False)
+        waited_until = time.monotonic() + self._wait_budget(wait)
+        while delay := await take(costs):
+            await asyncio.sleep(self._next_delay(model, delay, waited_until))
+
+    def release(self, model: str, tokens: int):
+        """Returns unused reserved tokens to ``model``'s bucket."""
+        if tokens <= 0 or not self.limits(model)[1]:
+            return
+        self.backend.take(self._costs(model, 0, -tokens))
+
+    async def arelease(self, model: str, tokens: int):
+        """``release`` without blocking the event loop on a Redis round trip."""
+        if tokens <= 0 or not self.limits(model)[1]:
+            return
+        await sync_to_async(self.backend.take, thread_sensitive=False)(self._costs(model, 0, -tokens))
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,347 @@
+import contextvars
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from contextlib import contextmanager
+
+import anthropic
+
+# Absolute time.monotonic() deadline of the current request, if any.
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+# Priority lane (a key of settings.LLM_LANES) the current LLM work belongs to.
+_lane = contextvars.ContextVar("llm_lane", default="interactive")
+
+LATENCY_SAMPLES = 200
+
+
+class DeadlineExceeded(Exception):
+    """The request's LLM deadline passed before (or while) the model was called."""
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker for a model is open; the call was not attempted."""
+
+
+class RateLimitExceeded(Exception):
+    """The model's outbound rate limit had no room within the caller's wait; the call was not attempted."""
+
+
+@contextmanager
+def llm_deadline(seconds: float):
+    """
+    Bounds the total time LLM calls made inside the block may take, retries
+    included. Nested deadlines can only shorten the enclosing one.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def llm_lane(name: str):
+    """Runs the block's LLM calls in priority lane ``name`` (see ``LLM_LANES``)."""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+def iterate_in_lane(iterable, name: str):
+    """
+    Yields from ``iterable`` with each step's LLM calls in lane ``name``.
+    Unlike ``llm_lane`` around a loop, the lane does not stay set in the
+    consumer's context while the generator is suspended.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            with llm_lane(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            with llm_lane(name):
+                iterator.close()
+
+
+def remaining_time():
+    """Seconds left until the current deadline, or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def is_transient(exc: Exception) -> bool:
+    """429, 5xx (including 529 overloaded), timeouts and connection errors are worth retrying."""
+    if isinstance(exc, (anthropic.APIConnectionError, anthropic.RateLimitError)):
+        return True
+    return isinstance(exc, anthropic.APIStatusError) and exc.status_code >= 500
+
+
+def should_fall_back(exc: Exception) -> bool:
+    """Errors after which another model may still answer the same request."""
+    return isinstance(exc, (CircuitOpenError, RateLimitExceeded)) or is_transient(exc)
+
+
+def retry_after(exc: Exception):
+    """Server-suggested wait in seconds from a ``retry-after`` header, if present."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, suggested: float = None) -> float:
+    """
+    Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)],
+    or the server's ``retry-after`` (capped) when it gave one.
+    """
+    if suggested is not None:
+        return min(cap, suggested)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` transient failures in a row the circuit opens
+    and calls fail fast for ``reset_timeout`` seconds. Then one probe call is
+    let through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+class LLMMetrics:
+    """Per-model call counters and recent latencies for this process."""
+
+    COUNTERS = (
+        "calls", "successes", "failures", "retries", "circuit_rejections",
+        "deadline_exceeded", "fallbacks", "hedges", "hedge_wins", "rate_limit_waits", "rate_limited",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: dict.fromkeys(self.COUNTERS, 0))
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def incr(self, model: str, counter: str):
+        with self._lock:
+            self._counters[model][counter] += 1
+
+    def observe(self, model: str, seconds: float):
+        with self._lock:
+            self._latencies[model].append(seconds * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for model, counters in self._counters.items():
+                samples = sorted(self._latencies[model])
+                result[model] = {
+                    **counters,
+                    "latency_ms": {
+                        "p50": self._percentile(samples, 50),
+                        "p95": self._percentile(samples, 95),
+                        "p99": self._percentile(samples, 99),
+                    },
+                }
+            return result
+
+    def _percentile(self, samples, pct):
+        if not samples:
+            return None
+        index = min(len(samples) - 1, round(pct / 100 * (len(samples) - 1)))
+        return round(samples[index], 1)
+
+
+metrics = LLMMetrics()
+
+
+class LoadMonitor:
+    """
+    In-flight upstream calls, in-flight LLM-bound requests and recent attempt
+    latencies of this process, which decide when new LLM-bound requests are
+    shed (projects.middleware.LLMLoadSheddingMiddleware).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight_calls = 0
+        self.in_flight_requests = 0
+        self.shed_requests = 0
+        # (finished at, seconds) of recent attempts, failed ones included.
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @contextmanager
+    def call(self):
+        self.call_started()
+        try:
+            yield
+        finally:
+            self.call_finished()
+
+    def call_started(self):
+        """Counts a call in flight until ``call_finished``, for streams that outlive the call that opened them."""
+        with self._lock:
+            self.in_flight_calls += 1
+
+    def call_finished(self):
+        with self._lock:
+            self.in_flight_calls -= 1
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight_requests += 1
+
+    def request_finished(self):
+        with self._lock:
+            self.in_flight_requests -= 1
+
+    def record_shed(self):
+        with self._lock:
+            self.shed_requests += 1
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._latencies.append((time.monotonic(), seconds))
+
+    def recent_latency(self, window: float, min_samples: int, pct: int = 95):
+        """``pct`` percentile in seconds of the attempts of the last ``window`` seconds, or None with too few."""
+        since = time.monotonic() - window
+        with self._lock:
+            samples = sorted(seconds for finished_at, seconds in self._latencies if finished_at >= since)
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, round(pct / 100 * (len(samples) - 1)))]
+
+    def overload(self, max_in_flight: int, max_latency: float, window: float, min_samples: int):
+        """Why new LLM-bound work should be refused right now, or None. 0 disables a threshold."""
+        if max_in_flight and self.in_flight_calls >= max_in_flight:
+            return f"{self.in_flight_calls} LLM calls in flight"
+        if max_latency:
+            latency = self.recent_latency(window, min_samples)
+            if latency is not None and latency >= max_latency:
+                return f"upstream p95 latency {latency:.1f}s"
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight_calls": self.in_flight_calls,
+                "in_flight_requests": self.in_flight_requests,
+                "shed_requests": self.shed_requests,
+            }
+
+
+load = LoadMonitor()
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _executor(max_workers: int) -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        return _hedge_executor
+
+
+def hedged_call(primary, backup, hedge_after: float, max_workers: int = 8, on_hedge=None):
+    """
+    Runs ``primary``; if it has not finished after ``hedge_after`` seconds,
+    also starts ``backup`` and returns whichever succeeds first. If ``primary``
+    fails fast with a fallback-worthy error, ``backup`` runs on its own.
+    ``on_hedge`` is called when the backup is started next to the primary.
+
+    Returns:
+        tuple: ``(result, used_backup)``.
+    """
+    executor = _executor(max_workers)
+    # Each call gets its own copy of the context so the request deadline applies in the worker.
+    first = executor.submit(contextvars.copy_context().run, primary)
+    try:
+        return first.result(timeout=hedge_after), False
+    except FutureTimeout:
+        pass
+    except Exception as e:
+        if not should_fall_back(e):
+            raise
+        return backup(), True
+
+    if on_hedge:
+        on_hedge()
+    second = executor.submit(contextvars.copy_context().run, backup)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result(), future is second
+            except Exception as e:
+                error = e
+    raise error
@@ -0,0 +1,466 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .tokens import estimate_tokens
+
+BATCH_PATH_RE = re.compile(r"^/v1/messages/batches/(?P<batch_id>[\w-]+)(?P<results>/results)?/?$")
+
+# Error type the Messages API reports for each injectable status code.
+ERROR_TYPES = {
+    400: "invalid_request_error",
+    404: "not_found_error",
+    429: "rate_limit_error",
+    500: "api_error",
+    503: "api_error",
+    529: "overloaded_error",
+}
+# Headers forwarded to the real API when recording.
+UPSTREAM_HEADERS = ("x-api-key", "authorization", "anthropic-version", "anthropic-beta", "content-type")
+WORDS = (
+    "project users admin dashboard payment mobile report login search export data api "
+    "integration deadline budget feature role notification upload schedule support"
+).split()
+STREAM_CHUNK_TOKENS = 4
+
+
+def parse_distribution(spec):
+    """
+    Parses a latency or size distribution, sampled with a ``random.Random``:
+
+        "0.4"                 constant
+        "uniform:0.2:1.5"     uniform between two values
+        "normal:0.8:0.2"      normal (mean, stddev), clamped at 0
+        "lognormal:0.8:0.5"   log-normal (median, sigma): a long right tail like real APIs
+        "exp:0.5"             exponential (mean)
+
+    Raises:
+        ValueError: If the spec is malformed.
+    """
+    if spec is None or callable(spec):
+        return spec
+    kind, _, args = str(spec).partition(":")
+    try:
+        if not args:
+            value = float(kind)
+            return lambda rng: value
+        values = [float(arg) for arg in args.split(":")]
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high)
+        if kind == "normal":
+            mean, stddev = values
+            return lambda rng: max(0.0, rng.gauss(mean, stddev))
+        if kind == "lognormal":
+            median, sigma = values
+            return lambda rng: rng.lognormvariate(0, sigma) * median
+        if kind == "exp":
+            (mean,) = values
+            return lambda rng: rng.expovariate(1 / mean)
+    except ValueError:
+        pass
+    raise ValueError(f"Malformed distribution {spec!r}; see parse_distribution for the accepted forms.")
+
+
+def parse_error_rates(spec) -> list:
+    """Parses ``"529:0.05,500:0.01"`` into ``[(529, 0.05), (500, 0.01)]``."""
+    if not spec:
+        return []
+    if not isinstance(spec, str):
+        return list(spec)
+    rates = []
+    for part in spec.split(","):
+        status, _, rate = part.partition(":")
+        try:
+            rates.append((int(status), float(rate)))
+        except ValueError:
+            raise ValueError(f"Malformed error rate {part!r}; expected STATUS:PROBABILITY.")
+    return rates
+
+
+def request_key(request: dict) -> str:
+    """Identifies a Messages API request independently of whether it was streamed."""
+    payload = {name: value for name, value in request.items() if name != "stream"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def input_token_count(request: dict) -> int:
+    return estimate_tokens(json.dumps([request.get("system"), request.get("messages")]))
+
+
+def synthetic_text(rng: random.Random, output_tokens: int) -> str:
+    """Deterministic filler of about ``output_tokens`` tokens, in question-like paragraphs."""
+    paragraphs = []
+    remaining = output_tokens
+    while remaining > 0:
+        size = min(remaining, rng.randint(12, 40))
+        # ~4 characters per token, matching estimate_tokens.
+        words = [rng.choice(WORDS) for _ in range(max(1, size * 4 // 7))]
+        paragraphs.append(" ".join(words).capitalize() + "?")
+        remaining -= size
+    return "\n\n".join(paragraphs)
+
+
+def stub_message(request: dict, text: str = "stub response", usage: dict = None) -> dict:
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "stub"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": usage or {"input_tokens": 1, "output_tokens": 2},
+    }
+
+
+def error_body(status: int, message: str) -> dict:
+    return {"type": "error", "error": {"type": ERROR_TYPES.get(status, "api_error"), "message": message}}
+
+
+class Cassette:
+    """
+    Recorded Messages API responses keyed by ``request_key``, stored as one
+    JSON file so a recording can be committed next to a benchmark and replayed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.interactions = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.interactions = json.load(f).get("interactions", {})
+
+    def get(self, key: str):
+        with self.lock:
+            return self.interactions.get(key)
+
+    def put(self, key: str, request: dict, response: dict, elapsed: float):
+        with self.lock:
+            self.interactions[key] = {"request": request, "response": response, "elapsed": round(elapsed, 3)}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": 1, "interactions": self.interactions}, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+class UpstreamError(Exception):
+    def __init__(self, status: int, body: bytes):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+class StubAnthropicHandler(BaseHTTPRequestHandler):
+    """
+    Offline stand-in for the Anthropic Messages (plain and streaming) and
+    Message Batches APIs, for load tests and benchmarks.
+
+    Responses are deterministic: everything random about a request (latency,
+    length, text, injected errors) is drawn from a generator seeded with
+    ``seed``, the request itself and how many times it was seen before.
+
+    - ``latency``: distribution of the time to the first token, in seconds.
+    - ``tokens_per_second``: output throughput after the first token (None: instant).
+    - ``output_tokens``: distribution of the response length, capped at ``max_tokens``.
+    - ``error_rates``: ``[(status, probability)]`` of injected API errors.
+    - ``mode``: ``stub`` answers with synthetic text; ``record`` forwards to
+      ``upstream`` and saves the responses in ``cassette``; ``replay`` answers
+      from ``cassette``, paced by the same latency model. A request missing
+      from the cassette gets a 404, or a synthetic answer with
+      ``replay_miss="stub"``.
+
+    ``setup`` runs once per TCP connection, so sleeping there models the cost
+    of the TCP + TLS handshake that a real API connection pays. A batch ends
+    ``batch_delay`` seconds after it was created; with ``fail_every`` set,
+    every n-th request of a batch comes back as an ``errored`` result.
+    ``GET /_stub/stats`` returns the server's counters.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    handshake_delay = 0.0
+    latency = None
+    tokens_per_second = None
+    output_tokens = staticmethod(parse_distribution("uniform:40:200"))
+    error_rates = []
+    seed = 0
+    mode = "stub"
+    cassette = None
+    upstream = "https://api.anthropic.com"
+    replay_miss = "error"
+    batch_delay = 0.0
+    fail_every = 0
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.handshake_delay)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path == "/v1/messages":
+            return self.handle_message(request)
+        if path == "/v1/messages/batches":
+            return self.send_json(self.create_batch(request["requests"]))
+        self.send_json(error_body(404, path), status=404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.rstrip("/") == "/_stub/stats":
+            with self.server.lock:
+                return self.send_json({"connections": self.server.connections, **self.server.counters})
+        match = BATCH_PATH_RE.match(path)
+        batch = match and self.server.batches.get(match["batch_id"])
+        if not batch:
+            return self.send_json(error_body(404, self.path), status=404)
+        if match["results"]:
+            return self.send_results(batch)
+        self.send_json(self.batch_object(batch))
+
+    def count(self, counter: str):
+        with self.server.lock:
+            self.server.counters[counter] += 1
+
+    def rng_for(self, request: dict) -> random.Random:
+        key = request_key(request)
+        with self.server.lock:
+            occurrence = self.server.seen[key]
+            self.server.seen[key] += 1
+        return random.Random(f"{self.seed}:{key}:{occurrence}")
+
+    def injected_error(self, rng: random.Random):
+        roll = rng.random()
+        for status, rate in self.error_rates:
+            if roll < rate:
+                return status
+            roll -= rate
+        return None
+
+    def respond(self, request: dict, rng: random.Random) -> dict:
+        """The message for ``request`` in the current mode; raises UpstreamError when it has none."""
+        if self.mode == "stub":
+            return self.synthetic_message(request, rng)
+
+        key = request_key(request)
+        if self.mode == "record":
+            started = time.monotonic()
+            message = self.forward(request)
+            self.cassette.put(key, request, message, time.monotonic() - started)
+            self.count("recorded")
+            return message
+
+        recorded = self.cassette.get(key)
+        if recorded is not None:
+            self.count("replayed")
+            return recorded["response"]
+        self.count("replay_misses")
+        if self.replay_miss == "stub":
+            return self.synthetic_message(request, rng)
+        raise UpstreamError(404, json.dumps(error_body(404, "No recorded response for this request.")).encode())
+
+    def synthetic_message(self, request: dict, rng: random.Random) -> dict:
+        output_tokens = max(1, min(int(self.output_tokens(rng)), request.get("max_tokens", 1024)))
+        usage = {"input_tokens": input_token_count(request), "output_tokens": output_tokens}
+        message = stub_message(request, synthetic_text(rng, output_tokens), usage)
+        message["id"] = f"msg_stub_{rng.getrandbits(64):016x}"
+        return message
+
+    def forward(self, request: dict) -> dict:
+        headers = {name: self.headers[name] for name in UPSTREAM_HEADERS if self.headers.get(name)}
+        body = json.dumps({**request, "stream": False}).encode()
+        upstream = urllib.request.Request(f"{self.upstream}/v1/messages", data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(upstream, timeout=600) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise UpstreamError(e.code, e.read())
+
+    def handle_message(self, request: dict):
+        self.count("requests")
+        rng = self.rng_for(request)
+        first_token_delay = self.latency(rng) if self.latency else 0.0
+        status = self.injected_error(rng)
+        if status:
+            self.count("injected_errors")
+            time.sleep(first_token_delay)
+            return self.send_json(error_body(status, "Injected by the Anthropic stub."), status=status)
+        try:
+            message = self.respond(request, rng)
+        except UpstreamError as e:
+            return self.send_body(e.body, "application/json", e.status)
+
+        # A recorded response already took the real API's time.
+        paced = self.mode != "record"
+        if paced:
+            time.sleep(first_token_delay)
+        if request.get("stream"):
+            return self.send_stream(message, paced)
+        if paced and self.tokens_per_second:
+            time.sleep(message["usage"]["output_tokens"] / self.tokens_per_second)
+        self.send_json(message)
+
+    def send_stream(self, message: dict, paced: bool = True):
+        """Sends ``message`` as Messages API server-sent events, paced by ``tokens_per_second``."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        text = "".join(block.get("text", "") for block in message["content"])
+        usage = message["usage"]
+        self.send_event("message_start", {
+            "type": "message_start",
+            "message": {**message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1}},
+        })
+        self.send_event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+        })
+        chunk_chars = STREAM_CHUNK_TOKENS * 4
+        for start in range(0, len(text), chunk_chars):
+            if start and paced and self.tokens_per_second:
+                time.sleep(STREAM_CHUNK_TOKENS / self.tokens_per_second)
+            self.send_event("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": text[start:start + chunk_chars]},
+            })
+        self.send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self.send_event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": message.get("stop_sequence")},
+            "usage": {"output_tokens": usage["output_tokens"]},
+        })
+        self.send_event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send_event(self, event: str, data: dict):
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def create_batch(self, requests: list) -> dict:
+        batch = {
+            "id": f"msgbatch_stub_{next(self.server.batch_ids)}",
+            "created_at": datetime.now(timezone.utc),
+            "ready_at": time.monotonic() + self.batch_delay,
+            "requests": requests,
+            "results": None,
+        }
+        with self.server.lock:
+            self.server.batches[batch["id"]] = batch
+        return self.batch_object(batch)
+
+    def batch_results(self, batch: dict) -> list:
+        # Computed once, when the batch is first seen ended, so counts and results agree.
+        if batch["results"] is not None:
+            return batch["results"]
+        results = []
+        for position, request in enumerate(batch["requests"], start=1):
+            rng = self.rng_for(request["params"])
+            failure = None
+            if self.fail_every and position % self.fail_every == 0:
+                failure = "stub failure"
+            elif self.injected_error(rng):
+                failure = "injected by the Anthropic stub"
+            if failure is None:
+                try:
+                    result = {"type": "succeeded", "message": self.respond(request["params"], rng)}
+                except UpstreamError as e:
+                    failure = e.body.decode(errors="replace")
+            if failure is not None:
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error", "message": failure}}}
+            results.append({"custom_id": request["custom_id"], "result": result})
+        batch["results"] = results
+        return results
+
+    def batch_object(self, batch: dict) -> dict:
+        ended = time.monotonic() >= batch["ready_at"]
+        total = len(batch["requests"])
+        counts = {"processing": total, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if ended:
+            errored = sum(result["result"]["type"] == "errored" for result in self.batch_results(batch))
+            counts.update(processing=0, succeeded=total - errored, errored=errored)
+        host = self.headers.get("Host")
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": batch["created_at"].isoformat(),
+            "expires_at": (batch["created_at"] + timedelta(days=1)).isoformat(),
+            "ended_at": datetime.now(timezone.utc).isoformat() if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{host}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def send_results(self, batch: dict):
+        body = "\n".join(json.dumps(result) for result in self.batch_results(batch)).encode()
+        self.send_body(body, "application/binary")
+
+    def send_json(self, payload: dict, status: int = 200):
+        self.send_body(json.dumps(payload).encode(), "application/json", status)
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once; the default backlog of 5 drops them.
+    request_queue_size = 1024
+
+
+def make_stub_server(host: str = "127.0.0.1", port: int = 0, **handler_options) -> StubServer:
+    """
+    Builds (without starting) a stub server; ``handler_options`` override the
+    handler's class attributes. ``latency`` and ``output_tokens`` accept
+    ``parse_distribution`` specs, ``error_rates`` a ``parse_error_rates`` spec
+    and ``cassette`` a file path.
+
+    Raises:
+        ValueError: If an option is malformed or a mode lacks its cassette.
+    """
+    for name in ("latency", "output_tokens"):
+        if name in handler_options:
+            handler_options[name] = staticmethod(parse_distribution(handler_options[name]))
+    if "error_rates" in handler_options:
+        handler_options["error_rates"] = parse_error_rates(handler_options["error_rates"])
+    mode = handler_options.get("mode", "stub")
+    if mode not in ("stub", "record", "replay"):
+        raise ValueError("mode must be one of: stub, record, replay.")
+    if mode != "stub":
+        if not handler_options.get("cassette"):
+            raise ValueError(f"{mode} mode needs a cassette file.")
+        handler_options["cassette"] = Cassette(handler_options["cassette"])
+
+    handler = type("Handler", (StubAnthropicHandler,), handler_options)
+    server = StubServer((host, port), handler)
+    server.connections = 0
+    server.counters = Counter({"requests": 0, "injected_errors": 0})
+    server.seen = Counter()
+    server.batches = {}
+    server.batch_ids = itertools.count(1)
+    server.lock = threading.Lock()
+    return server
@@ -0,0 +1,16 @@
+import math
+
+# Rough characters-per-token ratio for English text with Claude tokenizers.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, offline token estimate used for prompt budgeting.
+
+    Exact counts would need a count_tokens API round-trip per answer; budgets
+    only need to be right to within a few percent.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
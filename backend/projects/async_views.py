@@ -0,0 +1,216 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import AI_Answer, AI_Question, Answer, Project, Project_Report, Question
+from .serializers import (
+    AI_AnswerSerializer, AI_QuestionSerializer, AnswerSerializer, Project_ReportSerializer, QuestionSerializer,
+    ReportJobSerializer,
+)
+from .throttles import LLM_THROTTLES
+from .tasks import aget_or_generate_ai_questions, await_ai_question, enqueue_report_job, schedule_ai_question_prefetch
+
+
+class AsyncAPIView(APIView):
+    """
+    ``APIView`` with coroutine handlers, for the LLM-bound endpoints under
+    ASGI (``ASYNC_VIEWS``). A request waiting on the model then holds no
+    thread. Authentication, permission and throttle checks may query the
+    database, so they run in a thread.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncGetNextQuestionView(AsyncAPIView):
+    """Async ``GetNextQuestionView``."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
+    llm_bound = True
+
+    async def get(self, request, project_id):
+        user = request.user
+
+        project = await Project.objects.aget(id=project_id)
+
+        if user.role != "admin" or user.id != project.user_id:
+            return Response({"detail": "User is not authorized to view questions for this project."}, status=status.HTTP_400_BAD_REQUEST)
+
+        answered_question_ids = Answer.objects.filter(project=project).values_list('question_id', flat=True)
+
+        next_question = await Question.objects.filter(
+            project_type_id=project.project_type_id,
+            enabled=True
+        ).exclude(id__in=answered_question_ids).order_by("question_no").afirst()
+
+        if next_question:
+            return Response({
+                "detail": "Next question retrieved successfully",
+                "data": {
+                    **QuestionSerializer(next_question).data,
+                    "question_type": "predefined"
+                }
+            }, status=status.HTTP_200_OK)
+
+        ai_answered_question_ids = AI_Answer.objects.filter(ai_question__project=project).values_list('ai_question__id', flat=True)
+
+        next_ai_question = await AI_Question.objects.filter(
+            project=project
+        ).exclude(id__in=ai_answered_question_ids).order_by("question_no").afirst()
+        if next_ai_question:
+            return Response({
+                "detail": "Next AI question retrieved successfully",
+                "data": {
+                    **AI_QuestionSerializer(next_ai_question).data,
+                    "question_type": "ai"
+                }
+            }, status=status.HTTP_200_OK)
+
+        if await ai_answered_question_ids.acount() != 0:
+            next_ai_question = await await_ai_question(project, await AI_Question.objects.filter(project=project).acount() + 1)
+            if next_ai_question:
+                return Response({
+                    "detail": "Next AI question retrieved successfully",
+                    "data": {
+                        **AI_QuestionSerializer(next_ai_question).data,
+                        "question_type": "ai"
+                    }
+                }, status=status.HTTP_200_OK)
+            return Response({"detail": "All questions have been answered."}, status=status.HTTP_200_OK)
+
+        ai_ques = await aget_or_generate_ai_questions(project)
+
+        if not ai_ques:
+            return Response({"detail": "All questions have been answered."}, status=status.HTTP_200_OK)
+
+        return Response({
+            "detail": "Next AI question generated successfully",
+            "data": {
+                **AI_QuestionSerializer(ai_ques).data,
+                "question_type": "ai"
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class AsyncAnswerQuestionView(AsyncAPIView):
+    """Async ``AnswerQuestionView``."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
+    llm_bound = True
+
+    async def post(self, request):
+        user = request.user
+
+        question_id, project_id, text, question_type = request.data.get("question_id"), request.data.get("project_id"), request.data.get("text"), request.data.get("question_type")
+
+        project = await Project.objects.aget(id=project_id)
+
+        next_question = None
+
+        if question_type == "predefined":
+            question = await Question.objects.select_related("next_question").aget(id=question_id)
+
+            answer = await Answer.objects.acreate(
+                user=user,
+                question=question,
+                project=project,
+                text=text
+            )
+
+            answer_data = AnswerSerializer(answer).data
+
+            if question.next_question:
+                next_question = {
+                    **QuestionSerializer(question.next_question).data,
+                    "question_type": "predefined"
+                }
+                await sync_to_async(schedule_ai_question_prefetch)(project, question)
+            else:
+                first_ai_question = await aget_or_generate_ai_questions(project)
+
+                if first_ai_question:
+                    next_question = {
+                        **AI_QuestionSerializer(first_ai_question).data,
+                        "question_type": "ai"
+                    }
+
+        else:
+            question = await AI_Question.objects.select_related("next_question").aget(id=question_id)
+
+            answer = await AI_Answer.objects.acreate(
+                user=user,
+                ai_question=question,
+                text=text
+            )
+
+            answer_data = AI_AnswerSerializer(answer).data
+
+            next_ai_question = question.next_question or await await_ai_question(project, question.question_no + 1)
+            if next_ai_question:
+                next_question = {
+                    **AI_QuestionSerializer(next_ai_question).data,
+                    "question_type": "ai"
+                }
+
+        return Response({
+            "detail": "Answer Created successfully",
+            "data": answer_data,
+            "next_question": next_question
+        }, status=status.HTTP_201_CREATED)
+
+
+class AsyncGenerateReportView(AsyncAPIView):
+    """Async ``GenerateReportView``."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
+
+    async def get(self, request, project_id):
+        user = request.user
+
+        try:
+            project = await Project.objects.aget(id=project_id)
+        except Project.DoesNotExist:
+            return Response({"detail": "Project is not present"}, status=status.HTTP_400_BAD_REQUEST)
+
+        project_report = await Project_Report.objects.filter(project=project).afirst()
+
+        if project_report:
+            return Response({
+                "detail": "Project Report",
+                "data": Project_ReportSerializer(project_report).data
+            }, status=status.HTTP_200_OK)
+
+        job = await sync_to_async(enqueue_report_job)(project, user=user)
+
+        return Response({
+            "detail": "Project Report generation queued",
+            "data": await sync_to_async(lambda: ReportJobSerializer(job).data)()
+        }, status=status.HTTP_202_ACCEPTED)
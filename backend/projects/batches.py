@@ -0,0 +1,172 @@
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .anthropic.compaction import compact_transcript
+from .anthropic.gateway import gateway
+from .anthropic.prompt import anthropic_prompt
+from .models import AI_Answer, Answer, Project, Project_Report, ReportBatchItem
+from .reports import stale_sections, store_report
+from .utils import get_answered_questions, get_project_info
+
+FILTER_FIELDS = ("project_type", "status", "created_after", "created_before")
+
+
+def clean_batch_filters(data) -> dict:
+    """
+    Validates the project filter of a bulk regeneration request.
+
+    Raises:
+        ValueError: If a filter value is malformed.
+    """
+    filters = {}
+    if data.get("project_type") not in (None, ""):
+        try:
+            filters["project_type"] = int(data["project_type"])
+        except (TypeError, ValueError):
+            raise ValueError("project_type must be a project type id.")
+    if data.get("status"):
+        statuses = dict(Project.STATUS_CHOICES)
+        if data["status"] not in statuses:
+            raise ValueError(f"status must be one of: {', '.join(statuses)}.")
+        filters["status"] = data["status"]
+    for field in ("created_after", "created_before"):
+        if data.get(field):
+            if parse_date(str(data[field])) is None:
+                raise ValueError(f"{field} must be a date (YYYY-MM-DD).")
+            filters[field] = str(data[field])
+    return filters
+
+
+def filter_projects(filters: dict):
+    """Projects matching a bulk regeneration filter that have at least one answer."""
+    projects = Project.objects.filter(
+        Exists(Answer.objects.filter(project=OuterRef("pk")))
+        | Exists(AI_Answer.objects.filter(ai_question__project=OuterRef("pk")))
+    )
+    if "project_type" in filters:
+        projects = projects.filter(project_type_id=filters["project_type"])
+    if "status" in filters:
+        projects = projects.filter(status=filters["status"])
+    if "created_after" in filters:
+        projects = projects.filter(created_at__date__gte=filters["created_after"])
+    if "created_before" in filters:
+        projects = projects.filter(created_at__date__lte=filters["created_before"])
+    return projects.order_by("id")
+
+
+def batch_custom_id(project_id: int, section_key: str) -> str:
+    return f"p{project_id}-{section_key}"
+
+
+def parse_custom_id(custom_id: str):
+    project_id, section_key = custom_id.split("-", 1)
+    return int(project_id[1:]), section_key
+
+
+def submit_batch(batch):
+    """
+    Creates one ``ReportBatchItem`` per matching project and submits the stale
+    sections of all of them as a single Message Batch. Projects without stale
+    sections are marked skipped and nothing is sent for them.
+    """
+    items = []
+    requests = []
+    for project in filter_projects(batch.filters).select_related("project_type"):
+        all_questions = get_answered_questions(project)
+        project_info = get_project_info(project)
+        report = Project_Report.objects.filter(project=project).prefetch_related("sections").first()
+        sections = stale_sections(report, all_questions, project_info, force=batch.force)
+
+        items.append(ReportBatchItem(
+            batch=batch,
+            project=project,
+            status="pending" if sections else "skipped",
+            sections=[section["key"] for section in sections],
+            transcript=all_questions,
+            project_info=project_info,
+        ))
+        if sections:
+            compacted = compact_transcript(all_questions, "report")
+            for section in sections:
+                requests.append({
+                    "custom_id": batch_custom_id(project.id, section["key"]),
+                    "params": anthropic_prompt.get_report_section_request(section, compacted, project_info),
+                })
+
+    ReportBatchItem.objects.bulk_create(items)
+    batch.total_projects = len(items)
+    if requests:
+        remote = gateway.create_batch(requests)
+        batch.anthropic_batch_id = remote.id
+        batch.request_counts = remote.request_counts.model_dump()
+    batch.status = "submitted"
+    batch.submitted_at = timezone.now()
+    batch.save(update_fields=[
+        "total_projects", "anthropic_batch_id", "request_counts", "status", "submitted_at", "updated_at"
+    ])
+
+
+def describe_failure(result) -> str:
+    if result.type == "errored":
+        return result.error.error.message
+    return result.type
+
+
+def collect_batch(batch) -> bool:
+    """
+    Checks the Message Batch and, once it has ended, writes the results into
+    the projects' reports. Returns False while the batch is still processing.
+    """
+    if batch.anthropic_batch_id:
+        remote = gateway.retrieve_batch(batch.anthropic_batch_id)
+        batch.request_counts = remote.request_counts.model_dump()
+        batch.save(update_fields=["request_counts", "updated_at"])
+        if remote.processing_status != "ended":
+            return False
+
+    items = {item.project_id: item for item in batch.items.filter(status="pending").select_related("project")}
+    if batch.anthropic_batch_id:
+        def tags_for(custom_id):
+            project_id, _ = parse_custom_id(custom_id)
+            project = items[project_id].project if project_id in items else None
+            return {
+                "task": "report_section",
+                "project_id": project_id,
+                "project_type_id": project.project_type_id if project else None,
+            }
+
+        for result in gateway.batch_results(batch.anthropic_batch_id, tags_for=tags_for):
+            project_id, section_key = parse_custom_id(result.custom_id)
+            item = items.get(project_id)
+            if item is None:
+                continue
+            if result.result.type == "succeeded":
+                item.results[section_key] = result.result.message.content[0].text
+            else:
+                item.errors[section_key] = describe_failure(result.result)
+
+    for item in items.values():
+        finish_item(item)
+
+    batch.succeeded_projects = batch.items.filter(status="succeeded").count()
+    batch.failed_projects = batch.items.filter(status="failed").count()
+    batch.status = "done"
+    batch.finished_at = timezone.now()
+    batch.save(update_fields=["succeeded_projects", "failed_projects", "status", "finished_at", "updated_at"])
+    return True
+
+
+def finish_item(item):
+    """Stores the sections that succeeded; the item fails if any of its sections did not."""
+    try:
+        if item.results:
+            report = Project_Report.objects.filter(project=item.project).prefetch_related("sections").first()
+            item.report = store_report(item.project, report, item.results, item.transcript, item.project_info)
+    except Exception as e:
+        item.errors["report"] = str(e)
+    missing = set(item.sections) - set(item.results) - set(item.errors)
+    for section_key in missing:
+        item.errors[section_key] = "no result"
+    item.status = "failed" if item.errors else "succeeded"
+    item.save(update_fields=["results", "errors", "report", "status", "updated_at"])
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.anthropic.stub import make_stub_server
+
+MODES = ("wsgi", "asgi")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent interview sessions the WSGI (sync views, a fixed pool of worker "
+        "threads) and ASGI (async views on one event loop) modes sustain while the model is slow, "
+        "against the local Anthropic stub and a scratch SQLite database. A session answers the last "
+        "predefined question, which streams the AI questions, then fetches the next question."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", default="10,50,200",
+                            help="Comma-separated numbers of concurrent sessions to try.")
+        parser.add_argument("--threads", type=int, default=8,
+                            help="Worker threads of the WSGI mode (like gunicorn --threads).")
+        parser.add_argument("--latency", default="1.0",
+                            help="Stub time to first token (a parse_distribution spec).")
+        parser.add_argument("--tokens-per-second", type=float, default=100.0)
+        parser.add_argument("--output-tokens", default="300")
+        # Internal: runs one mode in a child process with its own settings.
+        parser.add_argument("--child", choices=MODES, help="(internal)")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            return self.run_child(options)
+
+        server = make_stub_server(
+            latency=options["latency"],
+            tokens_per_second=options["tokens_per_second"],
+            output_tokens=options["output_tokens"],
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        counts = [int(count) for count in options["sessions"].split(",")]
+
+        self.stdout.write(
+            f"{'mode':<6}{'sessions':>10}{'wall s':>9}{'sess/s':>9}{'p50 s':>8}{'p95 s':>8}{'errors':>8}"
+        )
+        try:
+            with tempfile.TemporaryDirectory() as scratch:
+                for count in counts:
+                    for mode in MODES:
+                        result = self.run_mode(mode, count, options, scratch, server.server_address[1])
+                        self.stdout.write(
+                            f"{mode:<6}{count:>10}{result['wall']:>9.2f}{count / result['wall']:>9.1f}"
+                            f"{result['p50']:>8.2f}{result['p95']:>8.2f}{result['errors']:>8}"
+                        )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def run_mode(self, mode, sessions, options, scratch, port) -> dict:
+        env = {
+            **os.environ,
+            # IMMEDIATE transactions make concurrent SQLite writers queue instead of failing.
+            "DATABASE_URL": f"sqlite:///{scratch}/{mode}-{sessions}.sqlite3?timeout=60&transaction_mode=IMMEDIATE",
+            "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{port}",
+            "CLAUDE_API_ENV": "bench",
+            "ASYNC_VIEWS": "True" if mode == "asgi" else "False",
+            "ANTHROPIC_MAX_CONNECTIONS": str(max(sessions, 20)),
+            "ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS": str(max(sessions, 10)),
+            "ALLOWED_HOSTS": "testserver",
+            "LLM_CACHE_ENABLED": "False",
+            "LLM_QUESTION_FALLBACK_MODEL": "",
+            "LLM_LEDGER_ENABLED": "False",
+        }
+        completed = subprocess.run(
+            [
+                sys.executable, "manage.py", "bench_asgi_capacity", "--child", mode,
+                "--sessions", str(sessions), "--threads", str(options["threads"]),
+            ],
+            env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"{mode} run with {sessions} sessions failed:\n{completed.stderr[-3000:]}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_child(self, options):
+        from rest_framework.authtoken.models import Token
+
+        from projects.models import Project, ProjectType, Question
+        from projects.tasks import question_stream_executor
+        from users.models import User
+
+        sessions = int(options["sessions"])
+        call_command("migrate", verbosity=0)
+        user = User.objects.create_user(username="bench", email="bench@example.com", password="bench", role="admin")
+        token = Token.objects.create(user=user)
+        project_type = ProjectType.objects.create(name="Bench", description="Benchmark projects")
+        question = Question.objects.create(project_type=project_type, text="What are you building?", question_no=1)
+        project_ids = [
+            Project.objects.create(user=user, project_type=project_type, name=f"Bench project {number}").id
+            for number in range(sessions)
+        ]
+        headers = {"Authorization": f"Token {token.key}"}
+
+        def payload(project_id):
+            return {"question_id": question.id, "project_id": project_id, "text": "An online shop", "question_type": "predefined"}
+
+        started = time.monotonic()
+        if options["child"] == "wsgi":
+            from django.test import Client
+
+            def session(project_id):
+                client = Client()
+                begin = time.monotonic()
+                answered = client.post("/api/projects/answer_question/", payload(project_id), content_type="application/json", headers=headers)
+                fetched = client.get(f"/api/projects/get_next_question/{project_id}/", headers=headers)
+                return time.monotonic() - begin, answered.status_code == 201 and fetched.status_code == 200
+
+            with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+                results = list(executor.map(session, project_ids))
+            wall = time.monotonic() - started
+            question_stream_executor().shutdown(wait=True)
+        else:
+            from django.test import AsyncClient
+
+            from projects import tasks
+
+            async def session(project_id):
+                client = AsyncClient()
+                begin = time.monotonic()
+                answered = await client.post("/api/projects/answer_question/", payload(project_id), content_type="application/json", headers=headers)
+                fetched = await client.get(f"/api/projects/get_next_question/{project_id}/", headers=headers)
+                return time.monotonic() - begin, answered.status_code == 201 and fetched.status_code == 200
+
+            async def run():
+                results = await asyncio.gather(*(session(project_id) for project_id in project_ids))
+                wall = time.monotonic() - started
+                # Let the rest of the question streams finish before the loop closes.
+                await asyncio.gather(*list(tasks._question_stream_tasks), return_exceptions=True)
+                return results, wall
+
+            results, wall = asyncio.run(run())
+
+        latencies = sorted(latency for latency, _ in results)
+        self.stdout.write(json.dumps({
+            "wall": wall,
+            "p50": statistics.median(latencies),
+            "p95": latencies[min(len(latencies) - 1, round(0.95 * (len(latencies) - 1)))],
+            "errors": sum(not ok for _, ok in results),
+        }))
@@ -0,0 +1,81 @@
+import statistics
+import threading
+import time
+
+import anthropic
+from django.core.management.base import BaseCommand
+
+from projects.anthropic.gateway import LLMGateway
+from projects.anthropic.stub import make_stub_server
+
+
+class Command(BaseCommand):
+    help = "Compare per-call LLM latency with a fresh client per call vs the pooled gateway client, against a local stub server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=50)
+        parser.add_argument("--handshake-ms", type=float, default=30.0,
+                            help="Simulated connection setup cost (TCP + TLS) per new connection.")
+        parser.add_argument("--response-ms", type=float, default=5.0,
+                            help="Simulated server processing time per request.")
+
+    def handle(self, *args, **options):
+        server = make_stub_server(
+            handshake_delay=options["handshake_ms"] / 1000,
+            latency=options["response_ms"] / 1000,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            calls = options["calls"]
+
+            def per_call_client():
+                client = anthropic.Anthropic(api_key="bench", base_url=base_url, max_retries=0)
+                client.messages.create(
+                    model="stub", max_tokens=16,
+                    messages=[{"role": "user", "content": "ping"}],
+                )
+                client.close()
+
+            server.connections = 0
+            unpooled = self._measure(per_call_client, calls)
+            unpooled_connections = server.connections
+
+            pooled_gateway = LLMGateway(
+                api_key="bench", base_url=base_url, max_retries=0,
+                max_connections=10, max_keepalive_connections=10,
+                keepalive_expiry=60.0, connect_timeout=5.0, read_timeout=30.0,
+            )
+            server.connections = 0
+            pooled = self._measure(
+                lambda: pooled_gateway.complete("ping", model="stub", max_tokens=16), calls
+            )
+            pooled_connections = server.connections
+            pooled_gateway.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(f"{'mode':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'conns':>8}")
+        for name, samples, connections in (
+            ("per-call", unpooled, unpooled_connections),
+            ("pooled", pooled, pooled_connections),
+        ):
+            self.stdout.write(
+                f"{name:<10}{statistics.mean(samples):>10.2f}{self._percentile(samples, 50):>10.2f}"
+                f"{self._percentile(samples, 95):>10.2f}{connections:>8}"
+            )
+
+    def _measure(self, fn, calls):
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    def _percentile(self, samples, pct):
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+        return ordered[index]
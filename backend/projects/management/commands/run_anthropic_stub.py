@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.anthropic.stub import make_stub_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve an offline stand-in for the Anthropic Messages and Message Batches APIs "
+        "(point ANTHROPIC_BASE_URL at it). Distributions are CONSTANT, uniform:LOW:HIGH, "
+        "normal:MEAN:STDDEV, lognormal:MEDIAN:SIGMA or exp:MEAN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8090)
+        parser.add_argument("--latency", default=None,
+                            help="Time to first token in seconds, e.g. lognormal:0.8:0.5.")
+        parser.add_argument("--tokens-per-second", type=float, default=None,
+                            help="Output throughput after the first token (default: instant).")
+        parser.add_argument("--output-tokens", default="uniform:40:200",
+                            help="Length of synthetic responses, capped at the request's max_tokens.")
+        parser.add_argument("--errors", default="",
+                            help="Injected API errors as STATUS:PROBABILITY pairs, e.g. 529:0.05,500:0.01.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--mode", choices=("stub", "record", "replay"), default="stub")
+        parser.add_argument("--cassette", default=None,
+                            help="JSON file recorded to (record mode) or answered from (replay mode).")
+        parser.add_argument("--upstream", default="https://api.anthropic.com",
+                            help="API that record mode forwards to, with the caller's API key.")
+        parser.add_argument("--replay-miss", choices=("error", "stub"), default="error",
+                            help="Answer to requests missing from the cassette in replay mode.")
+        parser.add_argument("--batch-seconds", type=float, default=5.0,
+                            help="Time until a submitted batch ends.")
+        parser.add_argument("--fail-every", type=int, default=0,
+                            help="Make every n-th request of a batch fail (0 disables).")
+
+    def handle(self, *args, **options):
+        try:
+            server = make_stub_server(
+                options["host"], options["port"],
+                latency=options["latency"],
+                tokens_per_second=options["tokens_per_second"],
+                output_tokens=options["output_tokens"],
+                error_rates=options["errors"],
+                seed=options["seed"],
+                mode=options["mode"],
+                cassette=options["cassette"],
+                upstream=options["upstream"].rstrip("/"),
+                replay_miss=options["replay_miss"],
+                batch_delay=options["batch_seconds"],
+                fail_every=options["fail_every"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"Anthropic stub ({options['mode']}) listening on http://{options['host']}:{server.server_address[1]}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,130 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from .anthropic.resilience import llm_deadline, load
+
+
+class LLMDeadlineMiddleware:
+    """
+    Gives every request an LLM deadline of ``LLM_REQUEST_DEADLINE`` seconds, so
+    slow or retried upstream calls cannot hold a worker indefinitely.
+
+    Streaming response bodies are produced after this middleware returns and
+    are therefore not bound by the deadline. Supports async views without a
+    thread hop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with llm_deadline(settings.LLM_REQUEST_DEADLINE):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with llm_deadline(settings.LLM_REQUEST_DEADLINE):
+            return await self.get_response(request)
+
+
+def is_llm_bound(request) -> bool:
+    """Whether the request is routed to a view marked ``llm_bound``."""
+    try:
+        match = resolve(request.path_info, getattr(request, "urlconf", None))
+    except Resolver404:
+        return False
+    return getattr(getattr(match.func, "view_class", None), "llm_bound", False)
+
+
+class LLMLoadSheddingMiddleware:
+    """
+    Refuses new requests to ``llm_bound`` views with 503 and ``Retry-After``
+    while this process has ``LLM_SHED_MAX_IN_FLIGHT`` upstream calls in flight
+    or the p95 upstream latency of the last ``LLM_SHED_WINDOW`` seconds is at
+    least ``LLM_SHED_MAX_LATENCY``. Refusing early keeps workers free for the
+    endpoints that do not call the model.
+
+    Also counts the LLM-bound requests in flight, streamed bodies included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not is_llm_bound(request):
+            return self.get_response(request)
+        rejected = self.shed()
+        if rejected:
+            return rejected
+        load.request_started()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            load.request_finished()
+            raise
+        return self.track(response)
+
+    async def __acall__(self, request):
+        if not is_llm_bound(request):
+            return await self.get_response(request)
+        rejected = self.shed()
+        if rejected:
+            return rejected
+        load.request_started()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            load.request_finished()
+            raise
+        return self.track(response)
+
+    def shed(self):
+        reason = load.overload(
+            settings.LLM_SHED_MAX_IN_FLIGHT, settings.LLM_SHED_MAX_LATENCY,
+            settings.LLM_SHED_WINDOW, settings.LLM_SHED_MIN_SAMPLES,
+        )
+        if reason is None:
+            return None
+        load.record_shed()
+        response = JsonResponse(
+            {"detail": f"The AI service is overloaded ({reason}). Please retry shortly."},
+            status=503,
+        )
+        response["Retry-After"] = str(settings.LLM_SHED_RETRY_AFTER)
+        return response
+
+    def track(self, response):
+        """Ends the in-flight count when the response, or its streamed body, is done."""
+        if not response.streaming:
+            load.request_finished()
+            return response
+        if response.is_async:
+            async def content(chunks=response.streaming_content):
+                try:
+                    async for chunk in chunks:
+                        yield chunk
+                finally:
+                    load.request_finished()
+        else:
+            def content(chunks=response.streaming_content):
+                try:
+                    yield from chunks
+                finally:
+                    load.request_finished()
+        response.streaming_content = content()
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_ai_questionprefetch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='bypass_cache',
+            field=models.BooleanField(default=False),
+        ),
+    ]
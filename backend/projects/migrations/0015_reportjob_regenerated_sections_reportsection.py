@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_answersummary_ai_answer_token_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='regenerated_sections',
+            field=models.JSONField(default=list),
+        ),
+        migrations.CreateModel(
+            name='ReportSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('title', models.CharField(max_length=200)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('content', models.TextField()),
+                ('depends_on', models.JSONField(default=list)),
+                ('seen', models.JSONField(default=list)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='projects.project_report')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('report', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_reportjob_regenerated_sections_reportsection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filters', models.JSONField(default=dict)),
+                ('force', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('submitted', 'submitted'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=20)),
+                ('anthropic_batch_id', models.CharField(blank=True, default='', max_length=100)),
+                ('request_counts', models.JSONField(default=dict)),
+                ('total_projects', models.PositiveIntegerField(default=0)),
+                ('succeeded_projects', models.PositiveIntegerField(default=0)),
+                ('failed_projects', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('skipped', 'skipped'), ('succeeded', 'succeeded'), ('failed', 'failed')], default='pending', max_length=20)),
+                ('sections', models.JSONField(default=list)),
+                ('transcript', models.JSONField(default=list)),
+                ('project_info', models.JSONField(default=dict)),
+                ('results', models.JSONField(default=dict)),
+                ('errors', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='projects.reportbatch')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='projects.project')),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='projects.project_report')),
+            ],
+            options={
+                'unique_together': {('batch', 'project')},
+            },
+        ),
+    ]
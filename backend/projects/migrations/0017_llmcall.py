@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_reportbatch_reportbatchitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('task', models.CharField(max_length=30)),
+                ('model', models.CharField(max_length=100)),
+                ('input_tokens', models.PositiveIntegerField(default=0)),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('cache_creation_tokens', models.PositiveIntegerField(default=0)),
+                ('cache_read_tokens', models.PositiveIntegerField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=10)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('ttft_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('batch', models.BooleanField(default=False)),
+                ('outcome', models.CharField(choices=[('ok', 'ok'), ('error', 'error')], default='ok', max_length=10)),
+                ('error_type', models.CharField(blank=True, default='', max_length=100)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_calls', to='projects.project')),
+                ('project_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='projects.projecttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'created_at'], name='projects_ll_model_faa972_idx')],
+            },
+        ),
+    ]
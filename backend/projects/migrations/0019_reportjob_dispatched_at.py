@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_active_jobs_dispatched(apps, schema_editor):
+    # Jobs queued before the reports lane existed were already sent to Celery.
+    ReportJob = apps.get_model('projects', 'ReportJob')
+    ReportJob.objects.filter(status__in=('queued', 'running')).update(dispatched_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0018_ai_questiongeneration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reportjob',
+            index=models.Index(fields=['status', 'dispatched_at'], name='projects_re_status_2d5bb6_idx'),
+        ),
+        migrations.RunPython(mark_active_jobs_dispatched, migrations.RunPython.noop),
+    ]
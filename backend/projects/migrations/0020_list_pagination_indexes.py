@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0019_reportjob_dispatched_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ai_question',
+            index=models.Index(fields=['-created_at', '-id'], name='projects_ai_created_92355a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at', '-id'], name='projects_pr_created_35e83e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='projects_pr_user_id_d0566d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project_report',
+            index=models.Index(fields=['-created_at', '-id'], name='projects_pr_created_5dbbda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['project_type', 'question_no'], name='projects_qu_project_1f52c6_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+import hashlib
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 280
+
+
+def summarize_existing_reports(apps, schema_editor):
+    # A copy of projects.models.summarize_report as of this migration, so later
+    # changes to the helper do not change what this migration does.
+    Project_Report = apps.get_model('projects', 'Project_Report')
+    reports = []
+    for report in Project_Report.objects.only('id', 'report').iterator(chunk_size=200):
+        text = " ".join(strip_tags(report.report.replace(">", "> ")).split())
+        report.size = len(report.report.encode())
+        report.content_hash = hashlib.sha256(report.report.encode()).hexdigest()
+        report.excerpt = Truncator(text).chars(EXCERPT_LENGTH)
+        reports.append(report)
+        if len(reports) == 200:
+            Project_Report.objects.bulk_update(reports, ['size', 'content_hash', 'excerpt'])
+            reports = []
+    Project_Report.objects.bulk_update(reports, ['size', 'content_hash', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0020_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project_report',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='project_report',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=280),
+        ),
+        migrations.AddField(
+            model_name='project_report',
+            name='size',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(summarize_existing_reports, migrations.RunPython.noop),
+    ]
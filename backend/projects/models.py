@@ -1,5 +1,11 @@
+import hashlib
+
 from django.db import models
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 from users.models import User
+from .anthropic.tokens import estimate_tokens
 # Create your models here.
 
 class ProjectType(models.Model):
@@ -33,6 +39,10 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)    
 
+    class Meta:
+        # Keyset pagination of the project lists, overall and per user.
+        indexes = [models.Index(fields=['-created_at', '-id']), models.Index(fields=['user', '-created_at', '-id'])]
+
 class QuestionType(models.Model):
     name = models.CharField(max_length=250)
     description = models.TextField(blank=True, default="")
@@ -58,6 +68,7 @@ class Question(models.Model):
 
     class Meta:
         unique_together = ('question_no', 'project_type')
+        indexes = [models.Index(fields=['project_type', 'question_no'])]
 
 
 class Answer(models.Model):
@@ -65,9 +76,18 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     text = models.TextField()
+    token_count = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)    
 
+    def save(self, *args, **kwargs):
+        # Counted at write time so prompt budgeting never re-tokenizes the transcript.
+        self.token_count = estimate_tokens(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'token_count'}
+        return super().save(*args, **kwargs)
+
 class AI_Question(models.Model):
     question_no = models.IntegerField()
     next_question = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL)
@@ -79,17 +99,254 @@ class AI_Question(models.Model):
 
     class Meta:
         unique_together = ('question_no', 'project')
+        indexes = [models.Index(fields=['-created_at', '-id'])]
 
 class AI_Answer(models.Model):
     ai_question = models.ForeignKey(AI_Question, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
+    token_count = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        self.token_count = estimate_tokens(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'token_count'}
+        return super().save(*args, **kwargs)
+
+
+def summarize_report(report: str) -> dict:
+    """Size, SHA-256 and plain-text excerpt of a report document, for the list views."""
+    # A space after every tag keeps words of adjacent blocks apart.
+    text = " ".join(strip_tags(report.replace(">", "> ")).split())
+    return {
+        "size": len(report.encode()),
+        "content_hash": hashlib.sha256(report.encode()).hexdigest(),
+        "excerpt": Truncator(text).chars(Project_Report.EXCERPT_LENGTH),
+    }
+
 
 class Project_Report(models.Model):
+    EXCERPT_LENGTH = 280
+
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     report = models.TextField()
+    # Derived from ``report`` on save, so lists never load the document.
+    size = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
+    @property
+    def status(self) -> str:
+        return 'ready' if self.size else 'pending'
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'report' in update_fields:
+            for field, value in summarize_report(self.report).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'size', 'content_hash', 'excerpt'}
+        return super().save(*args, **kwargs)
+
+
+class ReportSection(models.Model):
+    """
+    One generated section of a ``Project_Report`` (see projects.reports).
+
+    ``depends_on`` holds the reference codes of the answers the section was
+    written from and ``seen`` every answer that existed at the time;
+    ``fingerprint`` hashes the section definition, the project info and the
+    ``depends_on`` answers so the section is only regenerated when they change.
+    """
+    report = models.ForeignKey(Project_Report, on_delete=models.CASCADE, related_name='sections')
+    key = models.CharField(max_length=50)
+    title = models.CharField(max_length=200)
+    position = models.PositiveSmallIntegerField(default=0)
+    content = models.TextField()
+    depends_on = models.JSONField(default=list)
+    seen = models.JSONField(default=list)
+    fingerprint = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('report', 'key')
+        ordering = ['position']
+
+
+class ReportJob(models.Model):
+    """Tracks one asynchronous report generation run (see projects.tasks)."""
+    STATUS_CHOICES = [
+        ('queued', 'queued'),
+        ('running', 'running'),
+        ('done', 'done'),
+        ('failed', 'failed')
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='report_jobs')
+    requested_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    status = models.CharField(max_length=20, default='queued', choices=STATUS_CHOICES)
+    progress = models.PositiveSmallIntegerField(default=0)
+    regenerate = models.BooleanField(default=False)
+    bypass_cache = models.BooleanField(default=False)
+    regenerated_sections = models.JSONField(default=list)
+    report = models.ForeignKey(Project_Report, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True, default="")
+    # Set when the job got a slot of the reports lane and was sent to a worker.
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'status']), models.Index(fields=['status', 'dispatched_at'])]
+
+
+class ReportBatch(models.Model):
+    """
+    Bulk report regeneration submitted as one Anthropic Message Batch
+    (see projects.batches). ``filters`` selects the projects.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'queued'),
+        ('submitted', 'submitted'),
+        ('done', 'done'),
+        ('failed', 'failed')
+    ]
+    ACTIVE_STATUSES = ('queued', 'submitted')
+
+    requested_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    filters = models.JSONField(default=dict)
+    force = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, default='queued', choices=STATUS_CHOICES)
+    anthropic_batch_id = models.CharField(max_length=100, blank=True, default="")
+    request_counts = models.JSONField(default=dict)
+    total_projects = models.PositiveIntegerField(default=0)
+    succeeded_projects = models.PositiveIntegerField(default=0)
+    failed_projects = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+
+class ReportBatchItem(models.Model):
+    """
+    One project of a ``ReportBatch``. ``transcript`` and ``project_info`` are
+    the inputs the batch requests were built from; ``results`` and ``errors``
+    hold the outcome per section key.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'pending'),
+        ('skipped', 'skipped'),
+        ('succeeded', 'succeeded'),
+        ('failed', 'failed')
+    ]
+
+    batch = models.ForeignKey(ReportBatch, on_delete=models.CASCADE, related_name='items')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, default='pending', choices=STATUS_CHOICES)
+    sections = models.JSONField(default=list)
+    transcript = models.JSONField(default=list)
+    project_info = models.JSONField(default=dict)
+    results = models.JSONField(default=dict)
+    errors = models.JSONField(default=dict)
+    report = models.ForeignKey(Project_Report, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('batch', 'project')
+
+
+class AI_QuestionPrefetch(models.Model):
+    """
+    Speculative AI question generation started before the predefined flow ends.
+
+    ``question_ids`` and ``fingerprint`` describe the answers the questions were
+    generated from, so they can be discarded if any of those answers changed.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'queued'),
+        ('running', 'running'),
+        ('done', 'done'),
+        ('failed', 'failed'),
+        ('stale', 'stale')
+    ]
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='ai_question_prefetch')
+    status = models.CharField(max_length=20, default='queued', choices=STATUS_CHOICES)
+    question_ids = models.JSONField(default=list)
+    fingerprint = models.CharField(max_length=64, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class AI_QuestionGeneration(models.Model):
+    """
+    Streamed AI question generation of a project. The first question is stored
+    before the request returns; the rest are added while ``status`` is running.
+    """
+    STATUS_CHOICES = [
+        ('running', 'running'),
+        ('done', 'done'),
+        ('failed', 'failed')
+    ]
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='ai_question_generation')
+    status = models.CharField(max_length=20, default='running', choices=STATUS_CHOICES)
+    question_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class AnswerSummary(models.Model):
+    """Short summary of an answer, shared by every answer with the same text."""
+    content_hash = models.CharField(max_length=64, unique=True)
+    summary = models.TextField()
+    token_count = models.PositiveIntegerField(default=0)
+    model = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class LLMCall(models.Model):
+    """
+    One Anthropic API call, written in batches by ``projects.anthropic.ledger``.
+    ``cost_usd`` is computed from ``LLM_MODEL_PRICES`` at the time of the call.
+    """
+    OUTCOME_CHOICES = [
+        ('ok', 'ok'),
+        ('error', 'error')
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    task = models.CharField(max_length=30)
+    project = models.ForeignKey(Project, null=True, blank=True, on_delete=models.SET_NULL, related_name='llm_calls')
+    project_type = models.ForeignKey(ProjectType, null=True, blank=True, on_delete=models.SET_NULL)
+    model = models.CharField(max_length=100)
+    input_tokens = models.PositiveIntegerField(default=0)
+    output_tokens = models.PositiveIntegerField(default=0)
+    cache_creation_tokens = models.PositiveIntegerField(default=0)
+    cache_read_tokens = models.PositiveIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=10, decimal_places=6, default=0)
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    ttft_ms = models.PositiveIntegerField(null=True, blank=True)
+    batch = models.BooleanField(default=False)
+    outcome = models.CharField(max_length=10, default='ok', choices=OUTCOME_CHOICES)
+    error_type = models.CharField(max_length=100, blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=['model', 'created_at'])]
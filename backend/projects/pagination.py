@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+def estimated_count(queryset) -> int:
+    """
+    The planner's row estimate for ``queryset`` on PostgreSQL, which costs no
+    scan; other databases count exactly.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination:
+    """
+    Keyset (cursor) pagination: a page is the first ``limit`` rows after the
+    last row of the previous page in ``ordering``, so every page is one index
+    range scan however deep the client pages. ``ordering`` must order the
+    rows uniquely (end with ``id`` or complete a unique constraint) and be
+    backed by an index.
+
+    Query parameters:
+        cursor: The ``next`` value of the previous page.
+        limit: Rows per page (``LIST_PAGE_SIZE``, at most ``LIST_MAX_PAGE_SIZE``).
+        count: ``exact`` (default), ``estimate`` (the planner's estimate on
+            PostgreSQL) or ``none`` (``count`` is null).
+    """
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.next = None
+        self.count = None
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params.get("limit", settings.LIST_PAGE_SIZE))
+        except ValueError:
+            limit = settings.LIST_PAGE_SIZE
+        return max(1, min(limit, settings.LIST_MAX_PAGE_SIZE))
+
+    def encode_cursor(self, row) -> str:
+        values = [getattr(row, name) for name in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+    def decode_cursor(self, model, cursor: str) -> list:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise NotFound("Invalid cursor.")
+
+    def after(self, values) -> Q:
+        """Rows after ``values`` in ``ordering``: (a > x) or (a = x and b > y) or ..."""
+        condition = Q()
+        for position, name in enumerate(self.ordering):
+            field = self.fields[position]
+            lookup = "lt" if name.startswith("-") else "gt"
+            step = Q(**{f"{field}__{lookup}": values[position]})
+            for earlier, value in zip(self.fields[:position], values):
+                step &= Q(**{earlier: value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request) -> list:
+        """The rows of the requested page; sets ``count`` and ``next``."""
+        mode = request.query_params.get("count")
+        if mode not in COUNT_MODES:
+            mode = "exact"
+        if mode == "exact":
+            self.count = queryset.count()
+        elif mode == "estimate":
+            self.count = estimated_count(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(queryset.model, cursor)))
+
+        limit = self.get_limit(request)
+        rows = list(queryset[:limit + 1])
+        if len(rows) > limit:
+            rows = rows[:limit]
+            self.next = self.encode_cursor(rows[-1])
+        return rows
+
+    def get_response_data(self, results) -> dict:
+        return {"results": results, "count": self.count, "next": self.next}
@@ -0,0 +1,25 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF content negotiation accept ``text/event-stream`` clients.
+
+    Streaming views return a ``StreamingHttpResponse`` directly; this renderer
+    is only used for the regular error responses of those views.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode(self.charset)
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event; data is JSON encoded so newlines survive."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
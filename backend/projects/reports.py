@@ -0,0 +1,141 @@
+import contextvars
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from .anthropic.compaction import compact_transcript
+from .anthropic.prompt import REPORT_SECTIONS, anthropic_prompt, question_ref
+from .models import Project_Report, ReportSection
+
+SOURCES_RE = re.compile(r"<!--\s*sources:(.*?)-->", re.IGNORECASE | re.DOTALL)
+
+
+def answers_by_ref(all_questions: list) -> dict:
+    return {question_ref(question): question["answer_text"] or "" for question in all_questions}
+
+
+def parse_section(raw: str, answers: dict):
+    """
+    Splits a generated section into its HTML and the answer references it cites.
+    Without a usable sources comment the section depends on every answer.
+    """
+    match = SOURCES_RE.search(raw)
+    if not match:
+        return raw.strip(), sorted(answers)
+    cited = {ref.strip().strip("[]").upper() for ref in match.group(1).split(",")}
+    depends_on = sorted(ref for ref in cited if ref in answers)
+    content = SOURCES_RE.sub("", raw).strip()
+    return content, depends_on or sorted(answers)
+
+
+def section_fingerprint(section: dict, project_info, answers: dict, depends_on: list) -> str:
+    payload = json.dumps({
+        "section": section,
+        "project": project_info,
+        "profile": anthropic_prompt.get_profile("report", project_info),
+        "answers": [(ref, answers.get(ref)) for ref in depends_on],
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def stale_sections(report, all_questions: list, project_info, force: bool = False) -> list:
+    """
+    Returns the ``REPORT_SECTIONS`` entries of ``report`` that must be (re)generated.
+
+    A section is stale when it does not exist yet, when an answer it depends on
+    (or the project info) changed, or when answers were added after it was
+    written, since a new answer may be relevant to any section.
+    """
+    if report is None or force:
+        return list(REPORT_SECTIONS)
+
+    answers = answers_by_ref(all_questions)
+    existing = {section.key: section for section in report.sections.all()}
+    stale = []
+    for section in REPORT_SECTIONS:
+        row = existing.get(section["key"])
+        if (
+            row is None
+            or set(answers) - set(row.seen)
+            or row.fingerprint != section_fingerprint(section, project_info, answers, row.depends_on)
+        ):
+            stale.append(section)
+    return stale
+
+
+def generate_sections(sections: list, all_questions: list, project_info, bypass_cache: bool = False, on_progress=None) -> dict:
+    """
+    Generates ``sections`` and returns their raw responses keyed by section key.
+
+    The first section runs alone so the transcript it writes to the prompt
+    cache is read back by the others, which then run concurrently.
+    """
+    if not sections:
+        return {}
+
+    compacted = compact_transcript(all_questions, "report")
+    params = anthropic_prompt.get_profile("report", project_info)
+    generated = {}
+
+    def generate(section):
+        return anthropic_prompt.generate_report_section(
+            section, compacted, project_info, bypass_cache=bypass_cache, params=params
+        )
+
+    first, rest = sections[0], sections[1:]
+    generated[first["key"]] = generate(first)
+    if on_progress:
+        on_progress(len(generated), len(sections))
+
+    if rest:
+        with ThreadPoolExecutor(max_workers=settings.REPORT_SECTION_CONCURRENCY) as executor:
+            # Each section runs in a copy of this context, keeping its LLM lane and deadline.
+            futures = [executor.submit(contextvars.copy_context().run, generate, section) for section in rest]
+            for section, future in zip(rest, futures):
+                generated[section["key"]] = future.result()
+                if on_progress:
+                    on_progress(len(generated), len(sections))
+    return generated
+
+
+def stitch_sections(contents: list) -> str:
+    return "\n\n".join(contents)
+
+
+def store_report(project, report, generated: dict, all_questions: list, project_info) -> Project_Report:
+    """
+    Saves newly generated sections on ``report`` (creating it when None) and
+    re-stitches the report document from all of its sections.
+    """
+    answers = answers_by_ref(all_questions)
+    with transaction.atomic():
+        if report is None:
+            report = Project_Report.objects.create(project=project, report="")
+
+        for position, section in enumerate(REPORT_SECTIONS):
+            if section["key"] not in generated:
+                continue
+            content, depends_on = parse_section(generated[section["key"]], answers)
+            ReportSection.objects.update_or_create(
+                report=report,
+                key=section["key"],
+                defaults={
+                    "title": section["title"],
+                    "position": position,
+                    "content": content,
+                    "depends_on": depends_on,
+                    "seen": sorted(answers),
+                    "fingerprint": section_fingerprint(section, project_info, answers, depends_on),
+                },
+            )
+
+        keys = [section["key"] for section in REPORT_SECTIONS]
+        report.sections.exclude(key__in=keys).delete()
+        report.report = stitch_sections(report.sections.values_list("content", flat=True))
+        report.save(update_fields=["report", "updated_at"])
+        Project_Report.objects.filter(project=project).exclude(id=report.id).delete()
+    return report
@@ -0,0 +1,35 @@
+from collections import Counter, defaultdict, deque
+
+
+def fair_share_order(jobs: list, served: dict, weights: dict, slots: int) -> list:
+    """
+    Weighted fair queuing over requesters.
+
+    Picks up to ``slots`` of ``jobs`` (each requester's oldest first), every
+    time from the requester with the lowest virtual finish time: the jobs it
+    recently started plus one, divided by its weight. A requester with weight
+    2 therefore gets twice the starts of one with weight 1 while both wait,
+    and a single requester with many jobs cannot hold back the others.
+
+    Args:
+        jobs (list): Waiting jobs, oldest first, with ``requested_by_id`` and ``created_at``.
+        served (dict): Recently started jobs per requester id.
+        weights (dict): Weight per requester id; missing requesters weigh 1.
+        slots (int): How many jobs may be started.
+    """
+    queues = defaultdict(deque)
+    for job in jobs:
+        queues[job.requested_by_id].append(job)
+    served = Counter(served)
+
+    def finish_time(requester):
+        return (served[requester] + 1) / max(weights.get(requester) or 1, 1), queues[requester][0].created_at
+
+    chosen = []
+    while queues and len(chosen) < slots:
+        requester = min(queues, key=finish_time)
+        chosen.append(queues[requester].popleft())
+        served[requester] += 1
+        if not queues[requester]:
+            del queues[requester]
+    return chosen
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ProjectType, Project, Question, Answer, AI_Answer, AI_Question, Project_Report
+from .models import ProjectType, Project, Question, Answer, AI_Answer, AI_Question, Project_Report, ReportJob
 
 class ProjectTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -34,4 +34,17 @@ class AI_AnswerSerializer(serializers.ModelSerializer):
 class Project_ReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project_Report
-        fields = ["id", "project", "report", "created_at", "updated_at"]
+        fields = ["id", "project", "report", "size", "content_hash", "excerpt", "status", "created_at", "updated_at"]
+
+class Project_ReportSummarySerializer(serializers.ModelSerializer):
+    """A report without its document; clients fetch the body from the report endpoint."""
+    class Meta:
+        model = Project_Report
+        fields = ["id", "project", "size", "content_hash", "excerpt", "status", "created_at", "updated_at"]
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    report = Project_ReportSummarySerializer(read_only=True)
+
+    class Meta:
+        model = ReportJob
+        fields = ["id", "project", "status", "progress", "regenerate", "bypass_cache", "regenerated_sections", "report", "error", "started_at", "finished_at", "created_at", "updated_at"]
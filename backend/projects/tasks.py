@@ -0,0 +1,838 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from .anthropic.prompt import anthropic_prompt
+from .anthropic.resilience import llm_lane
+from .batches import collect_batch, submit_batch
+from .models import AI_Question, AI_QuestionGeneration, AI_QuestionPrefetch, Project_Report, ReportBatch, ReportJob
+from .reports import generate_sections, stale_sections, store_report
+from .scheduling import fair_share_order
+from .utils import get_answered_questions, get_project_info, lock_project, save_ai_questions, transcript_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for the next streamed AI question.
+QUESTION_STREAM_POLL_INTERVAL = 0.2
+
+# A dispatched report job that has not saved progress for this long no longer
+# holds a slot of the reports lane: its message was lost or its worker died.
+REPORT_JOB_STALE_AFTER = timedelta(minutes=30)
+
+# Waiting report jobs considered per dispatch.
+REPORT_DISPATCH_WINDOW = 500
+
+# Seconds between checks of the report job a report stream is waiting for.
+REPORT_STREAM_POLL_INTERVAL = 1
+
+# A running question prefetch not finished after this long (its worker died)
+# no longer takes one of its user's interactive slots.
+QUESTION_PREFETCH_STALE_AFTER = timedelta(minutes=5)
+
+_question_stream_executor = None
+_question_stream_executor_lock = threading.Lock()
+_question_stream_tasks = set()
+
+
+def enqueue_report_job(project, user=None, regenerate=False, bypass_cache=False) -> ReportJob:
+    """
+    Returns the project's active report job, or creates and queues a new one.
+    A stale active job (see ``stale_report_jobs``) is failed and replaced.
+
+    New jobs wait for a slot of the reports lane (see ``dispatch_report_jobs``),
+    which is only looked for once the surrounding transaction commits so the
+    worker never looks up a job row that does not exist yet.
+    """
+    with transaction.atomic():
+        # Serializes with other enqueues and with report streams (claim_report_stream).
+        lock_project(project)
+        job = active_report_job(project)
+        if job is None:
+            job = ReportJob.objects.create(
+                project=project, requested_by=user, regenerate=regenerate, bypass_cache=bypass_cache
+            )
+            transaction.on_commit(dispatch_report_jobs)
+    return job
+
+
+def active_report_job(project):
+    """The project's active report job, failing it instead when it is stale. Call with the project locked."""
+    job = ReportJob.objects.filter(project=project, status__in=ReportJob.ACTIVE_STATUSES).first()
+    if job and stale_report_jobs().filter(id=job.id).exists():
+        fail_stale_report_jobs(ReportJob.objects.filter(id=job.id))
+        return None
+    return job
+
+
+def free_report_slots(now) -> int:
+    """Slots of the reports lane not taken by a dispatched, live job."""
+    in_flight = ReportJob.objects.filter(
+        status__in=ReportJob.ACTIVE_STATUSES, dispatched_at__isnull=False,
+        updated_at__gte=now - REPORT_JOB_STALE_AFTER,
+    ).count()
+    return settings.LLM_LANES["reports"]["concurrency"] - in_flight
+
+
+def claim_report_stream(project, user) -> tuple:
+    """
+    Decides what a report stream for ``project`` (``GenerateReportStreamView``)
+    follows, so a stream and a queued job never generate the same report twice.
+
+    Returns:
+        tuple: ``(None, False)`` when the report already exists; ``(job,
+        True)`` for a new running job the stream generates itself, taking a
+        free slot of the reports lane; otherwise ``(job, False)`` for the
+        active job to wait for, queued here when there was none.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        lock_project(project)
+        if Project_Report.objects.filter(project=project).exists():
+            return None, False
+        job = active_report_job(project)
+        if job:
+            return job, False
+        # Jobs already waiting for a slot go first.
+        waiting = ReportJob.objects.filter(status='queued', dispatched_at__isnull=True).exists()
+        if waiting or free_report_slots(now) <= 0:
+            job = ReportJob.objects.create(project=project, requested_by=user)
+            transaction.on_commit(dispatch_report_jobs)
+            return job, False
+        job = ReportJob.objects.create(
+            project=project, requested_by=user, status='running', progress=10,
+            dispatched_at=now, started_at=now,
+        )
+    return job, True
+
+
+def finish_report_stream(job, generated: dict, all_questions: list, project_info) -> Project_Report:
+    """Stores what a report stream generated for its claimed job and marks the job done."""
+    with transaction.atomic():
+        report = store_new_report(job.project, generated, all_questions, project_info)
+        now = timezone.now()
+        ReportJob.objects.filter(id=job.id).update(
+            status='done', report=report, progress=100, finished_at=now, updated_at=now
+        )
+    return report
+
+
+def fail_report_stream(job, error: str):
+    """Fails a report stream's job unless it finished, then gives its slot to a waiting job."""
+    now = timezone.now()
+    ReportJob.objects.filter(id=job.id, status='running').update(
+        status='failed', error=error, finished_at=now, updated_at=now
+    )
+    dispatch_report_jobs()
+
+
+def store_new_report(project, generated: dict, all_questions: list, project_info) -> Project_Report:
+    """
+    Stores a first report for ``project``, unless one was stored meanwhile
+    (by a job whose stale claim was replaced); that report is kept and returned.
+    """
+    with transaction.atomic():
+        lock_project(project)
+        report = Project_Report.objects.filter(project=project).first()
+        if report is None:
+            report = store_report(project, None, generated, all_questions, project_info)
+    return report
+
+
+def dispatch_report_jobs() -> list:
+    """
+    Sends waiting report jobs to the reports queue while the lane has free
+    slots (``LLM_LANES["reports"]["concurrency"]``), in weighted fair order
+    over their requesters (``User.llm_weight``).
+
+    Jobs are held back here rather than in the broker so the order is decided
+    when a slot frees up: one user queueing many reports delays their own
+    jobs, not everyone else's. Returns the ids of the dispatched jobs.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        waiting = list(
+            ReportJob.objects.select_for_update().filter(status='queued', dispatched_at__isnull=True)
+            .only('id', 'requested_by_id', 'created_at').order_by('created_at')[:REPORT_DISPATCH_WINDOW]
+        )
+        if not waiting:
+            return []
+        slots = free_report_slots(now)
+        if slots <= 0:
+            return []
+
+        started = ReportJob.objects.filter(dispatched_at__gte=fair_share_since(now))
+        job_ids = [job.id for job in fair_order(waiting, started, slots)]
+        # updated_at restarts the staleness clock: the job may have waited longer than REPORT_JOB_STALE_AFTER.
+        ReportJob.objects.filter(id__in=job_ids).update(dispatched_at=now, updated_at=now)
+        for job_id in job_ids:
+            transaction.on_commit(lambda job_id=job_id: generate_report_task.delay(job_id))
+    return job_ids
+
+
+def fair_share_since(now):
+    return now - timedelta(seconds=settings.LLM_FAIR_SHARE_WINDOW)
+
+
+def fair_order(waiting: list, started, slots: int) -> list:
+    """
+    ``fair_share_order`` of ``waiting`` rows, with the requesters' shares
+    counted from ``started`` (rows of the same model started within the fair
+    share window) and their weights from ``User.llm_weight``.
+    """
+    served = dict(started.order_by().values_list('requested_by').annotate(count=Count('id')))
+    weights = dict(get_user_model().objects.filter(
+        id__in={row.requested_by_id for row in waiting}
+    ).values_list('id', 'llm_weight'))
+    return fair_share_order(waiting, served, weights, slots)
+
+
+def stale_report_jobs():
+    """Dispatched active jobs that saved no progress for ``REPORT_JOB_STALE_AFTER``."""
+    return ReportJob.objects.filter(
+        status__in=ReportJob.ACTIVE_STATUSES, dispatched_at__isnull=False,
+        updated_at__lt=timezone.now() - REPORT_JOB_STALE_AFTER,
+    )
+
+
+def fail_stale_report_jobs(jobs) -> int:
+    now = timezone.now()
+    return jobs.update(
+        status='failed', error="The report worker stopped responding.", finished_at=now, updated_at=now
+    )
+
+
+def recover_stale_report_jobs() -> int:
+    """
+    Frees the jobs ``dispatch_report_jobs`` would otherwise never look at
+    again. A job that never started lost its broker message and goes back in
+    line; one that was running lost its worker and fails, since running it
+    again could take the next worker down too. Returns the number of jobs.
+    """
+    with transaction.atomic():
+        requeued = stale_report_jobs().filter(status='queued').update(dispatched_at=None, updated_at=timezone.now())
+        failed = fail_stale_report_jobs(stale_report_jobs().filter(status='running'))
+    if requeued or failed:
+        logger.warning("recovered stale report jobs: %s requeued, %s failed", requeued, failed)
+    return requeued + failed
+
+
+@shared_task(ignore_result=True)
+def dispatch_report_jobs_task():
+    """
+    Run by Celery beat every ``REPORT_DISPATCH_INTERVAL`` seconds, so waiting
+    jobs still start when no enqueue or finished job triggers a dispatch.
+    """
+    recover_stale_report_jobs()
+    dispatch_report_jobs()
+
+
+@shared_task(ignore_result=True)
+def generate_report_task(job_id):
+    """Runs a dispatched ``ReportJob`` in the reports lane, then fills the slot it frees."""
+    try:
+        with llm_lane("reports"):
+            run_report_job(job_id)
+    finally:
+        dispatch_report_jobs()
+
+
+def run_report_job(job_id):
+    """
+    Generates the report for a ``ReportJob`` and records the outcome on the
+    job row. Only a dispatched queued job is run, so a message delivered twice
+    (or after the job was recovered) runs it once.
+    """
+    now = timezone.now()
+    claimed = ReportJob.objects.filter(id=job_id, status='queued', dispatched_at__isnull=False).update(
+        status='running', progress=10, started_at=now, updated_at=now
+    )
+    if not claimed:
+        return
+    job = ReportJob.objects.select_related('project__project_type').get(id=job_id)
+
+    project = job.project
+    try:
+        all_questions = get_answered_questions(project)
+        project_info = get_project_info(project)
+        report = Project_Report.objects.filter(project=project).prefetch_related('sections').first()
+        if report and not job.regenerate:
+            # Stored by a report stream or another job after this job was queued.
+            job.report = report
+            job.status = 'done'
+            job.progress = 100
+            job.finished_at = timezone.now()
+            job.save(update_fields=['report', 'status', 'progress', 'finished_at', 'updated_at'])
+            return
+        # A forced regeneration rewrites every section; otherwise only those whose inputs changed.
+        sections = stale_sections(report, all_questions, project_info, force=job.bypass_cache)
+        job.progress = 20
+        job.regenerated_sections = [section["key"] for section in sections]
+        job.save(update_fields=['progress', 'regenerated_sections', 'updated_at'])
+
+        def on_progress(done, total):
+            job.progress = 20 + 75 * done // total
+            job.save(update_fields=['progress', 'updated_at'])
+
+        generated = generate_sections(
+            sections, all_questions, project_info, bypass_cache=job.bypass_cache, on_progress=on_progress
+        )
+
+        with transaction.atomic():
+            # The previous report stays readable until the changed sections are ready.
+            if report is None:
+                report = store_new_report(project, generated, all_questions, project_info)
+            else:
+                report = store_report(project, report, generated, all_questions, project_info)
+            job.report = report
+            job.status = 'done'
+            job.progress = 100
+            job.finished_at = timezone.now()
+            job.save(update_fields=['report', 'status', 'progress', 'finished_at', 'updated_at'])
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+
+
+def enqueue_report_batch(filters: dict, force=False, user=None) -> ReportBatch:
+    """Creates a bulk regeneration batch; it is built and submitted by a Celery task."""
+    with transaction.atomic():
+        batch = ReportBatch.objects.create(requested_by=user, filters=filters, force=force)
+        transaction.on_commit(lambda: submit_report_batch_task.delay(batch.id))
+    return batch
+
+
+@shared_task(ignore_result=True)
+def submit_report_batch_task(batch_id):
+    """
+    Submits a queued ``ReportBatch`` as an Anthropic Message Batch, then
+    starts polling it. Every queued batch sends one message, but each message
+    submits the batch that is next in weighted fair order over the requesters
+    (``batch_id`` only triggers it), so one user queueing many batches does
+    not hold back everyone else's.
+    """
+    with transaction.atomic():
+        batch = claim_next_report_batch()
+        if batch is None:
+            return
+        try:
+            with llm_lane("batch"):
+                submit_batch(batch)
+        except Exception as e:
+            batch.status = 'failed'
+            batch.error = str(e)
+            batch.finished_at = timezone.now()
+            batch.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+            return
+    poll_report_batch_task.apply_async((batch.id,), countdown=settings.REPORT_BATCH_POLL_INTERVAL)
+
+
+def claim_next_report_batch():
+    """
+    The queued batch to submit next, row-locked until the surrounding
+    transaction ends; batches another worker is submitting are passed over.
+    """
+    waiting = list(
+        ReportBatch.objects.filter(status='queued').only('id', 'requested_by_id', 'created_at')
+        .order_by('created_at')[:REPORT_DISPATCH_WINDOW]
+    )
+    started = ReportBatch.objects.filter(submitted_at__gte=fair_share_since(timezone.now()))
+    for candidate in fair_order(waiting, started, len(waiting)):
+        batch = ReportBatch.objects.select_for_update(skip_locked=True).filter(
+            id=candidate.id, status='queued'
+        ).first()
+        if batch:
+            return batch
+    return None
+
+
+@shared_task(ignore_result=True)
+def poll_report_batch_task(batch_id):
+    """Collects the results of an ended Message Batch, or checks again after the poll interval."""
+    try:
+        batch = ReportBatch.objects.get(id=batch_id, status='submitted')
+    except ReportBatch.DoesNotExist:
+        return
+
+    try:
+        with llm_lane("batch"):
+            if collect_batch(batch):
+                return
+    except Exception as e:
+        # Transient API errors must not lose the batch; keep polling.
+        batch.error = str(e)
+        batch.save(update_fields=['error', 'updated_at'])
+    poll_report_batch_task.apply_async((batch.id,), countdown=settings.REPORT_BATCH_POLL_INTERVAL)
+
+
+def schedule_ai_question_prefetch(project, question):
+    """
+    Queues background AI question generation once ``question`` (just answered)
+    is at most ``AI_QUESTION_PREFETCH_DISTANCE`` questions from the end of the
+    predefined chain. Returns the prefetch row, or None when nothing was queued.
+    """
+    distance = settings.AI_QUESTION_PREFETCH_DISTANCE
+    if distance <= 0:
+        return None
+
+    remaining = 0
+    next_question = question.next_question
+    while next_question is not None and remaining <= distance:
+        remaining += 1
+        next_question = next_question.next_question
+    if remaining == 0 or remaining > distance:
+        return None
+
+    if AI_Question.objects.filter(project=project).exists():
+        return None
+
+    with transaction.atomic():
+        prefetch, created = AI_QuestionPrefetch.objects.select_for_update().get_or_create(project=project)
+        if not created and prefetch.status in ('queued', 'running', 'done'):
+            return prefetch
+        prefetch.status = 'queued'
+        prefetch.error = ""
+        prefetch.save(update_fields=['status', 'error', 'updated_at'])
+        transaction.on_commit(lambda: prefetch_ai_questions_task.delay(prefetch.id))
+    return prefetch
+
+
+def take_prefetched_ai_questions(project):
+    """
+    Returns the first pre-generated ``AI_Question`` if the prefetch finished and
+    the answers it was generated from are unchanged, otherwise None.
+
+    In the None case the prefetch is marked stale (so a still-running task drops
+    its result) and any speculative questions are removed, leaving the caller to
+    generate questions synchronously.
+    """
+    with transaction.atomic():
+        try:
+            prefetch = AI_QuestionPrefetch.objects.select_for_update().get(project=project)
+        except AI_QuestionPrefetch.DoesNotExist:
+            return None
+
+        if prefetch.status == 'done':
+            current = [
+                question for question in get_answered_questions(project, include_ai=False)
+                if question["id"] in prefetch.question_ids
+            ]
+            if len(current) == len(prefetch.question_ids) and transcript_fingerprint(current) == prefetch.fingerprint:
+                first_ai_question = AI_Question.objects.filter(project=project).order_by('question_no').first()
+                if first_ai_question:
+                    return first_ai_question
+
+            AI_Question.objects.filter(project=project, ai_answer__isnull=True).delete()
+
+        prefetch.status = 'stale'
+        prefetch.save(update_fields=['status', 'updated_at'])
+    return None
+
+
+def claim_ai_question_generation(project):
+    """
+    Decides, under the project lock, how a caller gets the project's first
+    ``AI_Question``:
+
+    - ``("ready", ai_question)``: it exists (or was prefetched and is still valid);
+    - ``("wait", None)``: another caller is generating the questions right now;
+    - ``("busy", None)``: the project's user has ``LLM_LANES["interactive"]
+      ["per_user"]`` generations in flight already;
+    - ``("generate", generation)``: the caller must generate them and fill the
+      returned running ``AI_QuestionGeneration``.
+
+    A running generation that stopped making progress for
+    ``LLM_QUESTION_STREAM_WAIT`` seconds (its process died) is taken over:
+    by the caller when it stored no question yet, otherwise by a worker that
+    continues after the last stored one (see ``resume_stalled_ai_question_generation``).
+    """
+    with transaction.atomic():
+        lock_project(project)
+
+        first_ai_question = take_prefetched_ai_questions(project)
+        if first_ai_question:
+            return "ready", first_ai_question
+
+        first_ai_question = AI_Question.objects.filter(project=project).order_by('question_no').first()
+        if first_ai_question:
+            resume_stalled_ai_question_generation(project)
+            return "ready", first_ai_question
+
+        if AI_QuestionGeneration.objects.filter(
+            project=project, status='running', updated_at__gt=question_stream_stalled_before()
+        ).exists():
+            return "wait", None
+
+        if not take_interactive_slot(project.user_id):
+            return "busy", None
+
+        generation, _ = AI_QuestionGeneration.objects.update_or_create(
+            project=project, defaults={'status': 'running', 'question_count': 0, 'error': ""}
+        )
+        return "generate", generation
+
+
+def take_interactive_slot(user_id) -> bool:
+    """
+    Whether ``user_id`` may start another question generation. The user's row
+    stays locked until the surrounding transaction ends, so concurrent claims
+    for several of their projects are counted one after another.
+    """
+    User = get_user_model()
+    User.objects.select_for_update(no_key=connection.features.has_select_for_no_key_update).filter(
+        pk=user_id
+    ).exists()
+    return interactive_generations_in_flight(user_id) < settings.LLM_LANES["interactive"]["per_user"]
+
+
+def interactive_generations_in_flight(user_id) -> int:
+    """Question streams and prefetches running for ``user_id``'s projects."""
+    streams = AI_QuestionGeneration.objects.filter(
+        project__user_id=user_id, status='running', updated_at__gt=question_stream_stalled_before()
+    ).count()
+    prefetches = AI_QuestionPrefetch.objects.filter(
+        project__user_id=user_id, status='running', updated_at__gt=timezone.now() - QUESTION_PREFETCH_STALE_AFTER
+    ).count()
+    return streams + prefetches
+
+
+def interactive_slots_taken():
+    return Throttled(
+        wait=settings.LLM_QUESTION_STREAM_WAIT,
+        detail="Too many AI question generations are in progress for this user.",
+    )
+
+
+def question_stream_stalled_before():
+    """Running generations not updated since then have stalled."""
+    return timezone.now() - timedelta(seconds=settings.LLM_QUESTION_STREAM_WAIT)
+
+
+def resume_stalled_ai_question_generation(project) -> bool:
+    """
+    Hands the rest of a stalled question stream to ``resume_ai_questions_task``
+    in the interactive lane. The stream's process died after storing some
+    questions (deploy, worker recycle), so without this the generation would
+    stay running and the interview could not continue. Returns whether a
+    generation was resumed.
+    """
+    with transaction.atomic():
+        lock_project(project)
+        resumed = AI_QuestionGeneration.objects.filter(
+            project=project, status='running', updated_at__lte=question_stream_stalled_before()
+        ).update(updated_at=timezone.now())
+        if resumed:
+            generation_id = AI_QuestionGeneration.objects.filter(project=project).values_list('id', flat=True).get()
+            transaction.on_commit(lambda: resume_ai_questions_task.delay(generation_id))
+    return bool(resumed)
+
+
+@shared_task(ignore_result=True)
+def resume_ai_questions_task(generation_id):
+    """
+    Generates the project's questions again and stores those after its last
+    stored one. The new stream is a complete list, so questions whose text is
+    already stored are skipped and the rest are added, in stream order, only
+    until the project has as many questions as the stream has yielded.
+    """
+    try:
+        generation = AI_QuestionGeneration.objects.select_related('project__project_type').get(
+            id=generation_id, status='running'
+        )
+    except AI_QuestionGeneration.DoesNotExist:
+        return
+
+    project = generation.project
+    stored = list(AI_Question.objects.filter(project=project).order_by('question_no'))
+    asked = {ai_question.text.lower() for ai_question in stored}
+    last_ai_question = stored[-1] if stored else None
+    stored_count = len(stored)
+    pending = deque()
+    try:
+        ai_questions = anthropic_prompt.stream_questions(
+            get_answered_questions(project, include_ai=False), get_project_info(project)
+        )
+        for yielded, ai_question in enumerate(ai_questions, 1):
+            if ai_question["text"].lower() not in asked:
+                asked.add(ai_question["text"].lower())
+                pending.append(ai_question)
+            while pending and stored_count < yielded:
+                last_ai_question = store_ai_question(generation, last_ai_question, pending.popleft())
+                stored_count += 1
+        finish_ai_question_generation(generation)
+    except Exception as e:
+        logger.exception("resumed AI question generation %s failed", generation.id)
+        finish_ai_question_generation(generation, e)
+
+
+def store_ai_question(generation, previous, ai_question: dict):
+    """
+    Appends one streamed question to the project's chain, after ``previous``
+    (None for the first question), and records the progress on ``generation``.
+    """
+    with transaction.atomic():
+        stored = AI_Question.objects.create(
+            project_id=generation.project_id,
+            text=ai_question["text"],
+            description=ai_question["description"],
+            question_no=previous.question_no + 1 if previous else 1,
+        )
+        if previous:
+            previous.next_question = stored
+            previous.save(update_fields=['next_question', 'updated_at'])
+        AI_QuestionGeneration.objects.filter(id=generation.id).update(
+            question_count=stored.question_no, updated_at=timezone.now()
+        )
+    return stored
+
+
+def finish_ai_question_generation(generation, error: Exception = None):
+    if error is None:
+        AI_QuestionGeneration.objects.filter(id=generation.id).update(status='done', updated_at=timezone.now())
+    else:
+        AI_QuestionGeneration.objects.filter(id=generation.id).update(
+            status='failed', error=str(error), updated_at=timezone.now()
+        )
+
+
+def get_or_generate_ai_questions(project):
+    """
+    Returns the project's first ``AI_Question``, generating the questions if
+    the project has none yet. Returns None when the model asks nothing more.
+
+    Generation is single-flight per project: the first caller claims it (see
+    ``claim_ai_question_generation``) and concurrent callers wait for the
+    questions it stores instead of paying for a second call.
+
+    The questions are streamed: the first one is stored and returned as soon as
+    the model has written it, and a background thread stores the rest as they
+    arrive (see ``wait_for_ai_question``).
+    """
+    state, value = claim_ai_question_generation(project)
+    if state == "ready":
+        return value
+    if state == "wait":
+        return wait_for_ai_question(project, 1)
+    if state == "busy":
+        raise interactive_slots_taken()
+
+    generation = value
+    try:
+        all_questions = get_answered_questions(project, include_ai=False)
+        ai_questions = anthropic_prompt.stream_questions(all_questions, get_project_info(project))
+        first = next(ai_questions, None)
+        if first is None:
+            finish_ai_question_generation(generation)
+            return None
+        first_ai_question = store_ai_question(generation, None, first)
+    except IntegrityError:
+        # The prefetch task stored its questions first; use those.
+        finish_ai_question_generation(generation)
+        return AI_Question.objects.filter(project=project).order_by('question_no').first()
+    except Exception as e:
+        finish_ai_question_generation(generation, e)
+        raise
+
+    # A copy of the context keeps the request's LLM deadline in effect for the rest of the stream.
+    question_stream_executor().submit(
+        contextvars.copy_context().run, store_streamed_ai_questions, generation, first_ai_question, ai_questions
+    )
+    return first_ai_question
+
+
+async def aget_or_generate_ai_questions(project):
+    """
+    ``get_or_generate_ai_questions`` for async views. The model is streamed
+    with ``AsyncAnthropic``, so the event loop serves other requests while it
+    writes; database work runs in threads. The rest of the stream is stored
+    by a task on the event loop.
+    """
+    state, value = await sync_to_async(claim_ai_question_generation)(project)
+    if state == "ready":
+        return value
+    if state == "wait":
+        return await await_ai_question(project, 1)
+    if state == "busy":
+        raise interactive_slots_taken()
+
+    generation = value
+    try:
+        request = await sync_to_async(question_generation_request)(project)
+        ai_questions = anthropic_prompt.astream_questions(request)
+        first = await anext(ai_questions, None)
+        if first is None:
+            await sync_to_async(finish_ai_question_generation)(generation)
+            return None
+        first_ai_question = await sync_to_async(store_ai_question)(generation, None, first)
+    except IntegrityError:
+        await sync_to_async(finish_ai_question_generation)(generation)
+        return await AI_Question.objects.filter(project=project).order_by('question_no').afirst()
+    except Exception as e:
+        await sync_to_async(finish_ai_question_generation)(generation, e)
+        raise
+
+    task = asyncio.create_task(astore_streamed_ai_questions(generation, first_ai_question, ai_questions))
+    # The loop only keeps weak references to tasks.
+    _question_stream_tasks.add(task)
+    task.add_done_callback(_question_stream_tasks.discard)
+    return first_ai_question
+
+
+def question_generation_request(project) -> dict:
+    return anthropic_prompt.get_question_request(
+        get_answered_questions(project, include_ai=False), get_project_info(project)
+    )
+
+
+def question_stream_executor() -> ThreadPoolExecutor:
+    global _question_stream_executor
+    with _question_stream_executor_lock:
+        if _question_stream_executor is None:
+            _question_stream_executor = ThreadPoolExecutor(
+                max_workers=settings.LLM_QUESTION_STREAM_WORKERS, thread_name_prefix="ai-questions"
+            )
+        return _question_stream_executor
+
+
+def store_streamed_ai_questions(generation, last_ai_question, ai_questions):
+    """Stores the rest of a question stream, linking each question to the previous one as it arrives."""
+    try:
+        for ai_question in ai_questions:
+            last_ai_question = store_ai_question(generation, last_ai_question, ai_question)
+        finish_ai_question_generation(generation)
+    except Exception as e:
+        logger.exception("streamed AI question generation %s failed", generation.id)
+        finish_ai_question_generation(generation, e)
+    finally:
+        connection.close()
+
+
+async def astore_streamed_ai_questions(generation, last_ai_question, ai_questions):
+    """Async ``store_streamed_ai_questions``."""
+    try:
+        async for ai_question in ai_questions:
+            last_ai_question = await in_stream_thread(store_ai_question, generation, last_ai_question, ai_question)
+        await in_stream_thread(finish_ai_question_generation, generation)
+    except Exception as e:
+        logger.exception("streamed AI question generation %s failed", generation.id)
+        await in_stream_thread(finish_ai_question_generation, generation, e)
+
+
+async def in_stream_thread(function, *args):
+    """
+    Runs database work of a stream that outlives its request in the shared
+    thread pool, not the request's thread: the request's thread-sensitive
+    context would start a new thread (and connection) per call once the
+    request ended. The connection is released as at the end of a request.
+    """
+    def run():
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(run, thread_sensitive=False)()
+
+
+def wait_for_ai_question(project, question_no):
+    """
+    Returns the project's AI question ``question_no``. While the questions are
+    still being streamed in, waits up to ``LLM_QUESTION_STREAM_WAIT`` seconds
+    for it; returns None once generation is over and it does not exist.
+    A stalled generation is resumed and waited for.
+    """
+    deadline = time.monotonic() + settings.LLM_QUESTION_STREAM_WAIT
+    while True:
+        ai_question = AI_Question.objects.filter(project=project, question_no=question_no).first()
+        if ai_question:
+            return ai_question
+        updated_at = AI_QuestionGeneration.objects.filter(
+            project=project, status='running'
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None or time.monotonic() >= deadline:
+            return None
+        if updated_at <= question_stream_stalled_before():
+            resume_stalled_ai_question_generation(project)
+        time.sleep(QUESTION_STREAM_POLL_INTERVAL)
+
+
+async def await_ai_question(project, question_no):
+    """Async ``wait_for_ai_question``."""
+    deadline = time.monotonic() + settings.LLM_QUESTION_STREAM_WAIT
+    while True:
+        ai_question = await AI_Question.objects.filter(project=project, question_no=question_no).afirst()
+        if ai_question:
+            return ai_question
+        updated_at = await AI_QuestionGeneration.objects.filter(
+            project=project, status='running'
+        ).values_list('updated_at', flat=True).afirst()
+        if updated_at is None or time.monotonic() >= deadline:
+            return None
+        if updated_at <= question_stream_stalled_before():
+            await sync_to_async(resume_stalled_ai_question_generation)(project)
+        await asyncio.sleep(QUESTION_STREAM_POLL_INTERVAL)
+
+
+@shared_task(ignore_result=True)
+def prefetch_ai_questions_task(prefetch_id):
+    """Generates AI follow-up questions ahead of time and stores them as ``AI_Question`` rows."""
+    with transaction.atomic():
+        try:
+            prefetch = AI_QuestionPrefetch.objects.select_for_update(of=('self',)).select_related(
+                'project__project_type'
+            ).get(id=prefetch_id)
+        except AI_QuestionPrefetch.DoesNotExist:
+            return
+        if prefetch.status != 'queued':
+            return
+        if not take_interactive_slot(prefetch.project.user_id):
+            # Questions are generated when they are needed instead; the next answer may queue it again.
+            prefetch.status = 'failed'
+            prefetch.error = "The user's interactive slots were taken."
+            prefetch.save(update_fields=['status', 'error', 'updated_at'])
+            return
+        prefetch.status = 'running'
+        prefetch.save(update_fields=['status', 'updated_at'])
+
+    project = prefetch.project
+    all_questions = get_answered_questions(project, include_ai=False)
+    try:
+        ai_questions = anthropic_prompt.ask_questions(all_questions, get_project_info(project))
+    except Exception as e:
+        AI_QuestionPrefetch.objects.filter(id=prefetch_id, status='running').update(
+            status='failed', error=str(e), updated_at=timezone.now()
+        )
+        return
+
+    with transaction.atomic():
+        # Same lock order as get_or_generate_ai_questions: project, then prefetch.
+        lock_project(project)
+        prefetch = AI_QuestionPrefetch.objects.select_for_update().get(id=prefetch_id)
+        # The final answer may have arrived first and generated (or be generating) questions.
+        if (
+            prefetch.status != 'running'
+            or AI_Question.objects.filter(project=project).exists()
+            or AI_QuestionGeneration.objects.filter(project=project, status='running').exists()
+        ):
+            return
+        if ai_questions:
+            save_ai_questions(project, ai_questions)
+        prefetch.status = 'done'
+        prefetch.question_ids = [question["id"] for question in all_questions]
+        prefetch.fingerprint = transcript_fingerprint(all_questions)
+        prefetch.save(update_fields=['status', 'question_ids', 'fingerprint', 'updated_at'])
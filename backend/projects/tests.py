@@ -0,0 +1,657 @@
+from datetime import timedelta
+from types import SimpleNamespace
+import asyncio
+import threading
+from unittest import mock
+
+import anthropic
+from django.conf import settings
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import Throttled
+
+from admin_api.models import Settings
+from users.models import User
+
+from . import reports, tasks, throttles
+from .anthropic import gateway as gateway_module
+from .anthropic.gateway import LLMGateway
+from .anthropic.prompt import REPORT_SECTIONS
+from .anthropic.ratelimit import LocalBuckets, RateLimiter
+from .anthropic.resilience import CircuitOpenError, DeadlineExceeded, llm_deadline, load
+from .anthropic.stub import make_stub_server
+from .async_views import AsyncGetNextQuestionView
+from .models import (
+    AI_Question, AI_QuestionGeneration, AI_QuestionPrefetch, Answer, Project, Project_Report, ProjectType, Question,
+    ReportBatch, ReportJob,
+)
+from .scheduling import fair_share_order
+from .throttles import clear_quota_cache, get_user_quota, validate_quotas
+from .utils import get_project_info
+
+
+class StalledQuestionStreamTests(TestCase):
+    """A question stream whose process died is resumed after its last stored question."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='client', email='client@example.com', password='x')
+        cls.project = Project.objects.create(
+            user=user, project_type=ProjectType.objects.create(name='Web', description=''), name='Shop'
+        )
+
+    def start_stream(self):
+        generation = AI_QuestionGeneration.objects.create(project=self.project)
+        tasks.store_ai_question(generation, None, {'text': 'Who are your users?', 'description': ''})
+        return generation
+
+    def test_live_stream_is_not_resumed(self):
+        self.start_stream()
+        self.assertFalse(tasks.resume_stalled_ai_question_generation(self.project))
+
+    def stall(self, generation):
+        AI_QuestionGeneration.objects.filter(id=generation.id).update(updated_at=timezone.now() - timedelta(minutes=5))
+
+    @override_settings(LLM_QUESTION_STREAM_WAIT=0.3)
+    def test_waiting_resumes_stalled_stream(self):
+        self.stall(self.start_stream())
+        with mock.patch.object(tasks, 'resume_stalled_ai_question_generation') as resume:
+            self.assertIsNone(tasks.wait_for_ai_question(self.project, 2))
+        resume.assert_called_with(self.project)
+
+    def test_stalled_stream_continues_after_last_question(self):
+        generation = self.start_stream()
+        self.stall(generation)
+        streamed = [
+            {'text': 'Who uses it?', 'description': ''},
+            {'text': 'Who are your users?', 'description': ''},
+            {'text': 'Which payments do you take?', 'description': ''},
+        ]
+        with (
+            mock.patch.object(tasks.anthropic_prompt, 'stream_questions', return_value=iter(streamed)),
+            mock.patch.object(tasks.resume_ai_questions_task, 'delay', side_effect=tasks.resume_ai_questions_task),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.assertTrue(tasks.resume_stalled_ai_question_generation(self.project))
+
+        ai_question = tasks.wait_for_ai_question(self.project, 2)
+        self.assertEqual(ai_question.text, 'Who uses it?')
+        self.assertEqual(AI_Question.objects.get(project=self.project, question_no=1).next_question, ai_question)
+        self.assertEqual(tasks.wait_for_ai_question(self.project, 3).text, 'Which payments do you take?')
+        self.assertEqual(AI_QuestionGeneration.objects.get(id=generation.id).status, 'done')
+        self.assertIsNone(tasks.wait_for_ai_question(self.project, 4))
+
+    def test_resumed_stream_stops_at_its_question_count(self):
+        generation = self.start_stream()
+        tasks.store_ai_question(
+            generation, AI_Question.objects.get(project=self.project), {'text': 'Which pages do you need?', 'description': ''}
+        )
+        self.stall(generation)
+        streamed = [{'text': 'Who uses it?', 'description': ''}, {'text': 'Which payments do you take?', 'description': ''}]
+        with mock.patch.object(tasks.anthropic_prompt, 'stream_questions', return_value=iter(streamed)):
+            tasks.resume_ai_questions_task(generation.id)
+
+        self.assertEqual(AI_Question.objects.filter(project=self.project).count(), 2)
+        self.assertEqual(AI_QuestionGeneration.objects.get(id=generation.id).status, 'done')
+
+
+class QuestionPrefetchTests(TestCase):
+    """Prefetched AI questions are used only while the answers they were generated from are unchanged."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='client', email='client@example.com', password='x')
+        project_type = ProjectType.objects.create(name='Web', description='')
+        cls.project = Project.objects.create(user=user, project_type=project_type, name='Shop')
+        question = Question.objects.create(question_no=1, text='What do you sell?', project_type=project_type)
+        cls.answer = Answer.objects.create(user=user, question=question, project=cls.project, text='Shoes')
+
+    def prefetch(self):
+        prefetch = AI_QuestionPrefetch.objects.create(project=self.project)
+        ai_questions = [{'text': 'Which sizes do you stock?', 'description': ''}]
+        with mock.patch.object(tasks.anthropic_prompt, 'ask_questions', return_value=ai_questions):
+            tasks.prefetch_ai_questions_task(prefetch.id)
+        self.assertEqual(AI_QuestionPrefetch.objects.get(id=prefetch.id).status, 'done')
+        return prefetch
+
+    def test_prefetch_used(self):
+        self.prefetch()
+        self.assertEqual(tasks.take_prefetched_ai_questions(self.project).text, 'Which sizes do you stock?')
+
+    def test_stale_prefetch_discarded(self):
+        prefetch = self.prefetch()
+        self.answer.text = 'Shoes and bags'
+        self.answer.save(update_fields=['text'])
+
+        self.assertIsNone(tasks.take_prefetched_ai_questions(self.project))
+        self.assertEqual(AI_QuestionPrefetch.objects.get(id=prefetch.id).status, 'stale')
+        self.assertFalse(AI_Question.objects.filter(project=self.project).exists())
+
+
+class StaleReportJobTests(TestCase):
+    """Report jobs whose message or worker was lost are recovered instead of blocking their project."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='client', email='client@example.com', password='x')
+        cls.project_type = ProjectType.objects.create(name='Web', description='')
+
+    def dispatched_job(self, status, minutes_ago):
+        project = Project.objects.create(user=self.user, project_type=self.project_type, name='Shop')
+        job = ReportJob.objects.create(project=project, requested_by=self.user, status=status)
+        ReportJob.objects.filter(id=job.id).update(
+            dispatched_at=timezone.now(), updated_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return job
+
+    def test_recover(self):
+        lost_message = self.dispatched_job('queued', 60)
+        dead_worker = self.dispatched_job('running', 60)
+        live = self.dispatched_job('running', 1)
+        self.assertEqual(tasks.recover_stale_report_jobs(), 2)
+
+        lost_message.refresh_from_db()
+        self.assertEqual((lost_message.status, lost_message.dispatched_at), ('queued', None))
+        self.assertEqual(ReportJob.objects.get(id=dead_worker.id).status, 'failed')
+        self.assertEqual(ReportJob.objects.get(id=live.id).status, 'running')
+
+    def test_enqueue_replaces_stale_job(self):
+        live = self.dispatched_job('running', 1)
+        self.assertEqual(tasks.enqueue_report_job(live.project, user=self.user), live)
+
+        stale = self.dispatched_job('running', 60)
+        job = tasks.enqueue_report_job(stale.project, user=self.user)
+        self.assertNotEqual(job, stale)
+        self.assertEqual(ReportJob.objects.get(id=stale.id).status, 'failed')
+
+    def test_job_runs_once(self):
+        job = self.dispatched_job('running', 1)
+        with mock.patch.object(tasks, 'get_answered_questions') as get_answered_questions:
+            tasks.run_report_job(job.id)
+        get_answered_questions.assert_not_called()
+
+
+class ReportStreamTests(TestCase):
+    """A report stream runs as the project's report job, so a report is generated once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='client', email='client@example.com', password='x', role='client')
+        cls.project = Project.objects.create(
+            user=cls.user, project_type=ProjectType.objects.create(name='Web', description=''), name='Shop'
+        )
+
+    def stream(self, user=None):
+        token = Token.objects.get_or_create(user=user or self.user)[0]
+        return self.client.get(
+            f'/api/projects/generate_report_stream/{self.project.id}/', headers={'Authorization': f'Token {token.key}'}
+        )
+
+    def patch_sections(self):
+        return mock.patch.object(
+            tasks.anthropic_prompt, 'stream_report_section', side_effect=lambda *args, **kwargs: iter(['Text'])
+        )
+
+    def test_other_client_is_rejected(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='x', role='client')
+        self.assertEqual(self.stream(other).status_code, 403)
+
+    def test_stream_runs_as_report_job(self):
+        with self.patch_sections() as stream_report_section:
+            events = b''.join(self.stream().streaming_content).decode()
+        self.assertIn('event: done', events)
+        job = ReportJob.objects.get(project=self.project)
+        self.assertEqual((job.status, job.report), ('done', Project_Report.objects.get(project=self.project)))
+
+        # The queued job of an earlier request keeps the stored report instead of paying for another one.
+        queued = ReportJob.objects.create(project=self.project, status='queued', dispatched_at=timezone.now())
+        tasks.run_report_job(queued.id)
+        self.assertEqual(stream_report_section.call_count, len(REPORT_SECTIONS))
+        self.assertEqual(ReportJob.objects.get(id=queued.id).report, job.report)
+
+    def test_stream_waits_for_active_job(self):
+        job = tasks.enqueue_report_job(self.project, user=self.user)
+        with self.patch_sections() as stream_report_section:
+            response = self.stream()
+            self.assertTrue(next(response.streaming_content).startswith(b'event: progress'))
+            response.close()
+        stream_report_section.assert_not_called()
+        self.assertEqual(list(ReportJob.objects.filter(project=self.project)), [job])
+
+    def test_abandoned_stream_fails_its_job(self):
+        with self.patch_sections():
+            response = self.stream()
+            next(response.streaming_content)
+            response.close()
+        job = ReportJob.objects.get(project=self.project)
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(Project_Report.objects.filter(project=self.project).exists())
+
+
+class ReportSectionTests(TestCase):
+    """Only the report sections whose cited answers changed are regenerated."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='client', email='client@example.com', password='x')
+        cls.project = Project.objects.create(
+            user=user, project_type=ProjectType.objects.create(name='Web', description=''), name='Shop'
+        )
+
+    def transcript(self, answers):
+        return [
+            {'id': id, 'question_text': f'Question {id}?', 'answer_text': text, 'answer_tokens': 1, 'question_asked_by': 'predefined'}
+            for id, text in sorted(answers.items())
+        ]
+
+    def generate(self, sections):
+        cited = {'functional': 'P2'}
+        return {
+            section['key']: f'<section>{section["key"]}</section><!-- sources: {cited.get(section["key"], "P1")} -->'
+            for section in sections
+        }
+
+    def test_only_changed_sections_regenerated(self):
+        project_info = get_project_info(self.project)
+        before = self.transcript({1: 'A shop', 2: 'Card payments'})
+        report = reports.store_report(self.project, None, self.generate(REPORT_SECTIONS), before, project_info)
+        self.assertEqual(reports.stale_sections(report, before, project_info), [])
+
+        after = self.transcript({1: 'A shop', 2: 'Card and bank payments'})
+        stale = reports.stale_sections(report, after, project_info)
+        self.assertEqual([section['key'] for section in stale], ['functional'])
+
+        report = reports.store_report(self.project, report, {'functional': '<section>new</section>'}, after, project_info)
+        self.assertEqual(report.sections.get(key='overview').content, '<section>overview</section>')
+        self.assertIn('<section>new</section>', report.report)
+        self.assertEqual(reports.stale_sections(report, after, project_info), [])
+
+    def test_new_answer_makes_every_section_stale(self):
+        project_info = get_project_info(self.project)
+        before = self.transcript({1: 'A shop'})
+        report = reports.store_report(self.project, None, self.generate(REPORT_SECTIONS), before, project_info)
+        after = self.transcript({1: 'A shop', 2: 'Card payments'})
+        self.assertEqual(len(reports.stale_sections(report, after, project_info)), len(REPORT_SECTIONS))
+
+
+@override_settings(LLM_LEDGER_ENABLED=False, ANTHROPIC_RATE_LIMIT_BACKEND='local')
+class StreamLoadTests(TestCase):
+    """A streamed call counts as in flight until its stream is closed, not just while it opens."""
+
+    def setUp(self):
+        server = make_stub_server(output_tokens='200')
+        # Closing an abandoned stream resets its connection; that is expected here.
+        server.handle_error = lambda request, client_address: None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        self.gateway = LLMGateway(api_key='test', base_url=f'http://127.0.0.1:{server.server_address[1]}')
+        self.addCleanup(self.gateway.close)
+
+    def test_stream_holds_in_flight_slot(self):
+        before = load.snapshot()['in_flight_calls']
+        stream = self.gateway.stream_text('Hello', max_tokens=200)
+        next(stream)
+        self.assertEqual(load.snapshot()['in_flight_calls'], before + 1)
+        list(stream)
+        self.assertEqual(load.snapshot()['in_flight_calls'], before)
+
+    def test_abandoned_stream_releases_slot(self):
+        before = load.snapshot()['in_flight_calls']
+        stream = self.gateway.stream_text('Hello', max_tokens=200)
+        next(stream)
+        stream.close()
+        self.assertEqual(load.snapshot()['in_flight_calls'], before)
+
+
+class CircuitBreakerTests(TestCase):
+    """After repeated transient failures a model's calls fail fast, until one probe call is let through."""
+
+    def setUp(self):
+        self.gateway = LLMGateway(max_retries=0, breaker_failure_threshold=2, breaker_reset_timeout=30)
+        self.error = anthropic.APIConnectionError(request=mock.Mock())
+
+    def fail(self):
+        with self.assertRaises(anthropic.APIConnectionError):
+            self.gateway._call('m', mock.Mock(side_effect=self.error))
+
+    def open_circuit(self):
+        self.fail()
+        self.fail()
+        send = mock.Mock()
+        with self.assertRaises(CircuitOpenError):
+            self.gateway._call('m', send)
+        send.assert_not_called()
+        breaker = self.gateway.breaker('m')
+        self.assertEqual(breaker.state, 'open')
+        return breaker
+
+    def test_probe_closes_circuit(self):
+        breaker = self.open_circuit()
+        breaker.opened_at -= 30
+        self.assertEqual(self.gateway._call('m', mock.Mock(return_value='ok')), 'ok')
+        self.assertEqual(breaker.snapshot(), {'state': 'closed', 'consecutive_failures': 0, 'times_opened': 1})
+
+    def test_one_probe_at_a_time(self):
+        breaker = self.open_circuit()
+        breaker.opened_at -= 30
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+    def test_failed_probe_reopens_circuit(self):
+        breaker = self.open_circuit()
+        breaker.opened_at -= 30
+        self.fail()
+        self.assertEqual((breaker.state, breaker.times_opened), ('open', 2))
+        with self.assertRaises(CircuitOpenError):
+            self.gateway._call('m', mock.Mock())
+
+
+@override_settings(ANTHROPIC_RPM_LIMIT=0, ANTHROPIC_TPM_LIMIT=1000, ANTHROPIC_MODEL_RATE_LIMITS={})
+class RateLimitReservationTests(TestCase):
+    """Tokens reserved for a call that is never sent go back to the bucket."""
+
+    def setUp(self):
+        self.buckets = LocalBuckets()
+        patcher = mock.patch.object(gateway_module, 'rate_limiter', RateLimiter(self.buckets))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.send = mock.Mock()
+
+    def tokens_left(self):
+        return self.buckets._buckets['llm-ratelimit:m:tokens'][0]
+
+    def test_deadline_releases_reservation(self):
+        with llm_deadline(0), self.assertRaises(DeadlineExceeded):
+            LLMGateway()._call('m', self.send, tokens=400)
+        self.send.assert_not_called()
+        self.assertEqual(self.tokens_left(), 1000)
+
+    def test_async_deadline_releases_reservation(self):
+        async def call():
+            with llm_deadline(0):
+                await LLMGateway()._acall('m', self.send, tokens=400)
+
+        with self.assertRaises(DeadlineExceeded):
+            asyncio.run(call())
+        self.assertEqual(self.tokens_left(), 1000)
+
+    def stub_gateway(self):
+        server = make_stub_server(output_tokens='200')
+        server.handle_error = lambda request, client_address: None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        gateway = LLMGateway(api_key='test', base_url=f'http://127.0.0.1:{server.server_address[1]}')
+        self.addCleanup(gateway.close)
+        return gateway
+
+    @override_settings(LLM_LEDGER_ENABLED=False)
+    def test_abandoned_stream_releases_unused_reservation(self):
+        stream = self.stub_gateway().stream_text('Hello', model='m', max_tokens=200)
+        next(stream)
+        stream.close()
+        # Only the prompt and the first chunk of the 200 output tokens reserved were used.
+        self.assertGreater(self.tokens_left(), 950)
+
+    @override_settings(LLM_LEDGER_ENABLED=False)
+    def test_async_abandoned_stream_releases_unused_reservation(self):
+        gateway = self.stub_gateway()
+
+        async def read_one():
+            stream = gateway.astream_text('Hello', model='m', max_tokens=200)
+            await anext(stream)
+            await stream.aclose()
+
+        asyncio.run(read_one())
+        self.assertGreater(self.tokens_left(), 950)
+
+
+class TokenBucketTests(TestCase):
+    """Buckets pay all costs or none, and lower lanes leave their reserve untouched."""
+
+    def setUp(self):
+        self.now = 0.0
+        patcher = mock.patch('projects.anthropic.ratelimit.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buckets = LocalBuckets()
+
+    def test_floor_is_kept(self):
+        self.assertEqual(self.buckets.take({'tokens': (1000, 400, 0)}), 0)
+        # 600 left, but paying 400 would go below a floor of 300: 100 tokens short.
+        self.assertEqual(self.buckets.take({'tokens': (1000, 400, 300)}), 6.0)
+        self.assertEqual(self.buckets._buckets['tokens'][0], 600)
+
+        self.now += 6
+        self.assertEqual(self.buckets.take({'tokens': (1000, 400, 300)}), 0)
+        self.assertEqual(self.buckets._buckets['tokens'][0], 300)
+
+    def test_all_or_none(self):
+        wait = self.buckets.take({'tokens': (1000, 400, 0), 'requests': (10, 1, 10)})
+        self.assertEqual(wait, 6.0)
+        self.assertEqual(self.buckets._buckets, {})
+
+    @override_settings(ANTHROPIC_RPM_LIMIT=10, ANTHROPIC_TPM_LIMIT=1000, ANTHROPIC_MODEL_RATE_LIMITS={})
+    def test_lane_reserve_becomes_floor(self):
+        limiter = RateLimiter(self.buckets)
+        self.assertEqual(
+            limiter._costs('m', 1, 400, reserve=0.5),
+            {'llm-ratelimit:m:requests': (10, 1, 5.0), 'llm-ratelimit:m:tokens': (1000, 400, 500.0)},
+        )
+        # A request as large as the bucket is capped to it and may use the reserve.
+        self.assertEqual(limiter._costs('m', 1, 5000, reserve=0.5)['llm-ratelimit:m:tokens'], (1000, 1000, 0))
+
+
+class FairShareOrderTests(TestCase):
+    """Report slots go to requesters in proportion to their weights."""
+
+    def jobs(self, requester, count):
+        start = timezone.now()
+        return [
+            SimpleNamespace(requested_by_id=requester, created_at=start + timedelta(seconds=n)) for n in range(count)
+        ]
+
+    def requesters(self, chosen):
+        return [job.requested_by_id for job in chosen]
+
+    def test_weighted_shares(self):
+        jobs = self.jobs(1, 6) + self.jobs(2, 6)
+        chosen = fair_share_order(jobs, served={}, weights={1: 2}, slots=6)
+        self.assertEqual(self.requesters(chosen).count(1), 4)
+        self.assertEqual(self.requesters(chosen).count(2), 2)
+        self.assertEqual([job for job in chosen if job.requested_by_id == 1], jobs[:4])
+
+    def test_recently_served_requester_waits(self):
+        jobs = self.jobs(1, 3) + self.jobs(2, 1)
+        self.assertEqual(self.requesters(fair_share_order(jobs, served={1: 2}, weights={}, slots=2)), [2, 1])
+
+    def test_zero_weight_counts_as_one(self):
+        jobs = self.jobs(1, 2) + self.jobs(2, 2)
+        self.assertEqual(self.requesters(fair_share_order(jobs, served={}, weights={1: 0}, slots=2)), [1, 2])
+
+    def test_fewer_jobs_than_slots(self):
+        jobs = self.jobs(1, 2)
+        self.assertEqual(fair_share_order(jobs, served={}, weights={}, slots=5), jobs)
+
+
+@override_settings(LLM_THROTTLE_RATE='20/min', LLM_DAILY_TOKEN_QUOTA=100000)
+class QuotaTests(TestCase):
+    """Admin quota overrides are checked on save and applied global, then role, then user."""
+
+    def setUp(self):
+        clear_quota_cache()
+        self.addCleanup(clear_quota_cache)
+
+    def test_validate(self):
+        validate_quotas({
+            'rate': '30/min',
+            'roles': {'client': {'rate': '10/min', 'daily_tokens': 200000}},
+            'users': {'42': {'daily_tokens': 0}},
+        })
+        for quotas, message in (
+            ([], 'llm_quotas must be an object.'),
+            ({'burst': 5}, 'Unknown key burst'),
+            ({'roles': {'guest': {}}}, 'unknown role guest'),
+            ({'users': {'bob': {}}}, 'keyed by user id'),
+            ({'users': {'42': {'rate': '10/fortnight'}}}, 'users.42.rate must look like'),
+            ({'roles': {'client': {'daily_tokens': -1}}}, 'roles.client.daily_tokens'),
+            ({'daily_tokens': True}, 'llm_quotas.daily_tokens'),
+        ):
+            with self.subTest(quotas=quotas), self.assertRaisesMessage(ValueError, message):
+                validate_quotas(quotas)
+
+    def test_override_precedence(self):
+        client = User.objects.create_user(username='client', email='client@example.com', password='x', role='client')
+        other = User.objects.create_user(username='other', email='other@example.com', password='x', role='client')
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        self.assertEqual(get_user_quota(client), {'rate': '20/min', 'daily_tokens': 100000})
+
+        Settings.objects.update_or_create(pk=1, defaults={'llm_quotas': {
+            'rate': '30/min',
+            'roles': {'client': {'rate': '10/min', 'daily_tokens': 200000}},
+            'users': {str(client.pk): {'daily_tokens': 0}},
+        }})
+        clear_quota_cache()
+        self.assertEqual(get_user_quota(client), {'rate': '10/min', 'daily_tokens': 0})
+        self.assertEqual(get_user_quota(other), {'rate': '10/min', 'daily_tokens': 200000})
+        self.assertEqual(get_user_quota(admin), {'rate': '30/min', 'daily_tokens': 100000})
+
+
+    def test_unreachable_cache_fails_open_with_warning(self):
+        user = User.objects.create_user(username='client', email='client@example.com', password='x', role='client')
+        request = SimpleNamespace(user=user)
+        broken = mock.Mock(**{'get.side_effect': ConnectionError('refused')})
+        with (
+            mock.patch.object(throttles, 'caches', {settings.LLM_THROTTLE_CACHE_ALIAS: broken}),
+            mock.patch.object(throttles, '_cache_down_until', 0.0),
+            self.assertLogs('projects.throttles', 'WARNING') as logs,
+        ):
+            self.assertTrue(throttles.LLMRateThrottle().allow_request(request, None))
+            self.assertTrue(throttles.LLMRateThrottle().allow_request(request, None))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('not enforced', logs.output[0])
+
+
+@override_settings(LLM_LANES={**settings.LLM_LANES, 'interactive': {**settings.LLM_LANES['interactive'], 'per_user': 1}})
+class InteractiveFairnessTests(TestCase):
+    """One user's question generations cannot take every interactive slot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        project_type = ProjectType.objects.create(name='Web', description='')
+        cls.busy, cls.other = [
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='x', role='client')
+            for name in ('busy', 'other')
+        ]
+        cls.running, cls.waiting, cls.other_project = [
+            Project.objects.create(user=user, project_type=project_type, name='Shop')
+            for user in (cls.busy, cls.busy, cls.other)
+        ]
+        AI_QuestionGeneration.objects.create(project=cls.running)
+
+    def test_user_at_cap_is_throttled(self):
+        self.assertEqual(tasks.claim_ai_question_generation(self.waiting), ('busy', None))
+        with self.assertRaises(Throttled):
+            tasks.get_or_generate_ai_questions(self.waiting)
+        self.assertEqual(tasks.claim_ai_question_generation(self.other_project)[0], 'generate')
+
+    def test_prefetch_counts_against_cap(self):
+        AI_QuestionGeneration.objects.filter(project=self.running).update(status='done')
+        prefetch = AI_QuestionPrefetch.objects.create(project=self.waiting, status='queued')
+        self.assertEqual(tasks.claim_ai_question_generation(self.running)[0], 'generate')
+        with mock.patch.object(tasks.anthropic_prompt, 'ask_questions') as ask_questions:
+            tasks.prefetch_ai_questions_task(prefetch.id)
+        ask_questions.assert_not_called()
+        self.assertEqual(AI_QuestionPrefetch.objects.get(id=prefetch.id).status, 'failed')
+
+    def test_batches_in_fair_order(self):
+        ReportBatch.objects.create(requested_by=self.busy, status='submitted', submitted_at=timezone.now())
+        ReportBatch.objects.bulk_create([ReportBatch(requested_by=self.busy) for _ in range(2)])
+        other = ReportBatch.objects.create(requested_by=self.other)
+        self.assertEqual(tasks.claim_next_report_batch(), other)
+
+
+@override_settings(LLM_LEDGER_ENABLED=False, ANTHROPIC_RATE_LIMIT_BACKEND='local')
+class AsyncGatewayTests(TestCase):
+    """Async streams get one client per event loop, closed when the loop shuts down."""
+
+    def setUp(self):
+        server = make_stub_server(output_tokens='20')
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        self.gateway = LLMGateway(api_key='test', base_url=f'http://127.0.0.1:{server.server_address[1]}')
+
+    def stream(self):
+        async def read():
+            return ''.join([text async for text in self.gateway.astream_text('Hello', max_tokens=20)]), (
+                self.gateway.async_client
+            )
+
+        return asyncio.run(read())
+
+    def test_client_closed_with_its_loop(self):
+        text, first = self.stream()
+        self.assertTrue(text)
+        self.assertTrue(first.is_closed())
+
+        second = self.stream()[1]
+        self.assertIsNot(second, first)
+        self.assertEqual(len(self.gateway._async_clients), 1)
+
+
+class AsyncViewTests(TransactionTestCase):
+    """
+    The async question view returns the first AI question while the rest of
+    the stream is stored on the event loop, from threads with their own
+    connections (hence no test transaction).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        self.project = Project.objects.create(
+            user=self.user, project_type=ProjectType.objects.create(name='Web', description=''), name='Shop'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    async def test_next_question_generated(self):
+        async def questions(request):
+            yield {'text': 'Who are your users?', 'description': ''}
+            yield {'text': 'Which payments do you take?', 'description': ''}
+
+        request = AsyncRequestFactory().get('/', headers={'Authorization': f'Token {self.token.key}'})
+        with mock.patch.object(tasks.anthropic_prompt, 'astream_questions', side_effect=questions):
+            response = await AsyncGetNextQuestionView.as_view()(request, project_id=self.project.id)
+            await asyncio.gather(*tasks._question_stream_tasks)
+
+        self.assertEqual(response.data['data']['text'], 'Who are your users?')
+        self.assertEqual(await AI_Question.objects.filter(project=self.project).acount(), 2)
+
+
+class SingleFlightQuestionTests(TestCase):
+    """A caller arriving while a project's questions are being generated waits for them instead of generating again."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='client', email='client@example.com', password='x')
+        cls.project = Project.objects.create(
+            user=user, project_type=ProjectType.objects.create(name='Web', description=''), name='Shop'
+        )
+
+    def test_concurrent_callers_get_one_generation(self):
+        def questions(all_questions, project_info):
+            # The second caller arrives while the first one's model call is still writing.
+            tasks.get_or_generate_ai_questions(Project.objects.get(id=self.project.id))
+            yield {'text': 'Who are your users?', 'description': ''}
+
+        with (
+            mock.patch.object(tasks.anthropic_prompt, 'stream_questions', side_effect=questions) as stream_questions,
+            mock.patch.object(tasks, 'wait_for_ai_question', return_value=None) as wait_for_ai_question,
+            mock.patch.object(tasks, 'question_stream_executor'),
+        ):
+            first = tasks.get_or_generate_ai_questions(self.project)
+
+        stream_questions.assert_called_once()
+        wait_for_ai_question.assert_called_once_with(mock.ANY, 1)
+        self.assertEqual(first.text, 'Who are your users?')
+        self.assertEqual(tasks.wait_for_ai_question(self.project, 1), first)
+        self.assertEqual(AI_QuestionGeneration.objects.filter(project=self.project).count(), 1)
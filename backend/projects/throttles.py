@@ -0,0 +1,222 @@
+import datetime
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+# Limits on the LLM-triggering endpoints. Admins override the defaults
+# (LLM_THROTTLE_RATE, LLM_DAILY_TOKEN_QUOTA) through ``Settings.llm_quotas``,
+# for everyone, per role and per user, later levels winning:
+#
+#     {
+#         "rate": "30/min",
+#         "roles": {"client": {"rate": "10/min", "daily_tokens": 200000}},
+#         "users": {"42": {"daily_tokens": 0}}
+#     }
+#
+# ``rate`` is "<requests>/<s|min|hour|day>", or null for no limit;
+# ``daily_tokens`` of 0 means no quota.
+QUOTA_FIELDS = ("rate", "daily_tokens")
+RATE_PERIODS = ("s", "m", "h", "d")
+
+# Seconds the shared cache is skipped after an error; throttles let requests through meanwhile.
+CACHE_RETRY_AFTER = 5
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cached = {"quotas": None, "expires_at": 0.0}
+_cache_down_until = 0.0
+
+
+def default_quota() -> dict:
+    return {"rate": settings.LLM_THROTTLE_RATE, "daily_tokens": settings.LLM_DAILY_TOKEN_QUOTA}
+
+
+def validate_quota(quota, where: str):
+    if not isinstance(quota, dict):
+        raise ValueError(f"{where} must be an object.")
+    unknown = set(quota) - set(QUOTA_FIELDS)
+    if unknown:
+        raise ValueError(f"{where}: unknown fields {', '.join(sorted(unknown))}.")
+    rate = quota.get("rate")
+    if rate is not None:
+        num, _, period = str(rate).partition("/")
+        if not num.isdigit() or not period or period[0] not in RATE_PERIODS:
+            raise ValueError(f"{where}.rate must look like 30/min (per s, min, hour or day), or be null.")
+    if "daily_tokens" in quota and (
+        not isinstance(quota["daily_tokens"], int) or isinstance(quota["daily_tokens"], bool)
+        or quota["daily_tokens"] < 0
+    ):
+        raise ValueError(f"{where}.daily_tokens must be a non-negative integer.")
+
+
+def validate_quotas(value: dict):
+    """
+    Checks the shape of ``Settings.llm_quotas``.
+
+    Raises:
+        ValueError: With a message naming the offending entry.
+    """
+    if not isinstance(value, dict):
+        raise ValueError("llm_quotas must be an object.")
+    User = apps.get_model("users", "User")
+    roles = {role for role, _ in User.ROLE_CHOICES}
+    for key, quota in value.items():
+        if key in ("roles", "users"):
+            if not isinstance(quota, dict):
+                raise ValueError(f"{key} must be an object.")
+            for name, overrides in quota.items():
+                if key == "roles" and name not in roles:
+                    raise ValueError(f"roles: unknown role {name}; expected one of: {', '.join(sorted(roles))}.")
+                if key == "users" and not str(name).isdigit():
+                    raise ValueError("users must be an object keyed by user id.")
+                validate_quota(overrides, f"{key}.{name}")
+        elif key in QUOTA_FIELDS:
+            validate_quota({key: quota}, "llm_quotas")
+        else:
+            raise ValueError(f"Unknown key {key}; expected rate, daily_tokens, roles or users.")
+
+
+def configured_quotas() -> dict:
+    """``Settings.llm_quotas``, re-read at most every ``LLM_PROFILE_CACHE_TTL`` seconds."""
+    now = time.monotonic()
+    with _lock:
+        if _cached["quotas"] is not None and now < _cached["expires_at"]:
+            return _cached["quotas"]
+
+    Settings = apps.get_model("admin_api", "Settings")
+    quotas = Settings.get_settings().llm_quotas or {}
+    with _lock:
+        _cached["quotas"] = quotas
+        _cached["expires_at"] = now + settings.LLM_PROFILE_CACHE_TTL
+    return quotas
+
+
+def clear_quota_cache():
+    """Drops this process's cached quotas; other processes refresh after the TTL."""
+    with _lock:
+        _cached["quotas"] = None
+
+
+def get_user_quota(user) -> dict:
+    """Effective quota of ``user``: the defaults, then the admin's global, role and user overrides."""
+    quotas = configured_quotas()
+    quota = default_quota()
+    quota.update({field: quotas[field] for field in QUOTA_FIELDS if field in quotas})
+    quota.update(quotas.get("roles", {}).get(user.role, {}))
+    quota.update(quotas.get("users", {}).get(str(user.pk), {}))
+    return quota
+
+
+def _cache_call(method: str, *args, default=None):
+    """
+    Calls the shared throttle cache, treating it as empty while it is
+    unreachable: the throttles fail open, with a warning per retry window.
+    """
+    global _cache_down_until
+    if _cache_down_until > time.monotonic():
+        return default
+    try:
+        return getattr(caches[settings.LLM_THROTTLE_CACHE_ALIAS], method)(*args)
+    except Exception as e:
+        logger.warning(
+            "throttle cache %r unavailable (%s); LLM rate limits and token quotas are not enforced for %ss",
+            settings.LLM_THROTTLE_CACHE_ALIAS, e, CACHE_RETRY_AFTER,
+        )
+        _cache_down_until = time.monotonic() + CACHE_RETRY_AFTER
+        return default
+
+
+def tokens_used_today(user) -> int:
+    """
+    Tokens (input, cache writes and output) the ledger recorded today for
+    ``user``'s projects, cached for ``LLM_QUOTA_USAGE_TTL`` seconds.
+    """
+    today = timezone.localdate()
+    key = f"llm-quota-used:{user.pk}:{today.isoformat()}"
+    used = _cache_call("get", key)
+    if used is None:
+        LLMCall = apps.get_model("projects", "LLMCall")
+        start = timezone.make_aware(datetime.datetime.combine(today, datetime.time.min))
+        used = LLMCall.objects.filter(project__user=user, created_at__gte=start).aggregate(
+            total=Sum(F("input_tokens") + F("cache_creation_tokens") + F("output_tokens"))
+        )["total"] or 0
+        _cache_call("set", key, used, settings.LLM_QUOTA_USAGE_TTL)
+    return used
+
+
+def seconds_until_tomorrow() -> int:
+    now = timezone.localtime()
+    tomorrow = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time.min)
+    return int((timezone.make_aware(tomorrow) - now).total_seconds()) + 1
+
+
+class LLMRateThrottle(SimpleRateThrottle):
+    """
+    Request rate per user across all LLM-triggering endpoints, counted in the
+    shared cache so every web process enforces the same limit. The rate is
+    the user's ``get_user_quota`` rate.
+    """
+    scope = "llm"
+
+    def __init__(self):
+        # The rate depends on the user, so it is resolved per request.
+        self.rate = None
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": request.user.pk}
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+        self.rate = get_user_quota(request.user)["rate"]
+        if not self.rate:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        self.history = _cache_call("get", self.key, default=[]) or []
+        self.now = self.timer()
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) >= self.num_requests:
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def throttle_success(self):
+        self.history.insert(0, self.now)
+        _cache_call("set", self.key, self.history, self.duration)
+        return True
+
+
+class LLMTokenQuotaThrottle(BaseThrottle):
+    """
+    Rejects LLM-triggering requests once the user's projects used their
+    ``daily_tokens`` today (per the LLM call ledger), until local midnight.
+    """
+
+    def allow_request(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return True
+        quota = get_user_quota(user)["daily_tokens"]
+        if not quota:
+            return True
+        used = tokens_used_today(user)
+        if used < quota:
+            return True
+        raise Throttled(
+            wait=seconds_until_tomorrow(),
+            detail=f"Daily LLM token quota of {quota} tokens used up ({used} used today).",
+        )
+
+
+# For the views that (may) call the model.
+LLM_THROTTLES = [LLMRateThrottle, LLMTokenQuotaThrottle]
@@ -1,6 +1,14 @@
 # users/urls.py
+from django.conf import settings
 from django.urls import path
-from .views import CreateProjectTypesView, RemoveProjectTypesView, GetProjectTypesView, ProjectView, RemoveProjectView, GetOneProjectView, QuestionView, RemoveQuestionView, AnswerView, RemoveAnswerView, AnswerQuestionView, GetNextQuestionView, GenerateReportView
+from .views import CreateProjectTypesView, RemoveProjectTypesView, GetProjectTypesView, ProjectView, RemoveProjectView, GetOneProjectView, QuestionView, RemoveQuestionView, AnswerView, RemoveAnswerView, AnswerQuestionView, GetNextQuestionView, GenerateReportView, GenerateReportStreamView, ReportJobView
+from .async_views import AsyncAnswerQuestionView, AsyncGenerateReportView, AsyncGetNextQuestionView
+
+# Under ASGI the LLM-bound endpoints are served by their async variants.
+if settings.ASYNC_VIEWS:
+    AnswerQuestionView = AsyncAnswerQuestionView
+    GetNextQuestionView = AsyncGetNextQuestionView
+    GenerateReportView = AsyncGenerateReportView
 
 urlpatterns = [
     path("create_project_type/", CreateProjectTypesView.as_view(), name="create project type"),
@@ -19,5 +27,7 @@ urlpatterns = [
     path("remove_answer/<int:answer_id>/", RemoveAnswerView.as_view()),
     path("answer_question/", AnswerQuestionView.as_view()),
     path("get_next_question/<int:project_id>/", GetNextQuestionView.as_view()),
-    path("generate_report/<int:project_id>/", GenerateReportView.as_view())
+    path("generate_report/<int:project_id>/", GenerateReportView.as_view()),
+    path("generate_report_stream/<int:project_id>/", GenerateReportStreamView.as_view()),
+    path("report_job/<int:job_id>/", ReportJobView.as_view())
 ]
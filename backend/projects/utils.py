@@ -0,0 +1,93 @@
+import hashlib
+import json
+
+from django.db import connection, transaction
+
+from admin_api.stats import record_bulk_create
+
+from .models import Answer, AI_Question, AI_Answer, Project
+
+
+def get_project_info(project) -> dict:
+    """Project details passed to the prompt builders."""
+    return {
+        "project_id": project.id,
+        "project_name": project.name,
+        "project_description": project.description,
+        "project_type_id": project.project_type_id,
+        "project_type": project.project_type.name,
+        "project_type_description": project.project_type.description
+    }
+
+
+def get_answered_questions(project, include_ai: bool = True) -> list:
+    """
+    Collects the project's question/answer transcript in the structure
+    expected by ``AnthropicPrompt`` (predefined answers first, then AI answers).
+    """
+    all_questions = []
+
+    answers = Answer.objects.filter(project=project).select_related("question")
+    for answer in answers:
+        all_questions.append({
+            "id": answer.question.id,
+            "question_text": answer.question.text,
+            "answer_text": answer.text,
+            "answer_tokens": answer.token_count,
+            "question_asked_by": "predefined"
+        })
+
+    if include_ai:
+        ai_answers = AI_Answer.objects.filter(ai_question__project=project).select_related("ai_question")
+        for answer in ai_answers:
+            all_questions.append({
+                "id": answer.ai_question.question_no,
+                "question_text": answer.ai_question.text,
+                "answer_text": answer.text,
+                "answer_tokens": answer.token_count,
+                "question_asked_by": "ai"
+            })
+
+    return all_questions
+
+
+def transcript_fingerprint(all_questions: list) -> str:
+    """Stable hash of the question/answer pairs a generation was based on."""
+    pairs = sorted(
+        (question["question_asked_by"], question["id"], question["answer_text"] or "")
+        for question in all_questions
+    )
+    return hashlib.sha256(json.dumps(pairs).encode()).hexdigest()
+
+
+def lock_project(project):
+    """
+    Row-locks ``project`` until the surrounding transaction ends; used as a
+    per-project mutex. The lock is FOR NO KEY UPDATE where supported so that
+    answers can still be inserted for the project meanwhile.
+    """
+    no_key = connection.features.has_select_for_no_key_update
+    return Project.objects.select_for_update(no_key=no_key).get(pk=project.pk)
+
+
+def save_ai_questions(project, ai_questions: list) -> list:
+    """
+    Stores generated ``{"text", "description"}`` questions as the project's
+    linked ``AI_Question`` chain, numbered from 1, in one transaction (one
+    insert and one update query).
+    """
+    with transaction.atomic():
+        created = AI_Question.objects.bulk_create([
+            AI_Question(project=project, text=ai_question["text"], description=ai_question["description"], question_no=ques_no)
+            for ques_no, ai_question in enumerate(ai_questions, start=1)
+        ])
+        if created and created[0].pk is None:
+            # Backends that cannot return ids from a bulk insert.
+            created = list(
+                AI_Question.objects.filter(project=project, question_no__lte=len(created)).order_by("question_no")
+            )
+        for ai_question, next_ai_question in zip(created, created[1:]):
+            ai_question.next_question = next_ai_question
+        AI_Question.objects.bulk_update(created[:-1], ["next_question"])
+        record_bulk_create(created)
+    return created
@@ -1,3 +1,5 @@
+import time
+
 from django.shortcuts import render
 from rest_framework import status
 from django.contrib.auth import  get_user_model
@@ -6,10 +8,22 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
-from .models import ProjectType, Project, Question, Answer, AI_Question, AI_Answer, Project_Report
-from .serializers import QuestionSerializer, AnswerSerializer, ProjectTypeSerializer, ProjectSerializer, AI_QuestionSerializer, AI_AnswerSerializer, Project_ReportSerializer
+from rest_framework.renderers import JSONRenderer
+from django.http import StreamingHttpResponse
+from .models import ProjectType, Project, Question, Answer, AI_Question, AI_Answer, Project_Report, ReportJob
+from .serializers import QuestionSerializer, AnswerSerializer, ProjectTypeSerializer, ProjectSerializer, AI_QuestionSerializer, AI_AnswerSerializer, Project_ReportSerializer, ReportJobSerializer
 from django.db.models import Q
-from .anthropic.prompt import anthropic_prompt
+from .anthropic.compaction import compact_transcript
+from .anthropic.prompt import REPORT_SECTIONS, anthropic_prompt
+from .anthropic.resilience import iterate_in_lane
+from .utils import get_answered_questions, get_project_info
+from .renderers import EventStreamRenderer, sse_event
+from .pagination import KeysetPagination
+from .throttles import LLM_THROTTLES
+from .tasks import (
+    REPORT_STREAM_POLL_INTERVAL, claim_report_stream, enqueue_report_job, fail_report_stream, finish_report_stream,
+    get_or_generate_ai_questions, schedule_ai_question_prefetch, wait_for_ai_question,
+)
 
 
 # Create your views here.
@@ -116,11 +130,14 @@ class ProjectView(APIView):
         if user.role != 'admin':
             project = project.filter(user = user)
         
-        project_data = ProjectSerializer(project, many = True)
+        paginator = KeysetPagination(("-created_at", "-id"))
+        project_data = ProjectSerializer(paginator.paginate_queryset(project, request), many = True)
 
         return Response({
             "detail": "Project list retrieved successfully",
-            "data": project_data.data
+            "data": project_data.data,
+            "count": paginator.count,
+            "next": paginator.next
         }, status=status.HTTP_200_OK)
 
 
@@ -346,6 +363,8 @@ class RemoveAnswerView(APIView):
 class GetNextQuestionView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
+    llm_bound = True
 
     def get(self, request, project_id):
         user = request.user
@@ -393,46 +412,23 @@ class GetNextQuestionView(APIView):
             }, status=status.HTTP_200_OK)
         
         if ai_answered_question_ids.count() != 0:
+            next_ai_question = wait_for_ai_question(project, AI_Question.objects.filter(project=project).count() + 1)
+            if next_ai_question:
+                return Response({
+                    "detail": "Next AI question retrieved successfully",
+                    "data": {
+                        **AI_QuestionSerializer(next_ai_question).data,
+                        "question_type": "ai"
+                    }
+                }, status=status.HTTP_200_OK)
             return Response({"detail": "All questions have been answered."}, status=status.HTTP_200_OK)
         
-        # Generate new question using Anthropic model
-        all_questions = []
-        answers = Answer.objects.filter(project=project)
-        for answer in answers:
-            all_questions.append({
-                "id": answer.question.id,
-                "question_text": answer.question.text,
-                "answer_text": answer.text,
-                "question_asked_by": "predefined"  # Assuming all these questions were asked by the user
-            })
-
-        project_info = {
-            "project_name": project.name,
-            "project_description": project.description,
-            "project_type": project.project_type.name,
-            "project_type_description": project.project_type.description
-        }
-
-        ai_questions = anthropic_prompt.ask_questions(all_questions, project_info)
-
-        if not ai_questions:
+        # Generate new question using Anthropic model; concurrent requests share one generation
+        ai_ques = get_or_generate_ai_questions(project)
+
+        if not ai_ques:
             return Response({"detail": "All questions have been answered."}, status=status.HTTP_200_OK)
         
-        ques_no = 1
-        previous_ai_question=None
-        for ai_question_text in ai_questions:
-            ai_question = AI_Question.objects.create(
-                project=project,
-                text=ai_question_text,
-                question_no = ques_no
-            )
-            ques_no += 1
-            if previous_ai_question:
-                previous_ai_question.next_question = ai_question
-                previous_ai_question.save()
-            previous_ai_question = ai_question
-        
-        ai_ques = AI_Question.objects.filter(project=project).order_by("question_no").first()
         serializer = AI_QuestionSerializer(ai_ques)
         return Response({
             "detail": "Next AI question generated successfully",
@@ -445,6 +441,8 @@ class GetNextQuestionView(APIView):
 class AnswerQuestionView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
+    llm_bound = True
 
     def post(self, request):
         user = request.user
@@ -477,41 +475,15 @@ class AnswerQuestionView(APIView):
                     **QuestionSerializer(question.next_question).data,
                     "question_type": "predefined"
                 }
+                schedule_ai_question_prefetch(project, question)
             else:
-                all_questions = []
-                answers = Answer.objects.filter(project=project)
-                for ans in answers:
-                    all_questions.append({
-                        "id": ans.question.id,
-                        "question_text": ans.question.text,
-                        "answer_text": ans.text,
-                        "question_asked_by": "predefined"  # Assuming all these questions were asked by the user
-                    })
-
-                project_info = {
-                    "project_name": project.name,
-                    "project_description": project.description,
-                    "project_type": project.project_type.name,
-                    "project_type_description": project.project_type.description
-                }
-                ai_questions = anthropic_prompt.ask_questions(all_questions, project_info)
-
-                if ai_questions:
-                    previous_ai_question = None
-                    ques_no = 0
-                    for ai_question_text in ai_questions:
-                        ai_question = AI_Question.objects.create(
-                            project=project,
-                            text=ai_question_text,
-                            question_no = ques_no
-                        )
-                        ques_no += 1
-                        if previous_ai_question:
-                            previous_ai_question.next_question = ai_question
-                            previous_ai_question.save()
-                        previous_ai_question = ai_question
+                # Use the questions pre-generated in the background when they are still
+                # valid for the current answers, otherwise generate them now.
+                first_ai_question = get_or_generate_ai_questions(project)
+
+                if first_ai_question:
                     next_question = {
-                        **AI_QuestionSerializer(AI_Question.objects.filter(project__id=project_id).order_by("question_no").first()).data,
+                        **AI_QuestionSerializer(first_ai_question).data,
                         "question_type": "ai"
                     }
         
@@ -528,9 +500,11 @@ class AnswerQuestionView(APIView):
 
             answer_data = AI_AnswerSerializer(answer).data
 
-            if question.next_question:
+            # The next question may still be streaming in when the answer comes quickly.
+            next_ai_question = question.next_question or wait_for_ai_question(project, question.question_no + 1)
+            if next_ai_question:
                 next_question = {
-                    **AI_QuestionSerializer(question.next_question).data,
+                    **AI_QuestionSerializer(next_ai_question).data,
                     "question_type": "ai"
                 }
 
@@ -544,6 +518,7 @@ class AnswerQuestionView(APIView):
 class GenerateReportView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
 
     def get(self, request, project_id):
         user = request.user
@@ -562,43 +537,120 @@ class GenerateReportView(APIView):
                 "data": Project_ReportSerializer(project_report).data
             }, status = status.HTTP_200_OK)
         
-        all_questions = []
-
-        answers = Answer.objects.filter(project=project)
-        for answer in answers:
-            all_questions.append({
-                "id": answer.question.id,
-                "question_text": answer.question.text,
-                "answer_text": answer.text,
-                "question_asked_by": "predefined"  # Assuming all these questions were asked by the user
-            })
-        
-        ai_answers = AI_Answer.objects.filter(ai_question__project=project)
-        for answer in ai_answers:
-            all_questions.append({
-                "id": answer.ai_question.question_no,
-                "question_text": answer.ai_question.text,
-                "answer_text": answer.text,
-                "question_asked_by": "ai"  # Assuming all these questions were asked by the user
-            })
+        # Generation runs in a Celery worker; the client polls report_job/<job_id>/
+        job = enqueue_report_job(project, user=user)
+
+        return Response({
+            "detail": "Project Report generation queued",
+            "data": ReportJobSerializer(job).data
+        }, status = status.HTTP_202_ACCEPTED)
+
 
-        project_info = {
-            "project_name": project.name,
-            "project_description": project.description,
-            "project_type": project.project_type.name,
-            "project_type_description": project.project_type.description
-        }
+class ReportJobView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
 
-        generated_report = anthropic_prompt.generate_requirements(all_questions, project_info)
+    def get(self, request, job_id):
+        user = request.user
 
-        print("Generated Report: ", generated_report)
+        try:
+            job = ReportJob.objects.select_related("project", "report").get(id=job_id)
+        except ReportJob.DoesNotExist:
+            return Response({"detail": "Report job is not present"}, status=status.HTTP_404_NOT_FOUND)
 
-        project_report = Project_Report.objects.create(project = project, report = generated_report)
+        if user.role != "admin" and user != job.project.user:
+            return Response({"detail": "User is not authorized to view this report job."}, status=status.HTTP_403_FORBIDDEN)
 
         return Response({
-            "detail": "Project Report Generated",
-            "data": Project_ReportSerializer(project_report).data
-        }, status = status.HTTP_201_CREATED)
-        
+            "detail": "Report job status",
+            "data": ReportJobSerializer(job).data
+        }, status=status.HTTP_200_OK)
 
 
+class GenerateReportStreamView(APIView):
+    """
+    Streaming variant of ``GenerateReportView``.
+
+    Sends the report to the client as Server-Sent Events while the model is
+    still writing it (``chunk`` events, one section after another), then stores
+    the sections as the project's ``Project_Report`` and sends a final
+    ``done`` event. The stream runs as the project's ``ReportJob`` in the
+    reports lane; when the project already has an active job, or the lane has
+    no free slot, it waits for that job instead (``progress`` events).
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    throttle_classes = LLM_THROTTLES
+    llm_bound = True
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, project_id):
+        user = request.user
+
+        try:
+            project = Project.objects.select_related("project_type").get(id=project_id)
+        except Project.DoesNotExist:
+            return Response({"detail": "Project is not present"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user.role != "admin" and user != project.user:
+            return Response({"detail": "User is not authorized to view this report."}, status=status.HTTP_403_FORBIDDEN)
+
+        job, claimed = claim_report_stream(project, user)
+        if claimed:
+            events = self.generate_report_events(job)
+        elif job:
+            events = self.job_events(job)
+        else:
+            events = self.existing_report_events(Project_Report.objects.get(project=project))
+
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx and similar proxies from buffering the whole stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def existing_report_events(self, project_report):
+        yield sse_event("chunk", project_report.report)
+        yield sse_event("done", Project_ReportSerializer(project_report).data)
+
+    def job_events(self, job):
+        while True:
+            job = ReportJob.objects.select_related("report").get(id=job.id)
+            if job.status == "done":
+                yield from self.existing_report_events(job.report)
+                return
+            if job.status == "failed":
+                yield sse_event("error", {"detail": f"Failed to generate report: {job.error}"})
+                return
+            yield sse_event("progress", {"progress": job.progress})
+            time.sleep(REPORT_STREAM_POLL_INTERVAL)
+
+    def generate_report_events(self, job):
+        project = job.project
+        error = "The report stream was closed before the report was stored."
+        try:
+            all_questions = get_answered_questions(project)
+            project_info = get_project_info(project)
+            compacted = compact_transcript(all_questions, "report")
+            generated = {}
+            for index, section in enumerate(REPORT_SECTIONS):
+                if index:
+                    yield sse_event("chunk", "\n\n")
+                chunks = []
+                stream = anthropic_prompt.stream_report_section(section, compacted, project_info)
+                for chunk in iterate_in_lane(stream, "reports"):
+                    chunks.append(chunk)
+                    yield sse_event("chunk", chunk)
+                generated[section["key"]] = "".join(chunks)
+                # Progress also keeps the job from being recovered as stale.
+                job.progress = 20 + 75 * len(generated) // len(REPORT_SECTIONS)
+                job.save(update_fields=["progress", "updated_at"])
+            project_report = finish_report_stream(job, generated, all_questions, project_info)
+        except Exception as e:
+            error = str(e)
+            yield sse_event("error", {"detail": f"Failed to generate report: {error}"})
+            return
+        finally:
+            fail_report_stream(job, error)
+
+        yield sse_event("done", Project_ReportSerializer(project_report).data)
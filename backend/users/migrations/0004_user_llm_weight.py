@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_delete_userrole'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='llm_weight',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -11,8 +11,13 @@ class User(AbstractUser):
     name = models.CharField(max_length=150)
     role = models.CharField(max_length=50, default="admin", choices=ROLE_CHOICES)
     enabled = models.BooleanField(default=True)
+    # Share of the LLM report capacity while several users' jobs wait (projects.scheduling).
+    llm_weight = models.PositiveSmallIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=['-date_joined', '-id'])]
+
 
 
@@ -17,6 +17,9 @@ const statusConfig = {
 export default function ProjectsPage() {
     const [isLoading, setIsLoading] = useState(true);
     const [projects, setProjects] = useState([]);
+    const [next, setNext] = useState(null);
+    const [total, setTotal] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [projectTypes, setProjectTypes] = useState([]);
     const [searchQuery, setSearchQuery] = useState('');
     const [statusFilter, setStatusFilter] = useState('all');
@@ -32,20 +35,26 @@ export default function ProjectsPage() {
         }
     };
 
-    const fetchProjects = async () => {
-        setIsLoading(true);
+    // A cursor loads the next page and appends it to the rows already shown.
+    const fetchProjects = async (cursor = null) => {
+        if (cursor) setIsLoadingMore(true);
+        else setIsLoading(true);
         try {
             const params = {};
             if (searchQuery) params.search = searchQuery;
             if (statusFilter !== 'all') params.status = statusFilter;
             if (typeFilter !== 'all') params.project_type = typeFilter;
             if (reportFilter !== 'all') params.has_report = reportFilter === 'has' ? 'true' : 'false';
+            if (cursor) params.cursor = cursor;
             const response = await adminApi.getProjects(params);
-            setProjects(response.results || []);
+            setProjects(prev => cursor ? [...prev, ...response.results] : response.results || []);
+            setNext(response.next);
+            setTotal(response.count);
         } catch (err) {
             console.error('Failed to fetch projects:', err);
         } finally {
             setIsLoading(false);
+            setIsLoadingMore(false);
         }
     };
 
@@ -142,6 +151,7 @@ export default function ProjectsPage() {
                 columns={columns}
                 data={projects}
                 isLoading={isLoading}
+                loadMore={{ total, hasMore: !!next, isLoading: isLoadingMore, onLoadMore: () => fetchProjects(next) }}
                 headerActions={
                     <>
                         <Input
@@ -13,6 +13,10 @@ export default function AIMonitorPage() {
     const [stats, setStats] = useState(null);
     const [aiQuestions, setAIQuestions] = useState([]);
     const [projects, setProjects] = useState([]);
+    const [statusCounts, setStatusCounts] = useState({ pending: 0, answered: 0 });
+    const [next, setNext] = useState(null);
+    const [total, setTotal] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [projectFilter, setProjectFilter] = useState('all');
     const [statusFilter, setStatusFilter] = useState('all');
     const [selectedQuestion, setSelectedQuestion] = useState(null);
@@ -21,12 +25,12 @@ export default function AIMonitorPage() {
     const fetchData = async () => {
         setIsLoading(true);
         try {
-            const [statsRes, projectsRes] = await Promise.all([
+            const [statsRes, projects] = await Promise.all([
                 adminApi.getDashboardStats(),
-                adminApi.getProjects()
+                adminApi.getAllProjects()
             ]);
             setStats(statsRes);
-            setProjects(projectsRes.results || []);
+            setProjects(projects);
         } catch (err) {
             console.error('Failed to fetch data:', err);
         } finally {
@@ -34,15 +38,32 @@ export default function AIMonitorPage() {
         }
     };
 
-    const fetchAIQuestions = async () => {
+    // A cursor loads the next page and appends it to the rows already shown.
+    const fetchAIQuestions = async (cursor = null) => {
+        if (cursor) setIsLoadingMore(true);
         try {
             const params = {};
             if (projectFilter !== 'all') params.project = projectFilter;
             if (statusFilter !== 'all') params.answered = statusFilter === 'answered' ? 'true' : 'false';
+            if (cursor) params.cursor = cursor;
             const response = await adminApi.getAIQuestions(params);
-            setAIQuestions(response.results || []);
+            setAIQuestions(prev => cursor ? [...prev, ...response.results] : response.results || []);
+            setNext(response.next);
+            setTotal(response.count);
+            if (!cursor) {
+                // Counted by the server: the table only holds the pages loaded so far.
+                const [pendingRes, answeredRes] = await Promise.all(['false', 'true'].map(answered =>
+                    adminApi.getAIQuestions({ ...params, answered, limit: 1 })
+                ));
+                setStatusCounts({
+                    pending: statusFilter === 'answered' ? 0 : pendingRes.count,
+                    answered: statusFilter === 'pending' ? 0 : answeredRes.count,
+                });
+            }
         } catch (err) {
             console.error('Failed to fetch AI questions:', err);
+        } finally {
+            if (cursor) setIsLoadingMore(false);
         }
     };
 
@@ -64,8 +85,8 @@ export default function AIMonitorPage() {
         setSelectedQuestion(null);
     };
 
-    const pendingCount = aiQuestions.filter(q => q.status === 'pending').length;
-    const answeredCount = aiQuestions.filter(q => q.status === 'answered').length;
+    const pendingCount = statusCounts.pending;
+    const answeredCount = statusCounts.answered;
 
     const columns = [
         {
@@ -180,6 +201,7 @@ export default function AIMonitorPage() {
                 columns={columns}
                 data={aiQuestions}
                 isLoading={isLoading}
+                loadMore={{ total, hasMore: !!next, isLoading: isLoadingMore, onLoadMore: () => fetchAIQuestions(next) }}
                 headerActions={
                     <>
                         <select
@@ -36,8 +36,8 @@ export default function QuestionTemplatesPage() {
         if (!selectedProjectType) return;
         setIsLoading(true);
         try {
-            const response = await adminApi.getQuestions({ project_type: selectedProjectType });
-            setQuestions(response.results || []);
+            // Reordering works on the whole chain, so every page is loaded.
+            setQuestions(await adminApi.getAllQuestions({ project_type: selectedProjectType }));
         } catch (err) {
             console.error('Failed to fetch questions:', err);
         } finally {
@@ -11,17 +11,23 @@ import adminApi from '@/lib/adminApi';
 export default function ReportsPage() {
     const [isLoading, setIsLoading] = useState(true);
     const [reports, setReports] = useState([]);
+    const [next, setNext] = useState(null);
+    const [total, setTotal] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [searchQuery, setSearchQuery] = useState('');
     const [statusFilter, setStatusFilter] = useState('all');
     const [regenerating, setRegenerating] = useState(null);
     const [selectedReport, setSelectedReport] = useState(null);
     const [isPanelOpen, setIsPanelOpen] = useState(false);
 
-    const fetchReports = async () => {
-        setIsLoading(true);
+    // A cursor loads the next page and appends it to the rows already shown.
+    const fetchReports = async (cursor = null) => {
+        if (cursor) setIsLoadingMore(true);
+        else setIsLoading(true);
         try {
             const params = {};
             if (searchQuery) params.search = searchQuery;
+            if (cursor) params.cursor = cursor;
             const response = await adminApi.getReports(params);
             let results = response.results || [];
 
@@ -30,11 +36,15 @@ export default function ReportsPage() {
                 results = results.filter(r => r.status === statusFilter);
             }
 
-            setReports(results);
+            setReports(prev => cursor ? [...prev, ...results] : results);
+            setNext(response.next);
+            // The status filter only applies to the loaded rows, so the total would not match it.
+            setTotal(statusFilter === 'all' ? response.count : null);
         } catch (err) {
             console.error('Failed to fetch reports:', err);
         } finally {
             setIsLoading(false);
+            setIsLoadingMore(false);
         }
     };
 
@@ -72,9 +82,15 @@ export default function ReportsPage() {
         }
     };
 
-    const handleView = (report) => {
+    const handleView = async (report) => {
+        // The list only carries a summary; the document comes from the detail endpoint.
         setSelectedReport(report);
         setIsPanelOpen(true);
+        try {
+            setSelectedReport(await adminApi.getReport(report.id));
+        } catch (err) {
+            console.error('Failed to fetch report:', err);
+        }
     };
 
     const handleClosePanel = () => {
@@ -187,6 +203,7 @@ export default function ReportsPage() {
                 columns={columns}
                 data={reports}
                 isLoading={isLoading}
+                loadMore={{ total, hasMore: !!next, isLoading: isLoadingMore, onLoadMore: () => fetchReports(next) }}
                 headerActions={
                     <>
                         <Input
@@ -10,6 +10,9 @@ import adminApi from '@/lib/adminApi';
 export default function UsersPage() {
     const [isLoading, setIsLoading] = useState(true);
     const [users, setUsers] = useState([]);
+    const [next, setNext] = useState(null);
+    const [total, setTotal] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [searchQuery, setSearchQuery] = useState('');
     const [roleFilter, setRoleFilter] = useState('all');
     const [selectedUser, setSelectedUser] = useState(null);
@@ -18,18 +21,24 @@ export default function UsersPage() {
     const [error, setError] = useState('');
     const [saving, setSaving] = useState(false);
 
-    const fetchUsers = async () => {
-        setIsLoading(true);
+    // A cursor loads the next page and appends it to the rows already shown.
+    const fetchUsers = async (cursor = null) => {
+        if (cursor) setIsLoadingMore(true);
+        else setIsLoading(true);
         try {
             const params = {};
             if (searchQuery) params.search = searchQuery;
             if (roleFilter !== 'all') params.role = roleFilter;
+            if (cursor) params.cursor = cursor;
             const response = await adminApi.getUsers(params);
-            setUsers(response.results || []);
+            setUsers(prev => cursor ? [...prev, ...response.results] : response.results || []);
+            setNext(response.next);
+            setTotal(response.count);
         } catch (err) {
             console.error('Failed to fetch users:', err);
         } finally {
             setIsLoading(false);
+            setIsLoadingMore(false);
         }
     };
 
@@ -174,6 +183,7 @@ export default function UsersPage() {
                 columns={columns}
                 data={users}
                 isLoading={isLoading}
+                loadMore={{ total, hasMore: !!next, isLoading: isLoadingMore, onLoadMore: () => fetchUsers(next) }}
                 headerActions={
                     <>
                         <Input
@@ -13,21 +13,27 @@ export default function DashboardPage() {
   const [projects, setProjects] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [next, setNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchProjects();
   }, []);
 
-  const fetchProjects = async () => {
+  const fetchProjects = async (cursor = null) => {
+    if (cursor) setLoadingMore(true);
     try {
-      const response = await api.get('/projects/project/');
-      // response structure: { detail: "...", data: [...] }
-      setProjects(response.data || []);
+      const response = await api.get('/projects/project/', cursor ? { cursor } : {});
+      // response structure: { detail: "...", data: [...], count, next }
+      // A cursor loads the next page, appended to the projects already shown.
+      setProjects((prev) => (cursor ? [...prev, ...response.data] : response.data || []));
+      setNext(response.next);
     } catch (err) {
       console.error('Failed to fetch projects:', err);
       setError('Failed to load projects. Please try again.');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -59,11 +65,20 @@ export default function DashboardPage() {
             ))}
           </div>
         ) : projects.length > 0 ? (
-          <div className="grid gap-6 sm:grid-cols-2 lg:grid-cols-3">
-            {projects.map((project) => (
-              <ProjectCard key={project.id} project={project} />
-            ))}
-          </div>
+          <>
+            <div className="grid gap-6 sm:grid-cols-2 lg:grid-cols-3">
+              {projects.map((project) => (
+                <ProjectCard key={project.id} project={project} />
+              ))}
+            </div>
+            {next && (
+              <div className="mt-8 flex justify-center">
+                <Button variant="outline" onClick={() => fetchProjects(next)} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </Button>
+              </div>
+            )}
+          </>
         ) : (
           <div className="flex min-h-[400px] flex-col items-center justify-center rounded-lg border border-dashed border-border p-8 text-center">
             <div className="mx-auto flex h-12 w-12 items-center justify-center rounded-full bg-muted">
@@ -23,9 +23,19 @@ export default function ReportPage() {
 
   const fetchReport = async (projectId) => {
     try {
-      const response = await api.get(`/projects/generate_report/${projectId}/`);
-      // response: { detail, data: { report: "<HTML string>" } }
-      setReportHtml(response.data?.report || '');
+      // Render the report while it is being generated instead of waiting for the whole document
+      let html = '';
+      await api.stream(`/projects/generate_report_stream/${projectId}/`, (event, data) => {
+        if (event === 'chunk') {
+          html += data;
+          setReportHtml(html);
+          setLoading(false);
+        } else if (event === 'done') {
+          setReportHtml(data?.report || html);
+        } else if (event === 'error') {
+          throw new Error(data?.detail || 'Failed to generate report');
+        }
+      });
     } catch (err) {
       console.error('Failed to fetch report:', err);
       setError('Failed to generate report. Please ensure all questions are answered.');
@@ -12,6 +12,7 @@ export function DataTable({
     selectedRows = [],
     onSelectionChange,
     pagination,
+    loadMore,
     emptyMessage = 'No data found',
     actions,
     title,
@@ -152,6 +153,25 @@ export function DataTable({
                 </table>
             </div>
 
+            {/* Cursor pages: rows are appended as the next page loads */}
+            {loadMore && !isLoading && data.length > 0 && (
+                <div className="p-4 border-t border-border flex items-center justify-between">
+                    <p className="text-sm text-muted-foreground">
+                        Showing {data.length}{loadMore.total != null && ` of ${loadMore.total}`}
+                    </p>
+                    {loadMore.hasMore && (
+                        <Button
+                            variant="outline"
+                            size="sm"
+                            onClick={loadMore.onLoadMore}
+                            disabled={loadMore.isLoading}
+                        >
+                            {loadMore.isLoading ? 'Loading...' : 'Load more'}
+                        </Button>
+                    )}
+                </div>
+            )}
+
             {/* Pagination */}
             {pagination && (
                 <div className="p-4 border-t border-border flex items-center justify-between">
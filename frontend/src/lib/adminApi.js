@@ -1,6 +1,19 @@
 // Admin API service for admin panel
 import api from './api';
 
+// Every row of a paginated list, following its cursor pages (for pickers and
+// screens that work on the whole list)
+const getAllPages = async (endpoint, params = {}) => {
+    const rows = [];
+    let cursor = null;
+    do {
+        const response = await api.get(endpoint, { ...params, limit: 500, count: 'none', ...(cursor && { cursor }) });
+        rows.push(...(response.results || []));
+        cursor = response.next;
+    } while (cursor);
+    return rows;
+};
+
 export const adminApi = {
     // Dashboard
     getDashboardStats: () => api.get('/admin/dashboard/'),
@@ -23,12 +36,14 @@ export const adminApi = {
 
     // Projects
     getProjects: (params = {}) => api.get('/admin/projects/', params),
+    getAllProjects: (params = {}) => getAllPages('/admin/projects/', params),
     getProject: (id) => api.get(`/admin/projects/${id}/`),
     updateProject: (id, data) => api.put(`/admin/projects/${id}/`, data),
     deleteProject: (id) => api.delete(`/admin/projects/${id}/`),
 
     // Questions
     getQuestions: (params = {}) => api.get('/admin/questions/', params),
+    getAllQuestions: (params = {}) => getAllPages('/admin/questions/', params),
     getQuestion: (id) => api.get(`/admin/questions/${id}/`),
     createQuestion: (data) => api.post('/admin/questions/', data),
     updateQuestion: (id, data) => api.put(`/admin/questions/${id}/`, data),
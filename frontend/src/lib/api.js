@@ -134,6 +134,43 @@ class callAPI {
     }
   }
 
+  // Reads a Server-Sent Events endpoint with fetch (EventSource can't send the auth header).
+  // onEvent(event, data) is called for every event as soon as it arrives.
+  async stream(endpoint, onEvent, token = null) {
+    const authToken = this.getToken(token);
+    const headers = { Accept: 'text/event-stream' };
+    if (authToken) {
+      headers['Authorization'] = `Token ${authToken}`;
+    }
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, { headers });
+    if (!response.ok || !response.body) {
+      const apiError = new Error('API request failed');
+      apiError.status = response.status;
+      throw apiError;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = 'message';
+        let data = '';
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        onEvent(event, data ? JSON.parse(data) : null);
+      }
+    }
+  }
+
   // Deprecated: Use individual methods instead, but kept for backward compatibility
   async callAPI(method, endpoint, data = {}, params = {}, token = null, onUploadProgress = null) {
     method = method.toLowerCase();